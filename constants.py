@@ -3,6 +3,12 @@ Constants for the Brainrot Generator application.
 This file contains styling and configuration constants used throughout the application.
 """
 
+# Available background videos
+AVAILABLE_VIDEOS = {
+    "minecraft": "assets/videos/minecraft.mp4",
+    "subway": "assets/subway.mp4"
+}
+
 # Video configuration
 VIDEO_CONFIG = {
     "width": 1080,      # 9:16 ratio width
@@ -91,6 +97,29 @@ FFMPEG_PARAMS = {
     "audio_bitrate": "192k",          # Audio bitrate
 }
 
+# Named output profiles for the final render
+OUTPUT_PROFILES = {
+    # Full quality deliverable; fps None keeps the background's frame rate
+    "production": {
+        "width": VIDEO_CONFIG["width"],
+        "height": VIDEO_CONFIG["height"],
+        "fps": None,
+        "preset": FFMPEG_PARAMS["preset"],
+        "crf": FFMPEG_PARAMS["crf"],
+        "audio_bitrate": FFMPEG_PARAMS["audio_bitrate"],
+    },
+    # Quick preview for checking pacing and subtitle sync
+    "draft": {
+        "width": 540,
+        "height": 960,
+        "fps": 30,
+        "preset": "ultrafast",
+        "crf": "30",
+        "audio_bitrate": "96k",
+    },
+}
+DEFAULT_OUTPUT_PROFILE = "production"
+
 # ASS subtitle format parameters
 ASS_FORMAT = {
     "script_type": "v4.00+",
@@ -107,3 +136,148 @@ ASS_FORMAT = {
     "angle": 0,
     "encoding": 1,
 }
+
+# Rendering pipeline configuration
+RENDER_CONFIG = {
+    # "single_pass": seek, crop/scale, subtitle burn-in and audio mux in one
+    # ffmpeg invocation (one decode, one encode).
+    # "multi_pass": legacy extract -> crop -> subtitles -> audio chain.
+    # "segmented": the single-pass render split into chunks encoded in
+    # parallel, then concatenated losslessly and muxed with the audio once.
+    "mode": "single_pass",
+    "chunks": 4,                      # Parallel chunks (capped by CPU budget)
+    "min_chunk_seconds": 15,          # Don't split shorter than this per chunk
+    # Render all voices of a multi-voice request from one background decode
+    "batch_voices": True,
+}
+
+# Pre-transcoded vertical background library ("mezzanine" files)
+MEZZANINE_CONFIG = {
+    "dir": "assets/mezzanine",        # Where mezzanine files are written
+    "manifest": "manifest.json",      # Manifest file name inside "dir"
+    "gop_seconds": 1.0,               # Fixed keyframe interval (seconds)
+    "preset": "medium",               # One-off encode, favour quality
+    "crf": "18",                      # Near-transparent intermediate quality
+    "prepare_on_startup": False,      # Build missing mezzanines when the server starts
+}
+
+# Persistent keyframe index for background videos
+KEYFRAME_INDEX_CONFIG = {
+    "dir": "assets/.keyframes",       # One JSON index per source file
+}
+
+# Media probe (ffprobe) metadata cache
+PROBE_CACHE_CONFIG = {
+    # Optional JSON file to persist probe results across processes/restarts.
+    # None keeps the cache in memory only. Overridable via PROBE_CACHE_PATH.
+    "persist_path": None,
+    "max_entries": 1024,              # Oldest entries are dropped beyond this
+}
+
+# CPU budget shared by all generation requests
+CPU_BUDGET_CONFIG = {
+    "reserved_cores": 1,              # Cores left for the web server and OS
+    "max_threads_per_worker": 16,     # x264/torch gain little beyond this
+}
+
+# Shared ffmpeg runner (progress telemetry, timeouts)
+FFMPEG_RUNNER_CONFIG = {
+    "timeout": None,                  # Max seconds per ffmpeg run (None = no limit)
+    "stall_timeout": 120,             # Stop a run reporting no progress this long
+    "poll_interval": 0.5,             # Seconds between cancel/timeout checks
+    "log_interval": 5,                # Seconds between progress log lines (0 = off)
+    "stderr_lines": 200,              # stderr lines kept for error reporting
+}
+
+# Warm pool of pre-cut vertical background segments (see generators.segment_pool)
+SEGMENT_POOL_CONFIG = {
+    "enabled": False,                 # Refill the pool while the server is idle
+    "dir": "assets/segment_pool",
+    "lengths": [60, 90, 120, 150, 180, 210],  # Seconds, covers typical audio lengths
+    "segments_per_length": 2,         # Ready segments kept per asset and length
+    "max_bytes": 4 * 1024 ** 3,       # Size cap of the whole pool
+    "refill_interval": 30,            # Seconds between idle checks
+    "threads": 2,                     # Encoder threads for pool segments
+}
+
+# Chunked TTS synthesis (see utils.audio.synthesize_chunked)
+TTS_CHUNK_CONFIG = {
+    "enabled": False,                 # Split long scripts into concurrent requests (WAV output)
+    "max_chars": 300,                 # Upper bound of one chunk's text
+    "max_concurrency": 4,             # Fish Audio requests in flight per script
+    "gap_ms": 0,                      # Silence inserted between chunks
+    "crossfade_ms": 0,                # Crossfade between chunks (replaces the gap)
+}
+
+# Content-addressed TTS audio cache (see utils.tts_cache)
+TTS_CACHE_CONFIG = {
+    "enabled": True,
+    "dir": "assets/.tts_cache",
+    "max_bytes": 2 * 1024 ** 3,       # Least recently used entries are evicted beyond this
+}
+
+# Pooled HTTP client for the TTS API (see utils.http_client)
+HTTP_CLIENT_CONFIG = {
+    "http2": True,                    # Used when the optional h2 package is installed
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 60,           # Seconds an idle connection is kept open
+    "timeout": 90.0,                  # Default timeout, requests pass their own
+}
+
+# Client-side rate limits shared by all worker processes (see utils.rate_limit)
+RATE_LIMIT_CONFIG = {
+    "dir": None,                      # Shared state files (None = system temp dir)
+    "providers": {
+        # rate: calls per second, burst: bucket size, hedge: duplicate slow calls
+        "fish_audio": {"rate": 2.0, "burst": 5, "hedge": False},
+        "openai": {"rate": 1.0, "burst": 3, "hedge": False},
+    },
+    "latency_window": 200,            # Latency samples kept per provider
+    "hedge_percentile": 95,           # Hedge calls slower than this percentile
+    "hedge_min_samples": 20,          # Don't hedge before this many samples
+    "hedge_min_delay": 1.0,           # Never hedge sooner than this (seconds)
+}
+
+# Pause detection for subtitle adjustment (see utils.silence)
+SILENCE_CONFIG = {
+    "enabled": True,                  # Snap subtitle boundaries to detected pauses
+    "threshold_db": -40.0,            # Frames quieter than this (dBFS) are silent
+    "min_silence": 0.3,               # Shortest pause reported (seconds)
+    "frame_ms": 20,                   # RMS window
+    "hop_ms": 10,                     # Step between windows
+}
+
+# Forced alignment of subtitles to the TTS audio (see generators.alignment_engine)
+ALIGNMENT_CONFIG = {
+    "enabled": False,                 # Time subtitles from wav2vec2 alignment instead of estimates
+    "backend": None,                  # "torchaudio", "numba", "numpy" or None for the fastest available
+    # Half-width (tokens) of the banded trellis around the time/token
+    # diagonal, doubled until no path outside it could score higher, so the
+    # result is the same as the full trellis. 0 = full trellis
+    "band_tokens": 256,
+    "window_seconds": 30,             # Emissions of longer audio are computed in windows (0 = one pass)
+    "window_overlap_seconds": 1.0,    # Context kept on each side of a window cut
+}
+
+# Resident alignment model shared by worker processes (see generators.model_registry)
+ALIGNMENT_MODEL_CONFIG = {
+    "dir": "assets/.models",          # Shared state-dict files
+    "mmap": True,                     # Memory-map the weights so workers share one copy
+    "quantize": False,                # Int8 Linear layers on CPU (faster, slightly less precise)
+    "runtime": "torch",               # "torch" or "onnx" (onnxruntime CPU, model exported on first use)
+    "onnx_opset": 17,
+    "warm_up_on_startup": True,       # Load the model when the server starts (if alignment is enabled)
+    "load_timeout": 120,              # Seconds allowed for the first download
+}
+
+# Shared batching alignment process (see generators.alignment_service)
+ALIGNMENT_SERVICE_CONFIG = {
+    "enabled": False,                 # Align all requests in one process (needs ALIGNMENT_CONFIG["enabled"])
+    "address": None,                  # Unix socket path (None = system temp dir)
+    "batch_window_ms": 50,            # Wait this long for more jobs to batch
+    "max_batch": 8,                   # Jobs gathered per batch
+    "max_batch_seconds": 900,         # Padded audio per forward pass
+    "threads": 4,                     # Torch threads and trellis/backtrack threads
+    "timeout": 300,                   # Seconds a client waits for its result
+}
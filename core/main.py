@@ -5,7 +5,16 @@ from utils.dict import *
 from generators.video_generator import *
 from utils.search import *
 from generators.brainrot_generator import transform_to_brainrot, MODELS, VOICES, VOICE_PROMPTS
-from constants import SUBTITLE_STYLE, VOICE_SPEAKING_RATES, DEFAULT_SPEAKING_RATE, SUBTITLE_TIMING, FFMPEG_PARAMS, ASS_FORMAT, VIDEO_CONFIG
+from generators.asset_library import get_mezzanine
+from generators.segmented_render import render_segmented
+from generators.segment_pool import take_segment
+from generators import alignment_service
+from utils.keyframe_index import get_keyframes, choose_keyframe_start
+from utils.media_probe import probe_duration
+from utils.cpu_budget import get_process_threads
+from utils.ffmpeg_runner import run_ffmpeg
+from utils.silence import detect_silences
+from constants import SUBTITLE_STYLE, VOICE_SPEAKING_RATES, DEFAULT_SPEAKING_RATE, SUBTITLE_TIMING, FFMPEG_PARAMS, ASS_FORMAT, VIDEO_CONFIG, RENDER_CONFIG, DEFAULT_OUTPUT_PROFILE, SILENCE_CONFIG, ALIGNMENT_CONFIG, FFMPEG_RUNNER_CONFIG
 import time
 from datetime import datetime, timedelta
 import os
@@ -78,54 +87,131 @@ def format_time(seconds):
 
 
 def get_audio_duration(audio_path):
-    """Get the duration of an audio file in seconds"""
+    """Get the duration of an audio file in seconds
+
+    WAV headers are parsed in-process, other formats fall back to a cached
+    ffprobe call (see utils.media_probe).
+    """
     try:
-        import wave
-        with wave.open(audio_path, 'rb') as wf:
-            frames = wf.getnframes()
-            rate = wf.getframerate()
-            duration = frames / float(rate)
-            return duration
+        return probe_duration(audio_path)
     except Exception:
-        # Fallback method using ffprobe
-        try:
-            import subprocess
-            cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-                   '-of', 'default=noprint_wrappers=1:nokey=1', audio_path]
-            output = subprocess.check_output(cmd).decode('utf-8').strip()
-            return float(output)
-        except Exception:
-            # If all else fails, return a default duration
-            return 60.0  # Default to 1 minute
+        # If all else fails, return a default duration
+        return 60.0  # Default to 1 minute
+
+
+def _alignment_key(word):
+    """Normalize a word for matching subtitle words with aligned words"""
+    return ''.join(c for c in word.upper() if c.isalnum() or c == "'")
+
+
+def apply_word_timings(subtitle_timings, word_timings):
+    """Set subtitle chunk times from forced alignment word timings.
+
+    Chunk words are matched in order with the aligned words; words that were
+    not aligned (effect markers, punctuation) are skipped.
+
+    Returns:
+        True if every chunk got aligned times, False otherwise (timings
+        are left untouched)
+    """
+    aligned = []
+    k = 0
+    for timing in subtitle_timings:
+        start = end = None
+        for word in timing['text'].split():
+            key = _alignment_key(word)
+            if not key or k >= len(word_timings):
+                continue
+            if _alignment_key(word_timings[k][0]) != key:
+                continue
+            if start is None:
+                start = word_timings[k][1]
+            end = word_timings[k][2]
+            k += 1
+        if start is None:
+            return False
+        aligned.append((start, end))
+
+    for timing, (start, end) in zip(subtitle_timings, aligned):
+        timing['start'] = start
+        timing['end'] = end
+    return True
+
+
+def apply_chunk_anchors(subtitle_timings, chunk_timings, offset=0.0):
+    """Fit estimated subtitle times into the spans of chunked TTS synthesis.
+
+    Every subtitle chunk belongs to the TTS chunk its first word was
+    synthesized in (words are counted as in apply_word_timings). The
+    subtitles of each TTS chunk are rescaled linearly into that chunk's
+    start/end, so estimation error doesn't carry over from one chunk to the
+    next.
+
+    Args:
+        subtitle_timings: Subtitle chunk timings, updated in place
+        chunk_timings: "chunks" list of the synthesis timing JSON
+        offset: Seconds of audio before the synthesized speech
+
+    Returns:
+        True if the timings were anchored, False if the words don't line up
+        with the TTS chunks (timings are left untouched)
+    """
+    if not chunk_timings:
+        return False
+    ends = []
+    total = 0
+    for chunk in chunk_timings:
+        total += sum(1 for word in chunk['text'].split() if _alignment_key(word))
+        ends.append(total)
+
+    groups = [[] for _ in chunk_timings]
+    k = 0
+    c = 0
+    for timing in subtitle_timings:
+        while c < len(ends) - 1 and k >= ends[c]:
+            c += 1
+        groups[c].append(timing)
+        k += sum(1 for word in timing['text'].split() if _alignment_key(word))
+    if k != total:
+        return False
+
+    for chunk, group in zip(chunk_timings, groups):
+        if not group:
+            continue
+        start = group[0]['start']
+        span = group[-1]['end'] - start
+        scale = (chunk['end'] - chunk['start']) / span if span > 0 else 0.0
+        for timing in group:
+            timing['start'] = offset + chunk['start'] + (timing['start'] - start) * scale
+            timing['end'] = offset + chunk['start'] + (timing['end'] - start) * scale
+    return True
 
 
 def extract_random_segment(input_video, output_video, target_duration):
-    """Extract a random segment from a video with the specified duration"""
-    # Get total duration of input video
-    total_duration = get_duration(input_video)
+    """Extract a random segment from a video with the specified duration
 
-    # Calculate maximum start time to ensure we can get the full target duration
-    max_start = total_duration - target_duration
+    The start time is a keyframe, so the stream copy starts exactly there. If a
+    vertical mezzanine of the input exists (see generators.asset_library) the
+    segment is cut from it instead and is then already cropped to 9:16.
+    """
+    mezzanine = get_mezzanine(input_video)
+    if mezzanine:
+        logger.info(f"Using vertical mezzanine {mezzanine['path']}")
+        input_video = mezzanine['path']
 
-    if max_start < 0:
-        logger.error(
-            f"Input video ({total_duration:.2f}s) is shorter than target duration ({target_duration:.2f}s)")
+    start_time = choose_segment_start(input_video, target_duration)
+    if start_time is None:
         return None
 
-    # Generate random start time
-    start_time = random.uniform(0, max_start)
-
     # Extract segment using ffmpeg
     try:
         cmd = [
             'ffmpeg', '-y',
-            '-ss', str(start_time),
-            '-i', input_video,
-            '-t', str(target_duration),
+            *build_background_input(input_video, start_time, target_duration),
             '-c', 'copy',
             output_video
         ]
-        subprocess.run(cmd, check=True)
+        run_ffmpeg(cmd, label="extract segment")
         logger.info(
             f"Extracted {target_duration:.2f}s segment starting at {start_time:.2f}s")
         return output_video
@@ -137,7 +223,8 @@ def extract_random_segment(input_video, output_video, target_duration):
 def main(input_source, llm=False, scraped_url='texts/scraped_url.txt', output_pre='texts/processed_output.txt',
          final_output='texts/oof.txt', speech_final='audio/output_converted.wav', subtitle_path='texts/testing.ass',
          output_path='final/final.mp4', speaker_wav="assets/default.mp3", video_path='assets/videos/minecraft.mp4',
-         language="en-us", api_key=None, voice="donald_trump", model="claude", s3_bucket=None, timestamp=None, use_special_effects=True):
+         language="en-us", api_key=None, voice="donald_trump", model="claude", s3_bucket=None, timestamp=None, use_special_effects=True,
+         render_mode=None, render_coordinator=None, profile=None):
     """
     Main function to generate a video from text
 
@@ -159,6 +246,11 @@ def main(input_source, llm=False, scraped_url='texts/scraped_url.txt', output_pr
     - s3_bucket: S3 bucket to upload to
     - timestamp: Timestamp for consistent directory naming
     - use_special_effects: Whether to include special effects (breaks, laughs, etc.)
+    - render_mode: "single_pass", "segmented" or "multi_pass" (defaults to RENDER_CONFIG["mode"])
+    - render_coordinator: Optional BatchRenderCoordinator shared by the voices of
+      one request, so all of them are rendered from a single background decode
+    - profile: Output profile from OUTPUT_PROFILES (defaults to DEFAULT_OUTPUT_PROFILE);
+      "draft" renders a quick low-resolution preview
     """
     # Start timing the entire process
     total_start_time = time.time()
@@ -178,9 +270,22 @@ def main(input_source, llm=False, scraped_url='texts/scraped_url.txt', output_pr
     def log_error(message):
         logger.error(f"{voice_context} {message}")
 
+    if render_mode is None:
+        render_mode = RENDER_CONFIG["mode"]
+    if profile is None:
+        profile = DEFAULT_OUTPUT_PROFILE
+    if profile != DEFAULT_OUTPUT_PROFILE:
+        if render_mode == "multi_pass":
+            # The legacy chain only renders production output
+            render_mode = "single_pass"
+        # Batch renders always use the default profile
+        render_coordinator = None
+
     log_info("Starting video generation pipeline")
     log_info(
         f"Special effects: {'enabled' if use_special_effects else 'disabled'}")
+    log_info(f"Render mode: {render_mode}, output profile: {profile}")
+    log_info(f"CPU threads: {get_process_threads() or 'unrestricted'}")
 
     # Create timestamped output directory with voice name
     if timestamp is None:
@@ -196,10 +301,13 @@ def main(input_source, llm=False, scraped_url='texts/scraped_url.txt', output_pr
     output_paths = {
         'brainrot_text': os.path.join(output_dir, f'{base_filename}_text.txt'),
         'processed_text': os.path.join(output_dir, f'{base_filename}_processed_text.txt'),
-        'audio': os.path.join(output_dir, f'{base_filename}_audio.wav'),
+        'audio': os.path.join(output_dir, f'{base_filename}_audio.mp3'),
         'audio_converted': os.path.join(output_dir, f'{base_filename}_audio_converted.wav'),
+        'audio_mix': os.path.join(output_dir, f'{base_filename}_audio_mix.wav'),
         'subtitle': os.path.join(output_dir, f'{base_filename}_subtitles.ass'),
-        'video': os.path.join(output_dir, f'{base_filename}_final.mp4')
+        'video': os.path.join(
+            output_dir, f'{base_filename}_final.mp4' if profile == DEFAULT_OUTPUT_PROFILE
+            else f'{base_filename}_{profile}.mp4')
     }
 
     # Store timing information
@@ -241,15 +349,17 @@ def main(input_source, llm=False, scraped_url='texts/scraped_url.txt', output_pr
         # AUDIO CONVERSION
         log_info("\n=== STEP 3: AUDIO CONVERSION ===")
         start_time = time.time()
-        audio_wrapper(output_paths['brainrot_text'],
-                      file_path=output_paths['audio'], voice=voice)
-        convert_audio(output_paths['audio'], output_paths['audio_converted'])
-
-        # Add a small silence at the beginning of the audio to help with subtitle synchronization
-        log_info(
-            "Adding initial silence to audio for better subtitle synchronization")
-        add_initial_silence(
-            output_paths['audio_converted'], silence_duration=300)
+        # The TTS output is an MP3, or a WAV for PCM voices and chunked scripts
+        output_paths['audio'] = audio_wrapper(
+            output_paths['brainrot_text'], file_path=output_paths['audio'],
+            voice=voice, convert=False)
+
+        # Decode the TTS output once into the 16kHz mono alignment track and
+        # the full quality mix track, both with a small initial silence to
+        # help with subtitle synchronization
+        leading_silence_ms = 300
+        process_audio(output_paths['audio'], output_paths['audio_converted'],
+                      mix_path=output_paths['audio_mix'], leading_silence_ms=leading_silence_ms)
 
         step_times['audio_conversion'] = time.time() - start_time
         log_info(
@@ -259,26 +369,60 @@ def main(input_source, llm=False, scraped_url='texts/scraped_url.txt', output_pr
         audio_duration = get_audio_duration(output_paths['audio_converted'])
         log_info(f"Audio duration: {format_time(audio_duration)}")
 
-        # Extract video segment matching audio duration
-        log_info("\n=== STEP 4: EXTRACTING VIDEO SEGMENT ===")
-        start_time = time.time()
-        temp_video = os.path.join(output_dir, "temp_video_segment.mp4")
-        if not extract_random_segment(video_path, temp_video, audio_duration):
-            log_error("Failed to extract video segment")
-            raise Exception("Video segment extraction failed")
-        step_times['video_extraction'] = time.time() - start_time
-        log_info(
-            f"Video segment extraction completed in {format_time(step_times['video_extraction'])}")
+        # Prefer the pre-cropped vertical mezzanine of the background if built,
+        # otherwise a pre-cut vertical segment from the warm segment pool
+        mezzanine = get_mezzanine(video_path)
+        pooled_segment = None
+        # Batch renders decode the background once for all voices, don't
+        # claim a pooled segment per voice for them
+        batch_render = render_coordinator is not None and render_mode != "multi_pass"
+        if not mezzanine and not batch_render:
+            pooled_segment = os.path.join(output_dir, "temp_pooled_segment.mp4")
+            if not take_segment(video_path, audio_duration, pooled_segment):
+                pooled_segment = None
+        background_is_vertical = bool(mezzanine or pooled_segment)
+
+        if pooled_segment:
+            # Already cut to length and cropped, render straight from it
+            background_path = pooled_segment
+            segment_start = 0.0
+            temp_video = pooled_segment
+        elif render_mode in ("single_pass", "segmented"):
+            # Segment extraction and cropping happen inside the final render,
+            # only the background offset is chosen here
+            background_path = mezzanine['path'] if mezzanine else video_path
+            segment_start = choose_segment_start(
+                background_path, audio_duration)
+            if segment_start is None:
+                log_error("Background video has no usable duration")
+                raise Exception("Video segment extraction failed")
+            log_info(
+                f"Using {audio_duration:.2f}s background segment starting at {segment_start:.2f}s")
+        else:
+            # Extract video segment matching audio duration
+            log_info("\n=== STEP 4: EXTRACTING VIDEO SEGMENT ===")
+            start_time = time.time()
+            temp_video = os.path.join(output_dir, "temp_video_segment.mp4")
+            if not extract_random_segment(video_path, temp_video, audio_duration):
+                log_error("Failed to extract video segment")
+                raise Exception("Video segment extraction failed")
+            step_times['video_extraction'] = time.time() - start_time
+            log_info(
+                f"Video segment extraction completed in {format_time(step_times['video_extraction'])}")
 
-        # Crop video to vertical format (9:16 aspect ratio)
-        log_info("\n=== STEP 4.5: CROPPING VIDEO TO VERTICAL FORMAT ===")
-        start_time = time.time()
-        vertical_video = os.path.join(output_dir, "temp_vertical_video.mp4")
-        crop_to_vertical(temp_video, vertical_video)
-        temp_video = vertical_video  # Update temp_video to use the cropped version
-        step_times['video_cropping'] = time.time() - start_time
-        log_info(
-            f"Video cropping completed in {format_time(step_times['video_cropping'])}")
+            if mezzanine:
+                log_info("Background mezzanine is already vertical, skipping crop")
+            else:
+                # Crop video to vertical format (9:16 aspect ratio)
+                log_info("\n=== STEP 4.5: CROPPING VIDEO TO VERTICAL FORMAT ===")
+                start_time = time.time()
+                vertical_video = os.path.join(
+                    output_dir, "temp_vertical_video.mp4")
+                crop_to_vertical(temp_video, vertical_video)
+                temp_video = vertical_video  # Update temp_video to use the cropped version
+                step_times['video_cropping'] = time.time() - start_time
+                log_info(
+                    f"Video cropping completed in {format_time(step_times['video_cropping'])}")
 
         # Generate subtitles
         log_info("\n=== STEP 5: GENERATING SUBTITLES ===")
@@ -425,6 +569,46 @@ def main(input_source, llm=False, scraped_url='texts/scraped_url.txt', output_pr
                 'is_question': timing.get('is_question', False)
             })
 
+        # Chunked synthesis recorded where each chunk is in the audio, fit
+        # the estimate into those spans
+        chunk_timing_file = chunk_timing_path(output_paths['audio'])
+        if os.path.exists(chunk_timing_file):
+            with open(chunk_timing_file, 'r', encoding='utf-8') as f:
+                chunk_timings = json.load(f)["chunks"]
+            if apply_chunk_anchors(adjusted_timings, chunk_timings,
+                                   offset=leading_silence_ms / 1000):
+                log_info(f"Anchored subtitle timings to {len(chunk_timings)} TTS chunks")
+
+        # Time subtitles from forced alignment of the script to the speech
+        aligned = False
+        if ALIGNMENT_CONFIG["enabled"]:
+            align_start = time.time()
+            try:
+                # Batched in the shared service when it runs, inline otherwise
+                aligned_words = alignment_service.align(output_paths['audio_converted'], text)
+                if aligned_words is None:
+                    aligned_words = align_speech(output_paths['audio_converted'], text)
+                aligned = bool(aligned_words) and apply_word_timings(
+                    adjusted_timings, aligned_words)
+            except Exception as e:
+                log_error(f"Forced alignment failed, keeping estimated timings: {str(e)}")
+            step_times['alignment'] = time.time() - align_start
+            log_info(
+                f"Forced alignment {'applied' if aligned else 'not applied'} in {step_times['alignment']:.2f}s")
+
+        # Snap estimated subtitle boundaries to the pauses actually in the audio
+        if SILENCE_CONFIG["enabled"] and not aligned:
+            detect_start = time.time()
+            silence_periods = detect_silences(output_paths['audio_converted'])
+            entries = [SubtitleEntry(timing['text'], timing['start'], timing['end'])
+                       for timing in adjusted_timings]
+            adjust_subtitles_with_silence_data(entries, silence_periods, audio_duration)
+            for timing, entry in zip(adjusted_timings, entries):
+                timing['start'] = entry.start_time
+                timing['end'] = entry.end_time
+            log_info(
+                f"Aligned subtitles with {len(silence_periods)} pauses in {time.time() - detect_start:.3f}s")
+
         # Create the ASS subtitle file
         with open(output_paths['subtitle'], 'w', encoding='utf-8') as f:
             # Header
@@ -488,15 +672,57 @@ def main(input_source, llm=False, scraped_url='texts/scraped_url.txt', output_pr
         log_info("\n=== STEP 6: VIDEO GENERATION ===")
         start_time = time.time()
 
-        # Combine audio with subtitles and video
-        log_info(f"Adding subtitles and audio to video...")
-        success = add_subtitles_and_overlay_audio(
-            input_video_path=temp_video,
-            subtitle_file_path=output_paths['subtitle'],
-            audio_file_path=output_paths['audio_converted'],
-            output_path=output_paths['video'],
-            temp_dir=output_dir
-        )
+        success = False
+        if batch_render:
+            log_info("Submitting video to the shared multi-voice render...")
+            success = render_coordinator.request_render({
+                'voice': voice,
+                'subtitle': output_paths['subtitle'],
+                'audio': output_paths['audio_mix'],
+                'output': output_paths['video'],
+                'duration': audio_duration
+            }, timeout=audio_duration + (FFMPEG_RUNNER_CONFIG["stall_timeout"] or 0))
+            if not success:
+                log_info("Batch render unavailable, rendering this voice on its own")
+
+        if not success:
+            if render_mode == "segmented":
+                log_info("Rendering background, subtitles and audio in parallel chunks...")
+                success = render_segmented(
+                    input_video_path=background_path,
+                    subtitle_file_path=output_paths['subtitle'],
+                    audio_file_path=output_paths['audio_mix'],
+                    output_path=output_paths['video'],
+                    temp_dir=output_dir,
+                    start_time=segment_start,
+                    duration=audio_duration,
+                    crop=not background_is_vertical,
+                    profile=profile
+                )
+            elif render_mode == "single_pass":
+                log_info("Rendering background, subtitles and audio in a single pass...")
+                success = render_single_pass(
+                    input_video_path=background_path,
+                    subtitle_file_path=output_paths['subtitle'],
+                    audio_file_path=output_paths['audio_mix'],
+                    output_path=output_paths['video'],
+                    start_time=segment_start,
+                    duration=audio_duration,
+                    crop=not background_is_vertical,
+                    profile=profile
+                )
+            else:
+                # Combine audio with subtitles and video
+                log_info(f"Adding subtitles and audio to video...")
+                success = add_subtitles_and_overlay_audio(
+                    input_video_path=temp_video,
+                    subtitle_file_path=output_paths['subtitle'],
+                    audio_file_path=output_paths['audio_mix'],
+                    output_path=output_paths['video'],
+                    temp_dir=output_dir
+                )
+        if not success:
+            log_error("Video rendering failed")
 
         step_times['video_generation'] = time.time() - start_time
         log_info(
@@ -0,0 +1,126 @@
+"""
+Cross-process coordination of multi-voice batch renders.
+
+Each voice of a /generate request runs in its own worker process. Instead of
+rendering independently, a worker hands its finished audio and subtitles to
+the coordinator (running in the server process) and waits. Once every voice
+has either submitted or failed, the coordinator renders all submitted videos
+from one background decode and tells each worker whether it succeeded. A
+worker whose batch render failed falls back to rendering on its own.
+"""
+
+import queue
+import logging
+from generators.video_generator import choose_segment_start
+from generators.asset_library import get_mezzanine
+from generators.multi_output_render import render_multi_output
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+
+class BatchRenderCoordinator:
+    """Collects render jobs from voice workers and renders them together.
+
+    The object only holds multiprocessing.Manager proxies, so it can be passed
+    to ProcessPoolExecutor workers as an argument.
+    """
+
+    def __init__(self, voices, video_path, manager, threads=None):
+        self.voices = list(voices)
+        self.video_path = video_path
+        self.threads = threads
+        self._jobs = manager.Queue()
+        self._results = manager.dict()
+        self._events = {voice: manager.Event() for voice in self.voices}
+        # Guards the hand-over between a worker giving up and the batch starting
+        self._lock = manager.Lock()
+        self._started = manager.Event()
+        self._withdrawn = manager.dict()
+
+    def request_render(self, job, timeout=None):
+        """Worker side: submit a render job and wait for the batch to finish.
+
+        If the batch hasn't started within `timeout`, the job is withdrawn so
+        the worker can render it on its own. Once the batch has started it
+        writes this job's output, so the worker waits for it to finish; the
+        render itself is bounded by the ffmpeg runner's stall timeout.
+
+        Args:
+            job: Dict with "voice", "subtitle", "audio", "output" and "duration"
+            timeout: Maximum time to wait for the batch to start, in seconds
+                (None waits indefinitely)
+
+        Returns:
+            True if the batch rendered this job's video, False otherwise
+        """
+        voice = job["voice"]
+        if voice not in self._events:
+            return False
+        self._jobs.put(job)
+        if not self._events[voice].wait(timeout):
+            with self._lock:
+                if not self._started.is_set():
+                    self._withdrawn[voice] = True
+                    logger.warning(f"[{voice}] Timed out waiting for the other voices to submit")
+                    return False
+            logger.info(f"[{voice}] Batch render in progress, waiting for it to finish")
+            self._events[voice].wait()
+        return bool(self._results.get(voice, False))
+
+    def run(self, future_to_voice, poll_interval=0.5):
+        """Server side: gather jobs until every voice submitted or finished, then render.
+
+        Args:
+            future_to_voice: Mapping of worker futures to their voice
+            poll_interval: How often to check for failed workers, in seconds
+        """
+        pending = set(self.voices)
+        jobs = {}
+        success = False
+
+        try:
+            while pending:
+                try:
+                    job = self._jobs.get(timeout=poll_interval)
+                    jobs[job["voice"]] = job
+                    pending.discard(job["voice"])
+                    continue
+                except queue.Empty:
+                    pass
+                # Workers that finished without submitting a job have failed
+                for future, voice in future_to_voice.items():
+                    if future.done() and voice not in jobs:
+                        pending.discard(voice)
+
+            with self._lock:
+                for voice in self._withdrawn.keys():
+                    jobs.pop(voice, None)
+                self._started.set()
+
+            if jobs:
+                success = self._render(list(jobs.values()))
+        except Exception as e:
+            logger.error(f"Batch render failed: {str(e)}")
+        finally:
+            # Always answer, so no worker waits on a coordinator that gave up
+            self._started.set()
+            for voice in self.voices:
+                self._results[voice] = success and voice in jobs
+                self._events[voice].set()
+
+    def _render(self, jobs):
+        """Render all jobs from a single decode of the background video"""
+        mezzanine = get_mezzanine(self.video_path)
+        background_path = mezzanine['path'] if mezzanine else self.video_path
+
+        max_duration = max(job["duration"] for job in jobs)
+        start_time = choose_segment_start(background_path, max_duration)
+        if start_time is None:
+            return False
+
+        logger.info(
+            f"Batch rendering {len(jobs)} voices from one background decode "
+            f"({max_duration:.2f}s starting at {start_time:.2f}s)")
+        return render_multi_output(background_path, start_time, jobs,
+                                   crop=not mezzanine, threads=self.threads)
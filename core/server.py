@@ -3,8 +3,14 @@ from flask_cors import CORS  # Add CORS support
 from core.db_client import SupabaseClient
 from utils.audio import VOICE_IDS
 from generators.brainrot_generator import MODELS, VOICES, VOICE_PROMPTS
+from generators import model_registry, alignment_service
 from core.main import main
+from utils.cpu_budget import CpuBudget, init_worker
+from utils import tts_cache
+from constants import (AVAILABLE_VIDEOS, CPU_BUDGET_CONFIG, MEZZANINE_CONFIG, RENDER_CONFIG,
+                       SEGMENT_POOL_CONFIG, ALIGNMENT_CONFIG, ALIGNMENT_MODEL_CONFIG)
 import os
+import shutil
 import tempfile
 import traceback  # Add this for better error tracking
 from dotenv import load_dotenv
@@ -54,18 +60,70 @@ except Exception as e:
     SUPABASE_ENABLED = False
     print(f"Failed to initialize Supabase client: {e}")
 
-# Available background videos
-AVAILABLE_VIDEOS = {
-    "minecraft": "assets/videos/minecraft.mp4",
-    "subway": "assets/subway.mp4"
-}
-
 # Configure AWS credentials if provided
 if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY:
     os.environ['AWS_ACCESS_KEY_ID'] = AWS_ACCESS_KEY_ID
     os.environ['AWS_SECRET_ACCESS_KEY'] = AWS_SECRET_ACCESS_KEY
     os.environ['AWS_DEFAULT_REGION'] = AWS_REGION
 
+# Cores shared by all concurrent generation requests
+cpu_budget = CpuBudget(
+    reserved_cores=CPU_BUDGET_CONFIG["reserved_cores"],
+    max_threads_per_worker=CPU_BUDGET_CONFIG["max_threads_per_worker"])
+
+
+def server_is_idle():
+    """Return True when no request or background job holds CPU budget"""
+    return cpu_budget.snapshot()["active_allocations"] == 0
+
+
+def prepare_mezzanines_in_budget():
+    """Build missing mezzanines using a single-worker share of the CPU budget"""
+    from generators.asset_library import prepare_all
+    allocation = cpu_budget.reserve(1, label="mezzanine preparation")
+    try:
+        prepare_all(threads=allocation.threads_per_worker)
+    finally:
+        cpu_budget.release(allocation)
+
+
+def start_background_services():
+    """Start long-running helpers that should run alongside the web server"""
+    service = alignment_service.start()
+
+    if MEZZANINE_CONFIG["prepare_on_startup"]:
+        thread = threading.Thread(
+            target=prepare_mezzanines_in_budget, name="MezzaninePrep", daemon=True)
+        thread.start()
+        logger.info("Started background mezzanine preparation")
+
+    if (ALIGNMENT_CONFIG["enabled"] and ALIGNMENT_MODEL_CONFIG["warm_up_on_startup"]
+            and service is None):
+        # Workers forked afterwards inherit the resident model
+        thread = threading.Thread(
+            target=model_registry.warm_up, name="ModelWarmUp", daemon=True)
+        thread.start()
+        logger.info("Started alignment model warm-up")
+
+    if SEGMENT_POOL_CONFIG["enabled"]:
+        from generators.segment_pool import refill_loop
+        thread = threading.Thread(
+            target=refill_loop, args=(server_is_idle,), name="SegmentPool", daemon=True)
+        thread.start()
+        logger.info("Started background segment pool refill")
+
+
+def run_server(host='0.0.0.0', port=5500, debug=True):
+    """Start the background services and the Flask development server.
+
+    In debug mode the Werkzeug reloader serves the app from a child process
+    while the parent only watches for code changes, so the services are
+    started in the serving process only.
+    """
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services()
+    app.run(debug=debug, host=host, port=port)
+
 
 def check_required_files():
     """Check if all required files and directories exist"""
@@ -129,7 +187,7 @@ def index():
 
 
 # Define process_voice function at module level for multiprocessing compatibility
-def process_voice(voice, text, word_count, digest_id, title, description, model, video, temp_path, request_id, use_special_effects=True):
+def process_voice(voice, text, word_count, digest_id, title, description, model, video, temp_path, request_id, use_special_effects=True, render_coordinator=None):
     """Process a single voice generation request"""
     logger.info(f"=== STARTING VOICE GENERATION: {voice} ===")
 
@@ -263,7 +321,8 @@ def process_voice(voice, text, word_count, digest_id, title, description, model,
                       model=model, video_path=available_video_path,
                       s3_bucket=S3_BUCKET, timestamp=timestamp,
                       api_key=os.getenv('OPENAI_API_KEY'),
-                      use_special_effects=use_special_effects)
+                      use_special_effects=use_special_effects,
+                      render_coordinator=render_coordinator)
 
         process_end = datetime.now()
         process_duration = (process_end - process_start).total_seconds()
@@ -474,6 +533,33 @@ def process_voice(voice, text, word_count, digest_id, title, description, model,
         f"=== COMPLETED VOICE GENERATION: {voice} in {total_duration:.2f} seconds ===")
     return voice_result
 
+def create_render_coordinator(voices, video, allocation):
+    """Create a batch render coordinator for a multi-voice request.
+
+    Every voice must have its own worker: workers block until the whole batch
+    is rendered, so a voice still queued behind them would never submit. The
+    batch render runs while all workers wait, so it gets the request's whole
+    CPU allocation.
+
+    Returns:
+        (coordinator, manager), or (None, None) when batch rendering is not used
+    """
+    if len(voices) < 2 or not RENDER_CONFIG["batch_voices"] or RENDER_CONFIG["mode"] == "multi_pass":
+        return None, None
+    if allocation.workers < len(voices):
+        logger.info(
+            f"Not enough workers ({allocation.workers}) to batch render {len(voices)} voices")
+        return None, None
+
+    from core.render_coordinator import BatchRenderCoordinator
+    manager = multiprocessing.Manager()
+    coordinator = BatchRenderCoordinator(
+        voices, AVAILABLE_VIDEOS[video], manager, threads=allocation.cores)
+    logger.info(
+        f"Rendering {len(voices)} voices from a shared background decode")
+    return coordinator, manager
+
+
 # Define wrapper function at module level
 
 
@@ -481,11 +567,13 @@ def process_voice_wrapper(args):
     """Wrapper function for process_voice for use with multiprocessing.
 
     Args:
-        args (tuple): Tuple of arguments for process_voice
+        args (tuple): Tuple of arguments for process_voice, optionally followed
+            by a BatchRenderCoordinator
     """
     try:
         # Unpack the arguments tuple
-        voice, text, word_count, digest_id, title, description, model, video, temp_path, request_id, use_special_effects = args
+        voice, text, word_count, digest_id, title, description, model, video, temp_path, request_id, use_special_effects = args[:11]
+        render_coordinator = args[11] if len(args) > 11 else None
 
         print("process_voice_wrapper received parameters:")
         print(f"  voice: {voice}")
@@ -498,7 +586,7 @@ def process_voice_wrapper(args):
         multiprocessing.current_process().name = f"Voice-{voice}"
 
         # Call the main processing function
-        return process_voice(voice, text, word_count, digest_id, title, description, model, video, temp_path, request_id, use_special_effects)
+        return process_voice(voice, text, word_count, digest_id, title, description, model, video, temp_path, request_id, use_special_effects, render_coordinator)
     except Exception as e:
         # Log any exceptions that occur in the worker process
         error_details = {
@@ -597,45 +685,66 @@ def generate():
             logger.info(f"Input text contains {word_count} words")
 
             # Use ProcessPoolExecutor to process voices concurrently with true parallelism
-            # Determine optimal number of workers based on CPU cores
-            # Typically use n_cores-1 to leave one core for the OS and other tasks
-            max_workers = min(len(voices), max(
-                1, multiprocessing.cpu_count() - 1))
+            # Reserve workers and threads per worker from the shared CPU budget so
+            # overlapping requests don't oversubscribe the machine
+            allocation = cpu_budget.reserve(len(voices), label=request_id)
+            max_workers = allocation.workers
             logger.info(
-                f"Starting parallel processing with {max_workers} processes for {len(voices)} voices")
+                f"Starting parallel processing with {max_workers} processes for {len(voices)} voices "
+                f"({allocation.threads_per_worker} threads each)")
 
             # For /generate route, set use_special_effects to False
             use_special_effects = False
             logger.info(f"Processing without special effects")
 
-            # Use ProcessPoolExecutor for true parallel execution
-            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
-                # Submit all voice processing jobs
-                future_to_voice = {}
-                for voice in voices:
-                    # Log the digest_id before submitting the job
-                    logger.info(
-                        f"Submitting job for voice {voice} with digest_id: {digest_id}")
-
-                    args = (voice, text, word_count, digest_id, title,
-                            description, model, video, temp_path, request_id, use_special_effects)
-                    future = executor.submit(process_voice_wrapper, args)
-                    future_to_voice[future] = voice
-
-                # Collect results as they complete
-                results = {}
-                for future in concurrent.futures.as_completed(future_to_voice):
-                    voice = future_to_voice[future]
-                    try:
-                        voice_result = future.result()
-                        # Example: {"success": 1, "voice": "voice1", "video_url": "https://example.com/video1.mp4", "s3_url": "https://example.com/video1.mp4"}
-                        results[voice] = voice_result
+            try:
+                # Share one background decode between all voices of the request
+                render_coordinator, render_manager = create_render_coordinator(
+                    voices, video, allocation)
+
+                # Use ProcessPoolExecutor for true parallel execution
+                with concurrent.futures.ProcessPoolExecutor(
+                        max_workers=max_workers, initializer=init_worker,
+                        initargs=(allocation.threads_per_worker,)) as executor:
+                    # Submit all voice processing jobs
+                    future_to_voice = {}
+                    for voice in voices:
+                        # Log the digest_id before submitting the job
                         logger.info(
-                            f"Successfully collected result for voice: {voice}")
-                    except Exception as e:
-                        logger.error(
-                            f"Error processing voice {voice}: {str(e)}")
-                        results[voice] = {"success": 0, "error": str(e)}
+                            f"Submitting job for voice {voice} with digest_id: {digest_id}")
+
+                        args = (voice, text, word_count, digest_id, title,
+                                description, model, video, temp_path, request_id, use_special_effects,
+                                render_coordinator)
+                        future = executor.submit(process_voice_wrapper, args)
+                        future_to_voice[future] = voice
+
+                    if render_coordinator:
+                        coordinator_thread = threading.Thread(
+                            target=render_coordinator.run, args=(future_to_voice,),
+                            name="BatchRender", daemon=True)
+                        coordinator_thread.start()
+
+                    # Collect results as they complete
+                    results = {}
+                    for future in concurrent.futures.as_completed(future_to_voice):
+                        voice = future_to_voice[future]
+                        try:
+                            voice_result = future.result()
+                            # Example: {"success": 1, "voice": "voice1", "video_url": "https://example.com/video1.mp4", "s3_url": "https://example.com/video1.mp4"}
+                            results[voice] = voice_result
+                            logger.info(
+                                f"Successfully collected result for voice: {voice}")
+                        except Exception as e:
+                            logger.error(
+                                f"Error processing voice {voice}: {str(e)}")
+                            results[voice] = {"success": 0, "error": str(e)}
+
+                if render_coordinator:
+                    coordinator_thread.join()
+                    render_manager.shutdown()
+            finally:
+                cpu_budget.release(allocation)
 
             # Clean up the temporary file
             try:
@@ -795,44 +904,66 @@ def generate_special_effects():
         logger.info(f"Input text contains {word_count} words")
 
         # Use ProcessPoolExecutor to process voices concurrently with true parallelism
-        # Determine optimal number of workers based on CPU cores
-        # Typically use n_cores-1 to leave one core for the OS and other tasks
-        max_workers = min(len(voices), max(1, multiprocessing.cpu_count() - 1))
+        # Reserve workers and threads per worker from the shared CPU budget so
+        # overlapping requests don't oversubscribe the machine
+        allocation = cpu_budget.reserve(len(voices), label=request_id)
+        max_workers = allocation.workers
         logger.info(
-            f"Starting parallel processing with {max_workers} processes for {len(voices)} voices")
+            f"Starting parallel processing with {max_workers} processes for {len(voices)} voices "
+            f"({allocation.threads_per_worker} threads each)")
 
         # For /generate_special_effects route, set use_special_effects to True
         use_special_effects = True
         logger.info(f"Processing with special effects enabled")
 
-        # Use ProcessPoolExecutor for true parallel execution
-        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all voice processing jobs
-            future_to_voice = {}
-            for voice in voices:
-                # Log the digest_id before submitting the job
-                logger.info(
-                    f"Submitting job for voice {voice} with digest_id: {digest_id}")
-
-                args = (voice, text, word_count, digest_id, title,
-                        description, model, video, temp_path, request_id, use_special_effects)
-                future = executor.submit(process_voice_wrapper, args)
-                future_to_voice[future] = voice
+        try:
+            # Share one background decode between all voices of the request
+            render_coordinator, render_manager = create_render_coordinator(
+                voices, video, allocation)
 
-            # Collect results as they complete
-            results = {}
-            for future in concurrent.futures.as_completed(future_to_voice):
-                voice = future_to_voice[future]
-                try:
-                    voice_result = future.result()
-                    # Example: {"success": 1, "voice": "voice1", "video_url": "https://example.com/video1.mp4", "s3_url": "https://example.com/video1.mp4"}
-                    results[voice] = voice_result
+            # Use ProcessPoolExecutor for true parallel execution
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=max_workers, initializer=init_worker,
+                    initargs=(allocation.threads_per_worker,)) as executor:
+                # Submit all voice processing jobs
+                future_to_voice = {}
+                for voice in voices:
+                    # Log the digest_id before submitting the job
                     logger.info(
-                        f"Successfully collected result for voice: {voice}")
-                except Exception as e:
-                    logger.error(
-                        f"Error processing voice {voice}: {str(e)}")
-                    results[voice] = {"success": 0, "error": str(e)}
+                        f"Submitting job for voice {voice} with digest_id: {digest_id}")
+
+                    args = (voice, text, word_count, digest_id, title,
+                            description, model, video, temp_path, request_id, use_special_effects,
+                            render_coordinator)
+                    future = executor.submit(process_voice_wrapper, args)
+                    future_to_voice[future] = voice
+
+                if render_coordinator:
+                    coordinator_thread = threading.Thread(
+                        target=render_coordinator.run, args=(future_to_voice,),
+                        name="BatchRender", daemon=True)
+                    coordinator_thread.start()
+
+                # Collect results as they complete
+                results = {}
+                for future in concurrent.futures.as_completed(future_to_voice):
+                    voice = future_to_voice[future]
+                    try:
+                        voice_result = future.result()
+                        # Example: {"success": 1, "voice": "voice1", "video_url": "https://example.com/video1.mp4", "s3_url": "https://example.com/video1.mp4"}
+                        results[voice] = voice_result
+                        logger.info(
+                            f"Successfully collected result for voice: {voice}")
+                    except Exception as e:
+                        logger.error(
+                            f"Error processing voice {voice}: {str(e)}")
+                        results[voice] = {"success": 0, "error": str(e)}
+
+            if render_coordinator:
+                coordinator_thread.join()
+                render_manager.shutdown()
+        finally:
+            cpu_budget.release(allocation)
 
         # Clean up the temporary file
         try:
@@ -951,9 +1082,102 @@ def process_single_voice(voice, digest_id, digest, content, temp_path, model, vi
         }
 
 
+def preview_voice(text, voice, model, video, use_special_effects=False, profile="draft"):
+    """Render a preview of one voice with a fast output profile.
+
+    Nothing is uploaded to S3 or recorded in Supabase.
+
+    Returns:
+        Path of the rendered preview
+    """
+    multiprocessing.current_process().name = f"Preview-{voice}"
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as f:
+        f.write(text)
+        text_path = f.name
+
+    try:
+        result = main(text_path, llm=False, voice=voice, model=model,
+                      video_path=AVAILABLE_VIDEOS[video], s3_bucket=None,
+                      timestamp=int(time.time()),
+                      api_key=os.getenv('OPENAI_API_KEY'),
+                      use_special_effects=use_special_effects,
+                      profile=profile)
+        video_path = result[0] if isinstance(result, tuple) else result
+        return video_path
+    finally:
+        try:
+            os.remove(text_path)
+        except OSError:
+            pass
+
+
+@app.route('/preview', methods=['POST'])
+def preview():
+    """Render a quick draft (OUTPUT_PROFILES["draft"]) of a script for review"""
+    data = request.get_json() or {}
+    text = data.get('text', '')
+    voice = data.get('voice') or next(iter(data.get('voices', [])), None)
+    model = data.get('model', 'o3mini')
+    video = data.get('video', 'minecraft')
+    use_special_effects = bool(data.get('use_special_effects', False))
+
+    request_id = f"preview-{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    logger.info(f"=== RECEIVED PREVIEW REQUEST {request_id} ===")
+    logger.info(f"Voice: {voice}, Model: {model}, Video: {video}")
+
+    if not text:
+        return jsonify({'error': 'Text is required'}), 400
+    if voice not in VOICES:
+        return jsonify({'error': f'Invalid voice. Available voices: {list(VOICES.keys())}'}), 400
+    if video not in AVAILABLE_VIDEOS:
+        return jsonify({'error': f'Invalid video. Available videos: {list(AVAILABLE_VIDEOS.keys())}'}), 400
+
+    missing_keys = [key for key in ('OPENAI_API_KEY', 'FISH_API_KEY') if not os.getenv(key)]
+    if missing_keys:
+        error_msg = f"Missing required API keys: {', '.join(missing_keys)}. Set these environment variables."
+        logger.error(error_msg)
+        return jsonify({'error': error_msg}), 400
+
+    start_time = time.time()
+    allocation = cpu_budget.reserve(1, label=request_id)
+    try:
+        # Run in a worker process like /generate, within the CPU budget
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=1, initializer=init_worker,
+                initargs=(allocation.threads_per_worker,)) as executor:
+            video_path = executor.submit(
+                preview_voice, text, voice, model, video, use_special_effects).result()
+    except Exception as e:
+        logger.error(f"Error in /preview route: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"success": 0, "error": str(e)}), 500
+    finally:
+        cpu_budget.release(allocation)
+
+    if not video_path or not os.path.exists(video_path):
+        return jsonify({"success": 0, "error": "Preview render failed"}), 500
+
+    # Move the draft next to the production videos so /final/ serves it
+    os.makedirs('final', exist_ok=True)
+    preview_name = f"{request_id}_{voice}.mp4"
+    shutil.move(video_path, os.path.join('final', preview_name))
+
+    render_seconds = time.time() - start_time
+    logger.info(f"=== COMPLETED PREVIEW {request_id} in {render_seconds:.2f} seconds ===")
+    return jsonify({
+        "success": 1,
+        "request_id": request_id,
+        "voice": voice,
+        "profile": "draft",
+        "video_url": f"/final/{preview_name}",
+        "render_seconds": round(render_seconds, 2)
+    })
+
+
 @app.route('/final/<path:filename>')
 def serve_video(filename):
-    return send_from_directory('final', filename)
+    # Absolute, Flask resolves relative directories against the package, not the cwd
+    return send_from_directory(os.path.abspath('final'), filename)
 
 
 @app.route('/available_voices', methods=['GET'])
@@ -983,7 +1207,11 @@ def get_status():
         "supabase_enabled": SUPABASE_ENABLED,
         "available_voices": list(VOICE_IDS.keys()),
         "available_models": list(MODELS.keys()),
-        "available_videos": list(AVAILABLE_VIDEOS.keys())
+        "available_videos": list(AVAILABLE_VIDEOS.keys()),
+        "cpu_budget": cpu_budget.snapshot(),
+        "tts_cache": tts_cache.stats(),
+        "alignment_model": model_registry.status(),
+        "alignment_service": alignment_service.status()
     }
 
     # Add Supabase stats if enabled
@@ -1023,4 +1251,4 @@ if __name__ == "__main__":
     print(f"S3 integration: {'Enabled' if S3_BUCKET else 'Disabled'}")
 
     print("\nStarting Flask server...")
-    app.run(debug=True, host='0.0.0.0', port=5500)
+    run_server(host='0.0.0.0', port=5500, debug=True)
@@ -0,0 +1,488 @@
+"""
+CTC forced alignment backends.
+
+`trellis_algo()` in generators.force_alignment fills the trellis with one
+Python iteration of small torch ops per emission frame. This module aligns a
+transcript against an emission matrix with the fastest backend available:
+
+- "torchaudio": `torchaudio.functional.forced_align` (C++/CUDA, torchaudio >= 2.1)
+- "numba": the trellis recurrence compiled with Numba
+- "numpy": the recurrence vectorized over tokens, one NumPy step per frame
+
+The Numba and NumPy backends only materialize the trellis cells within
+ALIGNMENT_CONFIG["band_tokens"] of the time/token diagonal, so memory grows
+with the audio length only, not with length x script size. The band is
+widened until the path found in it is provably the full trellis optimum.
+
+All backends return the same frame-level path of Point objects, which
+`word_timings()` turns into per-word times. force_alignment.trellis_algo
+stays as the reference implementation (see tests/benchmark_alignment.py).
+"""
+
+import re
+import sys
+import logging
+from dataclasses import dataclass
+import numpy as np
+from constants import ALIGNMENT_CONFIG
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+# Speech effect markers such as (break) or *pinches fingers* are not spoken
+EFFECT_MARKER_PATTERN = re.compile(r'\([^)]*\)|\*[^*]*\*')
+
+BACKENDS = ("torchaudio", "numba", "numpy")
+
+# Audio samples per wav2vec2 emission frame (product of the conv feature extractor strides)
+WAV2VEC2_FRAME_STRIDE = 320
+
+
+@dataclass
+class Point:
+    token_index: int
+    time_index: int
+    score: float
+
+
+def _torchaudio_functional(load=False):
+    """Return torchaudio.functional if it has forced_align, else None.
+
+    Only imported when torch is already loaded (or `load` is set), so
+    workers computing emissions with ONNX Runtime don't pull in torch.
+    """
+    if "torch" not in sys.modules and not load:
+        return None
+    try:
+        import torchaudio.functional as audio_functional
+    except ImportError:
+        return None
+    return audio_functional if hasattr(audio_functional, "forced_align") else None
+
+
+def available_backends():
+    """Return the usable backends, fastest first"""
+    backends = []
+    if _torchaudio_functional() is not None:
+        backends.append("torchaudio")
+    if numba is not None:
+        backends.append("numba")
+    backends.append("numpy")
+    return backends
+
+
+def _resolve_backend(backend):
+    """Pick the requested (or configured, or fastest) available backend"""
+    backend = backend or ALIGNMENT_CONFIG["backend"]
+    available = available_backends()
+    if backend is None:
+        return available[0]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown alignment backend '{backend}', expected one of {BACKENDS}")
+    if backend == "torchaudio" and _torchaudio_functional(load=True) is not None:
+        return backend
+    if backend not in available:
+        logger.warning(f"Alignment backend '{backend}' is not available, using {available[0]}")
+        return available[0]
+    return backend
+
+
+def prepare_transcript(text, labels, separator="|"):
+    """Normalize a script into alignment tokens.
+
+    Effect markers are dropped, words are upper-cased and reduced to
+    characters in the label set, and joined as "|WORD|WORD|".
+
+    Returns:
+        (words, transcript, tokens): the original words that are aligned,
+        the label string and its token ids
+    """
+    dictionary = {c: i for i, c in enumerate(labels)}
+    words = []
+    normalized = []
+    for word in EFFECT_MARKER_PATTERN.sub(' ', text).split():
+        letters = ''.join(c for c in word.upper() if c in dictionary and c != separator)
+        if letters:
+            words.append(word)
+            normalized.append(letters)
+
+    if not words:
+        raise ValueError("Transcript has no alignable words")
+    transcript = separator + separator.join(normalized) + separator
+    tokens = [dictionary[c] for c in transcript]
+    return words, transcript, tokens
+
+
+class AlignmentBandError(ValueError):
+    """Raised when the best path leaves the band of a banded trellis"""
+
+
+def _first_column(emission, num_tokens, blank_id):
+    """Values of the first trellis column (only blanks emitted so far)"""
+    column = np.zeros(emission.shape[0], dtype=np.float32)
+    column[1:] = np.cumsum(emission[1:, blank_id])
+    column[-num_tokens + 1:] = np.inf
+    return column
+
+
+def _init_trellis(emission, tokens, blank_id):
+    """Allocate the trellis with the first column and row filled in"""
+    num_frame = emission.shape[0]
+    num_tokens = len(tokens)
+    trellis = np.zeros((num_frame, num_tokens), dtype=np.float32)
+    trellis[:, 0] = _first_column(emission, num_tokens, blank_id)
+    trellis[0, 1:] = -np.inf
+    return trellis
+
+
+def _fill_trellis_loops(emission, tokens, blank_id, trellis):
+    """Trellis recurrence as plain loops (compiled by Numba)"""
+    num_frame, num_tokens = trellis.shape
+    for t in range(num_frame - 1):
+        stay = emission[t, blank_id]
+        for j in range(1, num_tokens):
+            stayed = trellis[t, j] + stay
+            changed = trellis[t, j - 1] + emission[t, tokens[j]]
+            trellis[t + 1, j] = stayed if stayed > changed else changed
+
+
+def band_offsets(num_frame, num_tokens, half_width):
+    """First token index stored for every frame of a banded trellis.
+
+    The band follows the straight line from (0, 0) to (last frame, last
+    token), `half_width` tokens either side of it.
+
+    Returns:
+        (offsets, width): int64 array of per-frame offsets and the band width
+    """
+    width = min(2 * half_width + 1, num_tokens)
+    diagonal = np.round(np.arange(num_frame) * (num_tokens - 1) / max(1, num_frame - 1))
+    offsets = np.clip(diagonal.astype(np.int64) - half_width, 0, num_tokens - width)
+    return offsets, width
+
+
+def _fill_band_loops(emission, tokens, blank_id, offsets, first_column, band):
+    """Banded trellis recurrence as plain loops (compiled by Numba)"""
+    num_frame, width = band.shape
+    for t in range(num_frame - 1):
+        shift = offsets[t + 1] - offsets[t]
+        stay = emission[t, blank_id]
+        for k in range(width):
+            j = offsets[t + 1] + k
+            if j == 0:
+                band[t + 1, k] = first_column[t + 1]
+                continue
+            # Cell (t, j) and (t, j - 1) in the previous row of the band
+            p = k + shift
+            stayed = band[t, p] + stay if p < width else -np.inf
+            changed = band[t, p - 1] + emission[t, tokens[j]] if 0 < p <= width else -np.inf
+            band[t + 1, k] = stayed if stayed > changed else changed
+
+
+if numba is not None:
+    _fill_trellis_numba = numba.njit(cache=True, nogil=True)(_fill_trellis_loops)
+    _fill_band_numba = numba.njit(cache=True, nogil=True)(_fill_band_loops)
+
+
+def _check_length(emission, tokens):
+    if emission.shape[0] < len(tokens):
+        raise ValueError(
+            f"Audio too short to align: {emission.shape[0]} frames for {len(tokens)} tokens")
+
+
+def compute_trellis(emission, tokens, blank_id=0, backend="numpy"):
+    """Compute the alignment trellis of a (frames, labels) log-probability matrix"""
+    emission = np.ascontiguousarray(emission, dtype=np.float32)
+    tokens = np.asarray(tokens, dtype=np.int64)
+    _check_length(emission, tokens)
+
+    trellis = _init_trellis(emission, tokens, blank_id)
+    if backend == "numba":
+        _fill_trellis_numba(emission, tokens, blank_id, trellis)
+        return trellis
+
+    change = emission[:, tokens[1:]]  # Emission of the next token, all frames at once
+    stay = emission[:, blank_id]
+    for t in range(emission.shape[0] - 1):
+        np.maximum(trellis[t, 1:] + stay[t], trellis[t, :-1] + change[t],
+                   out=trellis[t + 1, 1:])
+    return trellis
+
+
+def compute_band(emission, tokens, half_width, blank_id=0, backend="numpy"):
+    """Compute only the cells of the trellis within half_width tokens of the diagonal.
+
+    Memory is num_frame x (2 * half_width + 1) instead of num_frame x num_tokens.
+
+    Returns:
+        (band, offsets): band[t, k] holds trellis cell (t, offsets[t] + k)
+    """
+    emission = np.ascontiguousarray(emission, dtype=np.float32)
+    tokens = np.asarray(tokens, dtype=np.int64)
+    _check_length(emission, tokens)
+
+    num_frame = emission.shape[0]
+    offsets, width = band_offsets(num_frame, len(tokens), half_width)
+    first_column = _first_column(emission, len(tokens), blank_id)
+    band = np.empty((num_frame, width), dtype=np.float32)
+    band[0] = -np.inf
+    band[0, 0] = first_column[0]  # offsets[0] is always 0
+
+    if backend == "numba":
+        _fill_band_numba(emission, tokens, blank_id, offsets, first_column, band)
+        return band, offsets
+
+    previous = np.full(width + 2, -np.inf, dtype=np.float32)
+    columns = np.arange(width)
+    for t in range(num_frame - 1):
+        shift = offsets[t + 1] - offsets[t]
+        # previous[1 + i] is cell (t, offsets[t] + i), padded with -inf
+        previous[1:width + 1] = band[t]
+        previous[width + 1:] = -np.inf
+        extended = previous if shift <= 1 else np.concatenate(
+            (previous, np.full(shift, -np.inf, dtype=np.float32)))
+        stayed = extended[1 + shift:1 + shift + width] + emission[t, blank_id]
+        changed = extended[shift:shift + width] + emission[t, tokens[offsets[t + 1] + columns]]
+        np.maximum(stayed, changed, out=band[t + 1])
+        if offsets[t + 1] == 0:
+            band[t + 1, 0] = first_column[t + 1]
+    return band, offsets
+
+
+def backtrack(trellis, emission, tokens, blank_id=0, offsets=None):
+    """Find the most likely path through a trellis, one Point per frame.
+
+    With `offsets` the trellis is a band from compute_band(); cells outside
+    it count as unreachable and AlignmentBandError is raised if the path
+    needs them.
+    """
+    width = trellis.shape[1]
+
+    def cell(t, j):
+        if offsets is None:
+            return trellis[t, j]
+        k = j - offsets[t]
+        return trellis[t, k] if 0 <= k < width else -np.inf
+
+    t, j = trellis.shape[0] - 1, len(tokens) - 1
+    if not np.isfinite(cell(t, j)):
+        raise AlignmentBandError("Alignment failed: the last token is unreachable")
+    path = [Point(j, t, float(np.exp(emission[t, blank_id])))]
+    while j > 0:
+        if t <= 0:
+            raise ValueError("Alignment failed: path reached the first frame early")
+        p_stay = emission[t - 1, blank_id]
+        p_change = emission[t - 1, tokens[j]]
+        stayed = cell(t - 1, j) + p_stay
+        changed = cell(t - 1, j - 1) + p_change
+        if offsets is not None and stayed == -np.inf and changed == -np.inf:
+            raise AlignmentBandError(f"Alignment path left the band at frame {t}")
+        t -= 1
+        # Frame t either emits token j or is a blank held after it
+        if changed > stayed:
+            path.append(Point(j, t, float(np.exp(p_change))))
+            j -= 1
+        else:
+            path.append(Point(j, t, float(np.exp(p_stay))))
+
+    # Leading frames before the first token
+    while t > 0:
+        path.append(Point(j, t - 1, float(np.exp(emission[t - 1, blank_id]))))
+        t -= 1
+    return path[::-1]
+
+
+def band_exit_bound(band, offsets, emission, num_tokens):
+    """Upper bound on the score of any complete path that leaves the band.
+
+    A path leaving the band steps out of some band cell (t, j) that it
+    reached inside the band, so its score is at most band[t, j] plus the
+    best label score of every remaining transition. Cells whose way out can
+    no longer reach the last token are skipped.
+
+    Returns:
+        The bound, or -inf if no path can leave the band
+    """
+    num_frame, width = band.shape
+    if num_frame < 2:
+        return -np.inf
+    # remaining[t]: best possible score of the transitions out of frames t..T-2.
+    # Staying on the first token scores the next frame's blank (see
+    # _first_column), so a transition can use either frame.
+    row_max = emission.max(axis=1).astype(np.float64)
+    step_max = np.maximum(row_max[:-1], row_max[1:])
+    remaining = np.cumsum(step_max[::-1])[::-1]
+
+    frames = np.arange(num_frame - 1)
+    frames_left = num_frame - 2 - frames  # Transitions after the step out of frame t
+    shift = offsets[1:] - offsets[:-1]
+    bound = -np.inf
+
+    # Above the band: only from its last column, where the next row doesn't move up
+    rows = frames[(shift == 0) & (offsets[:-1] + width < num_tokens)]
+    j = offsets[rows] + width - 1
+    rows = rows[frames_left[rows] >= num_tokens - 2 - j]
+    if rows.size:
+        bound = max(bound, float(np.max(band[rows, width - 1] + remaining[rows])))
+
+    # Below the band: column k of rows after which the band moves up by more than k
+    for k in range(min(int(shift.max()), width)):
+        rows = frames[shift > k]
+        j = offsets[rows] + k
+        lowest = np.where(k + 1 < shift[rows], j + 1, j)  # Furthest token still outside
+        rows = rows[frames_left[rows] >= num_tokens - 1 - lowest]
+        if rows.size:
+            bound = max(bound, float(np.max(band[rows, k] + remaining[rows])))
+    return bound
+
+
+def _align_banded(emission, tokens, blank_id, backend, half_width):
+    """Align in a band around the diagonal, doubling it until the result is optimal.
+
+    The band's best path is only kept if no path leaving the band could
+    score higher (see band_exit_bound()), so the result is the same as with
+    the full trellis.
+    """
+    num_tokens = len(tokens)
+    while True:
+        band, offsets = compute_band(emission, tokens, half_width, blank_id, backend)
+        width = band.shape[1]
+        if width >= num_tokens:
+            # The band is the full trellis
+            return backtrack(band, emission, tokens, blank_id, offsets)
+        score = band[-1, num_tokens - 1 - offsets[-1]]
+        if np.isfinite(score) and band_exit_bound(band, offsets, emission, num_tokens) <= score:
+            return backtrack(band, emission, tokens, blank_id, offsets)
+        logger.info(
+            f"Banded alignment may not be optimal, widening band from "
+            f"{half_width} to {half_width * 2} tokens")
+        half_width *= 2
+
+
+def _align_torchaudio(emission, tokens, blank_id):
+    """Align with torchaudio's C++ CTC forced alignment"""
+    import torch
+    audio_functional = _torchaudio_functional(load=True)
+    log_probs = torch.as_tensor(np.asarray(emission), dtype=torch.float32).unsqueeze(0)
+    targets = torch.tensor([tokens], dtype=torch.int32)
+    alignment, scores = audio_functional.forced_align(log_probs, targets, blank=blank_id)
+    spans = audio_functional.merge_tokens(alignment[0], scores[0].exp())
+
+    frame_scores = scores[0].exp().tolist()
+    path = []
+    for token_index, span in enumerate(spans):
+        for t in range(span.start, span.end):
+            path.append(Point(token_index, t, frame_scores[t]))
+    return path
+
+
+def forced_align(emission, tokens, blank_id=0, backend=None, band_tokens=None):
+    """Align token ids against an emission matrix.
+
+    Args:
+        emission: (frames, labels) log-probabilities (NumPy array or tensor)
+        tokens: Transcript token ids, see prepare_transcript()
+        blank_id: CTC blank label id
+        backend: "torchaudio", "numba", "numpy" or None for the
+            ALIGNMENT_CONFIG default / fastest available
+        band_tokens: Half-width of the banded trellis in tokens, 0 for the
+            full trellis (ALIGNMENT_CONFIG default). The band is doubled
+            until no path outside it can beat the best path inside, so
+            the result is the full trellis result. Not used by torchaudio.
+
+    Returns:
+        List of Point(token_index, time_index, score) in time order
+    """
+    torch = sys.modules.get("torch")
+    if torch is not None and isinstance(emission, torch.Tensor):
+        emission = emission.detach().cpu().numpy()
+    backend = _resolve_backend(backend)
+    if band_tokens is None:
+        band_tokens = ALIGNMENT_CONFIG["band_tokens"]
+
+    if backend == "torchaudio":
+        return _align_torchaudio(emission, tokens, blank_id)
+    emission = np.ascontiguousarray(emission, dtype=np.float32)
+    if band_tokens and 2 * band_tokens + 1 < len(tokens):
+        return _align_banded(emission, tokens, blank_id, backend, band_tokens)
+    trellis = compute_trellis(emission, tokens, blank_id, backend)
+    return backtrack(trellis, emission, tokens, blank_id)
+
+
+def emission_windows(num_samples, window_samples, overlap_samples, stride):
+    """Plan the windows of a windowed emission pass over long audio.
+
+    Windows of `window_samples` overlap by twice `overlap_samples`; of each
+    window only the frames away from its cut edges are kept, so every frame
+    still sees `overlap_samples` of context on both sides. Window starts are
+    multiples of the model's frame stride (samples per frame), so the kept
+    frames fall on the same time grid as those of a single pass.
+
+    The values only match a single pass exactly for models whose frames
+    depend on a bounded stretch of audio. wav2vec2's transformer attends to
+    the whole window and its first conv layer normalises over it, so its
+    windowed emission is a close approximation, not an exact copy.
+
+    Yields:
+        (start, end, keep_from, keep_to): the sample range of a window and
+        the slice of its frames to keep (keep_to None = up to the end)
+    """
+    overlap = max(stride, overlap_samples // stride * stride)
+    window = max(2 * overlap + stride, window_samples // stride * stride)
+    hop = window - 2 * overlap
+
+    next_frame = 0  # First frame of the clip not kept yet
+    start = 0
+    while True:
+        first_frame = start // stride
+        if start + window >= num_samples:
+            yield start, num_samples, next_frame - first_frame, None
+            return
+        keep_to = (start + window - overlap) // stride - first_frame
+        yield start, start + window, next_frame - first_frame, keep_to
+        next_frame = first_frame + keep_to
+        start += hop
+
+
+def word_timings(path, words, transcript, frame_seconds, separator="|"):
+    """Convert an alignment path into (word, start, end, score) tuples in seconds"""
+    # Frame range and mean score of every aligned transcript character
+    spans = {}
+    for point in path:
+        span = spans.setdefault(point.token_index, [point.time_index, point.time_index, 0.0, 0])
+        span[0] = min(span[0], point.time_index)
+        span[1] = max(span[1], point.time_index)
+        span[2] += point.score
+        span[3] += 1
+
+    timings = []
+    word_index = 0
+    word_spans = []
+    for index, char in enumerate(transcript):
+        if char != separator:
+            if index in spans:
+                word_spans.append(spans[index])
+            continue
+        if index == 0:
+            continue
+        if word_spans:
+            start = min(span[0] for span in word_spans)
+            end = max(span[1] for span in word_spans) + 1
+            score = sum(span[2] for span in word_spans) / sum(span[3] for span in word_spans)
+            timings.append((words[word_index], start * frame_seconds, end * frame_seconds, score))
+        word_index += 1
+        word_spans = []
+    return timings
+
+
+def timings_from_emission(emission, labels, text, frame_seconds, backend=None):
+    """Word timings of a script from its (frames, labels) emission matrix"""
+    words, transcript, tokens = prepare_transcript(text, labels)
+    path = forced_align(emission, tokens, blank_id=0, backend=backend)
+    return word_timings(path, words, transcript, frame_seconds)
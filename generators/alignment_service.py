@@ -0,0 +1,274 @@
+"""
+Shared forced alignment service with cross-request batching.
+
+Alignment used to run inline in each voice's worker process, one utterance
+per wav2vec2 forward pass. With ALIGNMENT_SERVICE_CONFIG["enabled"] the
+server starts one alignment process that owns the model and listens on a
+Unix socket. Workers of any request send it (wav, transcript) jobs with
+`align()`; the service collects the jobs arriving within a short window,
+groups jobs of similar length (capped by "max_batch_seconds"), runs their
+transformer layers as one padded batch and hands each job's emission to a
+thread pool for the trellis and backtrack. Audio longer
+than ALIGNMENT_CONFIG["window_seconds"] is run in windows on its own.
+
+`align()` returns None when the service isn't running, and the caller
+aligns inline instead. With the "onnx" model runtime the service isn't
+started and workers align with ONNX Runtime.
+"""
+
+import os
+import time
+import queue
+import logging
+import tempfile
+import threading
+import multiprocessing
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener, Client
+from constants import ALIGNMENT_CONFIG, ALIGNMENT_MODEL_CONFIG, ALIGNMENT_SERVICE_CONFIG
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+AUTHKEY = b"brainrot-alignment"
+
+_process = None
+
+
+@dataclass
+class Job:
+    wav_path: str
+    text: str
+    connection: object
+    waveform: object = None
+
+
+def address():
+    """Return the Unix socket path of the service"""
+    return ALIGNMENT_SERVICE_CONFIG["address"] or os.path.join(
+        tempfile.gettempdir(), "brainrot_alignment.sock")
+
+
+def align(wav_path, text, timeout=None):
+    """Align a script with its speech through the service.
+
+    Args:
+        wav_path: 16kHz mono WAV of the speech
+        text: Script that was synthesized
+        timeout: Seconds to wait for the result (default from the config)
+
+    Returns:
+        List of (word, start, end, score) with times in seconds, or None if
+        the service isn't enabled or running
+    """
+    if not ALIGNMENT_SERVICE_CONFIG["enabled"] or ALIGNMENT_MODEL_CONFIG["runtime"] == "onnx":
+        return None
+    try:
+        connection = Client(address(), family='AF_UNIX', authkey=AUTHKEY)
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        logger.warning(f"Alignment service not reachable, aligning inline: {str(e)}")
+        return None
+
+    with connection:
+        connection.send((os.path.abspath(wav_path), text))
+        if not connection.poll(timeout or ALIGNMENT_SERVICE_CONFIG["timeout"]):
+            raise TimeoutError(f"Alignment service did not answer for {wav_path}")
+        status, result = connection.recv()
+    if status != "ok":
+        raise RuntimeError(f"Alignment service failed: {result}")
+    return result
+
+
+def gather_batch(jobs, window, max_batch):
+    """Wait for a job, then take the jobs arriving within `window` seconds"""
+    batch = [jobs.get()]
+    deadline = time.monotonic() + window
+    while len(batch) < max_batch:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(jobs.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def plan_batches(lengths, max_samples):
+    """Group sequence indices into forward passes of similar length.
+
+    Longest first, each group holds as many sequences as fit in
+    `max_samples` once padded to its longest one (always at least one).
+
+    Returns:
+        List of index lists
+    """
+    groups = []
+    for index in sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True):
+        if groups and (len(groups[-1]) + 1) * lengths[groups[-1][0]] <= max_samples:
+            groups[-1].append(index)
+        else:
+            groups.append([index])
+    return groups
+
+
+def _reply(job, status, result):
+    try:
+        job.connection.send((status, result))
+    except (BrokenPipeError, OSError) as e:
+        logger.warning(f"Could not return the alignment of {job.wav_path}: {str(e)}")
+    finally:
+        job.connection.close()
+
+
+def _finish(job, emission, labels, frame_seconds):
+    """Trellis and backtrack of one job, then send its result"""
+    from generators.force_alignment import timings_from_emission
+    try:
+        _reply(job, "ok", timings_from_emission(emission, labels, job.text, frame_seconds))
+    except Exception as e:
+        _reply(job, "error", str(e))
+
+
+def batched_emissions(model, waveforms, device):
+    """Log-probabilities of several (samples,) waveforms with one transformer pass.
+
+    The convolutional feature extractor runs on each waveform separately:
+    its first layer's GroupNorm normalises over the whole time axis, so
+    zero padding would change every frame. The frame features are then
+    padded and go through the transformer together, where `lengths` masks
+    the padding out of attention.
+
+    Returns:
+        List of (frames, labels) log-probability tensors on the CPU
+    """
+    import torch
+
+    with torch.inference_mode():
+        features = [model.feature_extractor(waveform.to(device).unsqueeze(0), None)[0][0]
+                    for waveform in waveforms]
+        lengths = torch.tensor([f.size(0) for f in features], device=device)
+        x = model.encoder(torch.nn.utils.rnn.pad_sequence(features, batch_first=True), lengths)
+        if model.aux is not None:
+            x = model.aux(x)
+        emissions = torch.log_softmax(x, dim=-1).cpu()
+    return [emission[:num_frames] for emission, num_frames in zip(emissions, lengths.tolist())]
+
+
+def _run_batch(batch, bundle, model, device, executor):
+    """Batched forward pass over the jobs, per-job alignment on the thread pool"""
+    from generators.force_alignment import load_waveform, windowed_emission
+
+    labels = bundle.get_labels()
+    window_samples = int(ALIGNMENT_CONFIG["window_seconds"] * bundle.sample_rate)
+    overlap_samples = int(ALIGNMENT_CONFIG["window_overlap_seconds"] * bundle.sample_rate)
+    ready = []
+    for job in batch:
+        try:
+            job.waveform = load_waveform(job.wav_path, bundle.sample_rate)[0]
+            if not window_samples or job.waveform.size(0) <= window_samples:
+                ready.append(job)
+                continue
+            # Long audio is run in windows on its own to bound memory
+            emission = windowed_emission(
+                model, job.waveform.to(device), window_samples, overlap_samples)
+            frame_seconds = job.waveform.size(0) / emission.size(0) / bundle.sample_rate
+            executor.submit(_finish, job, emission.numpy(), labels, frame_seconds)
+        except Exception as e:
+            _reply(job, "error", str(e))
+
+    max_samples = int(ALIGNMENT_SERVICE_CONFIG["max_batch_seconds"] * bundle.sample_rate)
+    for group in plan_batches([job.waveform.size(0) for job in ready], max_samples):
+        jobs = [ready[i] for i in group]
+        start = time.time()
+        try:
+            emissions = batched_emissions(model, [job.waveform for job in jobs], device)
+        except Exception as e:
+            for job in jobs:
+                _reply(job, "error", str(e))
+            continue
+
+        audio_seconds = sum(job.waveform.size(0) for job in jobs) / bundle.sample_rate
+        logger.info(
+            f"Alignment batch of {len(jobs)} job(s), {audio_seconds:.1f}s of audio, "
+            f"forward pass in {time.time() - start:.2f}s")
+        for job, emission in zip(jobs, emissions):
+            frame_seconds = job.waveform.size(0) / emission.size(0) / bundle.sample_rate
+            executor.submit(_finish, job, emission.numpy(), labels, frame_seconds)
+
+
+def _receive(connection, jobs):
+    """Read one request from a client connection into the job queue"""
+    try:
+        wav_path, text = connection.recv()
+    except (EOFError, OSError):
+        connection.close()
+        return
+    jobs.put(Job(wav_path, text, connection))
+
+
+def _accept_loop(listener, jobs):
+    while True:
+        try:
+            connection = listener.accept()
+        except Exception as e:
+            logger.warning(f"Rejected alignment service connection: {str(e)}")
+            continue
+        threading.Thread(target=_receive, args=(connection, jobs), daemon=True).start()
+
+
+def serve():
+    """Run the alignment service in the current process (doesn't return)"""
+    from utils.cpu_budget import init_worker
+    from generators import model_registry
+
+    init_worker(ALIGNMENT_SERVICE_CONFIG["threads"])
+    bundle, model = model_registry.get_model()
+    if model is None:
+        logger.error("Alignment service could not load the model, not starting")
+        return
+
+    path = address()
+    if os.path.exists(path):
+        os.remove(path)  # Left over from a previous run
+    listener = Listener(path, family='AF_UNIX', authkey=AUTHKEY)
+    jobs = queue.Queue()
+    threading.Thread(target=_accept_loop, args=(listener, jobs), daemon=True).start()
+    logger.info(f"Alignment service listening on {path} (pid {os.getpid()})")
+
+    window = ALIGNMENT_SERVICE_CONFIG["batch_window_ms"] / 1000
+    with ThreadPoolExecutor(max_workers=ALIGNMENT_SERVICE_CONFIG["threads"],
+                            thread_name_prefix="align") as executor:
+        while True:
+            batch = gather_batch(jobs, window, ALIGNMENT_SERVICE_CONFIG["max_batch"])
+            _run_batch(batch, bundle, model, next(model.parameters()).device, executor)
+
+
+def start():
+    """Start the service process if alignment and the service are enabled.
+
+    Call at server startup before other background threads are started, as
+    the service process is forked from the server.
+    """
+    global _process
+    if not (ALIGNMENT_CONFIG["enabled"] and ALIGNMENT_SERVICE_CONFIG["enabled"]):
+        return None
+    if ALIGNMENT_MODEL_CONFIG["runtime"] == "onnx":
+        # The service batches torch forward passes; ONNX Runtime aligns in the workers
+        logger.info("Alignment model runtime is ONNX, not starting the alignment service")
+        return None
+    if _process is None or not _process.is_alive():
+        _process = multiprocessing.Process(target=serve, name="AlignmentService", daemon=True)
+        _process.start()
+        logger.info(f"Started alignment service process {_process.pid}")
+    return _process
+
+
+def status():
+    """Return the service state for the status endpoint"""
+    return {
+        "enabled": ALIGNMENT_SERVICE_CONFIG["enabled"],
+        "running": _process is not None and _process.is_alive(),
+        "address": address(),
+    }
@@ -0,0 +1,222 @@
+"""
+Pre-transcoded vertical background library.
+
+Every background in AVAILABLE_VIDEOS is converted once into a 9:16 "mezzanine"
+file at the output resolution and frame rate with a short, fixed GOP. Jobs can
+then cut random segments from it by stream copy at keyframe boundaries instead
+of decoding and cropping the full-resolution source on every request.
+
+Run `python -m generators.asset_library` to (re)build the library.
+"""
+
+import os
+import json
+import subprocess
+import logging
+import threading
+from utils.ffmpeg_runner import run_ffmpeg
+from constants import AVAILABLE_VIDEOS, VIDEO_CONFIG, FFMPEG_PARAMS, MEZZANINE_CONFIG
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+# Serialises manifest updates from threads in the same process
+_manifest_lock = threading.Lock()
+
+
+def get_manifest_path():
+    """Return the path of the mezzanine manifest file"""
+    return os.path.join(MEZZANINE_CONFIG["dir"], MEZZANINE_CONFIG["manifest"])
+
+
+def load_manifest():
+    """Load the mezzanine manifest, returning an empty manifest if missing or invalid"""
+    manifest_path = get_manifest_path()
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+        logger.warning(
+            f"Ignoring mezzanine manifest with unknown version: {manifest.get('version')}")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to read mezzanine manifest: {str(e)}")
+    return {"version": MANIFEST_VERSION, "assets": {}}
+
+
+def save_manifest(manifest):
+    """Atomically write the mezzanine manifest"""
+    manifest_path = get_manifest_path()
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, manifest_path)
+
+
+def _source_signature(source_path):
+    """Return (size, mtime) used to detect changes to a source asset"""
+    stat = os.stat(source_path)
+    return stat.st_size, stat.st_mtime
+
+
+def get_mezzanine(source_path):
+    """Return the manifest entry for a source video if an up-to-date mezzanine exists.
+
+    Args:
+        source_path: Path to the original background video
+
+    Returns:
+        dict with at least "path" and "gop_seconds", or None
+    """
+    if not os.path.exists(source_path):
+        return None
+
+    source_key = os.path.normpath(source_path)
+    size, mtime = _source_signature(source_path)
+
+    for entry in load_manifest()["assets"].values():
+        if os.path.normpath(entry["source"]) != source_key:
+            continue
+        if entry["source_size"] != size or entry["source_mtime"] != mtime:
+            logger.info(f"Mezzanine for {source_path} is stale, ignoring it")
+            return None
+        if not os.path.exists(entry["path"]):
+            return None
+        return entry
+    return None
+
+
+def prepare_mezzanine(name, source_path, force=False, threads=None):
+    """Transcode one background video into a vertical mezzanine file.
+
+    Args:
+        name: Asset key (as in AVAILABLE_VIDEOS)
+        source_path: Path to the original background video
+        force: Rebuild even if an up-to-date mezzanine exists
+        threads: Encoder threads (ffmpeg default if None)
+
+    Returns:
+        The manifest entry for the asset
+    """
+    if not force:
+        existing = get_mezzanine(source_path)
+        if existing:
+            logger.info(f"Mezzanine for '{name}' is up to date: {existing['path']}")
+            return existing
+
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Background video not found: {source_path}")
+
+    width = VIDEO_CONFIG["width"]
+    height = VIDEO_CONFIG["height"]
+    fps = VIDEO_CONFIG["fps"]
+    gop_seconds = MEZZANINE_CONFIG["gop_seconds"]
+    gop_frames = max(1, int(round(fps * gop_seconds)))
+
+    os.makedirs(MEZZANINE_CONFIG["dir"], exist_ok=True)
+    output_path = os.path.join(
+        MEZZANINE_CONFIG["dir"], f"{name}_{width}x{height}_{fps}fps.mp4")
+    temp_path = f"{output_path}.{os.getpid()}.tmp.mp4"
+
+    size, mtime = _source_signature(source_path)
+
+    logger.info(
+        f"Building mezzanine for '{name}': {source_path} -> {output_path} (GOP {gop_frames} frames)")
+    command = [
+        'ffmpeg', '-y',
+        '-i', source_path,
+        '-vf', f'crop=ih*9/16:ih,scale={width}:{height},fps={fps}',
+        '-c:v', FFMPEG_PARAMS["video_codec"],
+        '-preset', MEZZANINE_CONFIG["preset"],
+        '-crf', str(MEZZANINE_CONFIG["crf"]),
+        '-pix_fmt', 'yuv420p',
+        # Fixed, scene-cut independent GOP so keyframes land on a regular grid
+        '-g', str(gop_frames),
+        '-keyint_min', str(gop_frames),
+        '-sc_threshold', '0',
+        '-an',
+        '-movflags', '+faststart',
+        *(['-threads', str(threads)] if threads else []),
+        temp_path
+    ]
+    try:
+        run_ffmpeg(command, label=f"mezzanine {name}")
+        os.replace(temp_path, output_path)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"ffmpeg error while building mezzanine for '{name}': {e.stderr}")
+        raise
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    entry = {
+        "name": name,
+        "source": source_path,
+        "source_size": size,
+        "source_mtime": mtime,
+        "path": output_path,
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "gop_seconds": gop_frames / fps,
+    }
+
+    with _manifest_lock:
+        manifest = load_manifest()
+        manifest["assets"][name] = entry
+        save_manifest(manifest)
+
+    logger.info(f"Mezzanine for '{name}' ready: {output_path}")
+    return entry
+
+
+def prepare_all(videos=None, force=False, threads=None):
+    """Build mezzanines for every background video that exists on disk.
+
+    Args:
+        videos: Mapping of asset key to source path (defaults to AVAILABLE_VIDEOS)
+        force: Rebuild even if up to date
+        threads: Encoder threads per mezzanine (ffmpeg default if None)
+
+    Returns:
+        dict mapping asset key to manifest entry for the assets that were prepared
+    """
+    if videos is None:
+        videos = AVAILABLE_VIDEOS
+
+    prepared = {}
+    for name, source_path in videos.items():
+        if not os.path.exists(source_path):
+            logger.warning(
+                f"Skipping mezzanine for '{name}', source not found: {source_path}")
+            continue
+        try:
+            prepared[name] = prepare_mezzanine(
+                name, source_path, force=force, threads=threads)
+        except Exception as e:
+            logger.error(f"Failed to prepare mezzanine for '{name}': {str(e)}")
+    return prepared
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(
+        description="Build vertical mezzanine files for the background videos")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild even if the mezzanine is up to date")
+    parser.add_argument("videos", nargs="*",
+                        help=f"Asset keys to prepare (default: all of {list(AVAILABLE_VIDEOS.keys())})")
+    args = parser.parse_args()
+
+    selected = {k: v for k, v in AVAILABLE_VIDEOS.items()
+                if not args.videos or k in args.videos}
+    prepare_all(selected, force=args.force)
@@ -7,6 +7,7 @@ import time
 import re
 import logging
 from utils.audio import VOICE_IDS
+from utils import rate_limit
 
 # Get module-level logger
 logger = logging.getLogger(__name__)
@@ -537,14 +538,16 @@ Start your broadcast with a dynamic, engaging introduction that:
         try:
             logger.info(
                 f"{voice_context} API request attempt {attempt + 1}/{MAX_RETRIES}")
+            # Shared with all workers, waits out a 429 seen by any of them
+            rate_limit.acquire("openai")
             api_start_time = time.time()
 
-            response = requests.post(
+            response = rate_limit.hedged_call("openai", lambda: requests.post(
                 "https://api.openai.com/v1/chat/completions",
                 headers=headers,
                 json=payload,
                 timeout=30  # 30 second timeout
-            )
+            ))
 
             api_duration = time.time() - api_start_time
             logger.info(
@@ -568,13 +571,16 @@ Start your broadcast with a dynamic, engaging introduction that:
 
                 logger.info(
                     f"{voice_context} Received successful response ({result_length} characters)")
+                rate_limit.record_latency("openai", api_duration)
                 return result.strip()
             elif response.status_code == 429:  # Rate limit
+                # Pause every worker, for as long as the server asks if it says
+                wait_time = rate_limit.parse_retry_after(
+                    response.headers.get("Retry-After")) or (2 ** attempt) * RETRY_DELAY
+                rate_limit.block("openai", wait_time)
                 if attempt < MAX_RETRIES - 1:
-                    wait_time = (2 ** attempt) * RETRY_DELAY
                     logger.warning(
                         f"{voice_context} Rate limited. Waiting {wait_time:.1f}s before retry")
-                    time.sleep(wait_time)
                     continue
             else:
                 error_msg = f"{voice_context} OpenAI API Error: {response.status_code}. Response: {response.text}"
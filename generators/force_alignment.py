@@ -1,22 +1,24 @@
 # rebuilding force alignment using a wav2vec model
 # Force alignment script is based off PyTorch tutorial on force alignment
 
-import torch
-import torchaudio
 from dataclasses import dataclass
-import IPython
-import matplotlib.pyplot as plt
 import os
 import time
 import re
 import logging
 import signal
 import threading
+from utils.cpu_budget import apply_torch_threads
+from constants import ALIGNMENT_CONFIG, ALIGNMENT_MODEL_CONFIG
+from generators import model_registry, onnx_model
+from generators.alignment_engine import (
+    emission_windows, timings_from_emission, WAV2VEC2_FRAME_STRIDE)
 
 # Configure module-level logger
 logger = logging.getLogger(__name__)
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+# torch and torchaudio are imported by the functions that use them, so the
+# ONNX Runtime path (see align_speech) runs without torch installed
 
 # likely need to edit the transcript for this
 
@@ -45,21 +47,77 @@ def format_text(input_text):
 
 # Step 1: Getting class label probability (1)
 
+def load_waveform(speech_file, sample_rate):
+    """Load a speech file as a (channels, samples) tensor at the model's sample rate"""
+    import torchaudio
+
+    waveform, file_sample_rate = torchaudio.load(speech_file)
+    if file_sample_rate != sample_rate:
+        waveform = torchaudio.functional.resample(waveform, file_sample_rate, sample_rate)
+    return waveform
+
+
+def windowed_emission(model, waveform, window_samples, overlap_samples,
+                      stride=WAV2VEC2_FRAME_STRIDE):
+    """Log-probabilities of a long (samples,) waveform, one window at a time.
+
+    See alignment_engine.emission_windows() for the window layout. Peak
+    memory depends on the window length, not on the audio duration. For
+    wav2vec2 the result approximates a single pass: frames near a cut see
+    only the overlap as context instead of the whole clip.
+
+    Returns:
+        (frames, labels) tensor on the CPU
+    """
+    import torch
+
+    pieces = []
+    for start, end, keep_from, keep_to in emission_windows(
+            waveform.size(-1), window_samples, overlap_samples, stride):
+        with torch.inference_mode():
+            emission, _ = model(waveform[start:end].unsqueeze(0))
+            emission = torch.log_softmax(emission[0], dim=-1)
+        # Copy so the window's output can be freed
+        pieces.append(emission[keep_from:keep_to].cpu().clone())
+        del emission
+    return torch.cat(pieces)
+
+
 def class_label_prob(SPEECH_FILE):
-    bundle, model = load_model_with_timeout()
+    import torch
+
+    # Keep torch within this worker's share of the CPU budget
+    apply_torch_threads()
+
+    if ALIGNMENT_MODEL_CONFIG["runtime"] == "onnx":
+        if onnx_model.onnx_available():
+            try:
+                session, info = onnx_model.get_session()
+                waveform = onnx_model.load_audio(SPEECH_FILE, info["sample_rate"])
+                emission = onnx_model.compute_emission(waveform, session, info)
+                # Same shapes as the torch path: (frames, 1, labels) and (1, samples)
+                return (torch.from_numpy(emission).unsqueeze(1), tuple(info["labels"]),
+                        torch.from_numpy(waveform).unsqueeze(0), model_registry.get_bundle())
+            except Exception as e:
+                logger.warning(f"ONNX Runtime emission failed, using torch: {str(e)}")
+        else:
+            logger.warning("onnxruntime is not installed, using torch for the alignment model")
+
+    # Resident model of this process (weights shared between workers)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    bundle, model = model_registry.get_model(device)
     if bundle is None or model is None:
         return None
 
-    # Move model to the appropriate device
-    model = model.to(device)
-
     labels = bundle.get_labels()
+    window_samples = int(ALIGNMENT_CONFIG["window_seconds"] * bundle.sample_rate)
     with torch.inference_mode():
-        waveform, sample_rate = torchaudio.load(SPEECH_FILE)
-        waveform = waveform.to(device)
-        if sample_rate != bundle.sample_rate:
-            waveform = torchaudio.functional.resample(
-                waveform, sample_rate, bundle.sample_rate)
+        waveform = load_waveform(SPEECH_FILE, bundle.sample_rate).to(device)
+        if window_samples and waveform.size(1) > window_samples:
+            # Long audio: bounded memory, first channel only (the track is mono)
+            overlap_samples = int(ALIGNMENT_CONFIG["window_overlap_seconds"] * bundle.sample_rate)
+            emission = windowed_emission(model, waveform[0], window_samples, overlap_samples)
+            return emission.unsqueeze(1), labels, waveform, bundle
         emission, _ = model(waveform)
         emission = emission.cpu().detach()
         emission = torch.log_softmax(emission, dim=-1)
@@ -80,6 +138,8 @@ def trellis_algo(labels, ts, emission, blank_id=0):
         emission: Emission matrix
         blank_id: ID for blank token
     """
+    import torch
+
     dictionary = {c: i for i, c in enumerate(labels)}
 
     # Use the text directly without reformatting
@@ -112,14 +172,9 @@ def trellis_algo(labels, ts, emission, blank_id=0):
 # Step 3: most likely path using backtracking algorithm
 
 
-@dataclass
-class Point:
-    token_index: int
-    time_index: int
-    score: float
-
-
 def backtrack(trellis, emission, tokens):
+    import torch
+
     # Backtrack to find the optimal path
     j = trellis.size(1) - 1
     i = torch.argmax(trellis[:, j]).item()
@@ -211,6 +266,37 @@ def merge_words(segments, separator="|"):
     return words
 
 
+def align_speech(speech_file, text, backend=None):
+    """Align a script with its speech using the fast alignment engine.
+
+    Args:
+        speech_file: 16kHz mono WAV of the speech
+        text: Script that was synthesized
+        backend: Alignment backend, see alignment_engine.forced_align()
+
+    Returns:
+        List of (word, start, end, score) with times in seconds, or None if
+        the model could not be loaded
+    """
+    if ALIGNMENT_MODEL_CONFIG["runtime"] == "onnx" and onnx_model.onnx_available():
+        try:
+            # NumPy end to end, no torch tensors in between
+            return onnx_model.align(speech_file, text, backend)
+        except Exception as e:
+            logger.warning(f"ONNX Runtime alignment failed, using torch: {str(e)}")
+
+    result = class_label_prob(speech_file)
+    if result is None:
+        return None
+    emission, labels, waveform, bundle = result
+    if emission.dim() == 3:
+        emission = emission[:, 0, :]  # (frames, batch, labels) -> (frames, labels)
+
+    frame_seconds = waveform.size(1) / emission.size(0) / bundle.sample_rate
+    return timings_from_emission(emission, labels, text, frame_seconds, backend)
+
+
+
 # Formatting portion, ensures that the time adheres to .ASS format
 def format_time(seconds):
     """Format time in seconds to MM:SS.MS format"""
@@ -297,6 +383,8 @@ def timeout_handler(signum, frame):
 
 def load_model_with_timeout(timeout=120):
     """Load the wav2vec2 model with a timeout"""
+    import torchaudio
+
     original_handler = signal.getsignal(signal.SIGALRM)
     try:
         # Set the timeout
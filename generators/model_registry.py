@@ -0,0 +1,238 @@
+"""
+Resident wav2vec2 model for forced alignment.
+
+class_label_prob() used to rebuild WAV2VEC2_ASR_BASE_960H on every alignment,
+in every worker process, each holding a private ~360 MB copy of the weights.
+Instead the weights are written once to a plain state-dict file under
+ALIGNMENT_MODEL_CONFIG["dir"] and every process loads them with
+`torch.load(mmap=True)` into a model built on the meta device. The tensors
+then point at the file's pages, so all workers on the host share one
+physical copy through the page cache, and loading takes milliseconds.
+
+Each process keeps its model in memory after the first use. The server calls
+`warm_up()` at startup so the weights file exists (and the model is resident)
+before the first request; forked workers inherit the loaded model. Loading
+happens outside the lock guarding the resident model, and a forked child
+gets fresh locks, so a worker forked during a warm-up loads its own model
+instead of waiting on a lock nobody will release.
+
+With ALIGNMENT_MODEL_CONFIG["quantize"], the Linear layers (the transformer,
+most of the compute) are dynamically quantized to int8 on CPU for a faster
+emission pass. The int8 weights are a private copy per process, about a
+quarter of the fp32 size; tests/benchmark_quantized_alignment.py measures
+the speedup and the word boundary error against fp32.
+
+torch and torchaudio are only imported once a model is built or asked for,
+so the server and the ONNX Runtime path (see generators.onnx_model) can
+import this module without them.
+"""
+
+import os
+import time
+import fcntl
+import logging
+import threading
+from constants import ALIGNMENT_MODEL_CONFIG
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+BUNDLE_NAME = "WAV2VEC2_ASR_BASE_960H"
+
+_lock = threading.Lock()         # Guards the published model below
+_build_lock = threading.Lock()   # Serialises model builds, held while loading
+_bundle = None
+_model = None
+_device = None
+_quantized = None
+_load_seconds = None
+
+
+def _reset_locks():
+    """Give a forked child fresh locks; a thread of the parent may have held them"""
+    global _lock, _build_lock
+    _lock = threading.Lock()
+    _build_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_locks)
+
+
+def get_bundle():
+    """Return the torchaudio pipeline bundle of the alignment model"""
+    import torchaudio
+
+    return getattr(torchaudio.pipelines, BUNDLE_NAME)
+
+
+def weights_path():
+    """Return the path of the shared state-dict file"""
+    return os.path.join(ALIGNMENT_MODEL_CONFIG["dir"], f"{BUNDLE_NAME.lower()}.pt")
+
+
+def _download_model(bundle):
+    """Build the model with its downloaded weights (slow, private memory)"""
+    if threading.current_thread() is threading.main_thread():
+        # SIGALRM based timeout only works in the main thread
+        from generators.force_alignment import load_model_with_timeout
+        _, model = load_model_with_timeout(ALIGNMENT_MODEL_CONFIG["load_timeout"])
+        if model is None:
+            raise RuntimeError(f"Could not load {BUNDLE_NAME}")
+        return model
+    return bundle.get_model()
+
+
+def save_weights(model, path):
+    """Write a model's state dict to `path` atomically"""
+    import torch
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        torch.save(model.state_dict(), temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_weights(skeleton, path):
+    """Memory-map a state dict from `path` into a model built on the meta device"""
+    import torch
+
+    state = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    skeleton.load_state_dict(state, assign=True)
+    return skeleton.eval()
+
+
+def ensure_weights_file():
+    """Write the shared weights file if it's missing. Returns its path.
+
+    A lock file makes concurrent workers wait for a single download.
+    """
+    path = weights_path()
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f"{path}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if not os.path.exists(path):
+                start = time.time()
+                save_weights(_download_model(get_bundle()), path)
+                logger.info(f"Saved {BUNDLE_NAME} weights to {path} in {time.time() - start:.1f}s")
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return path
+
+
+def quantize(model):
+    """Dynamically quantize the Linear layers of a model to int8, in place.
+
+    In place, so the memory-mapped fp32 weights aren't copied first.
+    """
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True).eval()
+
+
+def _build_model(bundle, device):
+    """Build the model with memory-mapped weights, or a private copy if that's unavailable"""
+    import torch
+    import torchaudio
+
+    if ALIGNMENT_MODEL_CONFIG["mmap"] and device.type == "cpu":
+        try:
+            path = ensure_weights_file()
+            with torch.device("meta"):
+                skeleton = torchaudio.models.wav2vec2_model(**bundle._params)
+            return load_weights(skeleton, path)
+        except Exception as e:
+            logger.warning(f"Memory-mapped {BUNDLE_NAME} load failed, loading a private copy: {str(e)}")
+    return _download_model(bundle).to(device).eval()
+
+
+def get_model(device=None, quantized=None):
+    """Return (bundle, model) of this process, loading the model on first use.
+
+    Args:
+        device: Torch device (default: CUDA if available, else CPU)
+        quantized: Int8 model, CPU only (default from ALIGNMENT_MODEL_CONFIG)
+
+    Returns:
+        (bundle, model), or (None, None) if the model could not be loaded
+    """
+    global _bundle, _model, _device, _quantized, _load_seconds
+    import torch
+
+    if device is None:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    if quantized is None:
+        quantized = ALIGNMENT_MODEL_CONFIG["quantize"]
+    quantized = quantized and device.type == "cpu"  # Dynamic quantization is CPU only
+
+    def resident():
+        """The loaded model if it is the one asked for, else None"""
+        with _lock:
+            if _model is not None and _device == device and _quantized == quantized:
+                return _bundle, _model
+        return None
+
+    loaded = resident()
+    if loaded:
+        return loaded
+
+    # Built outside _lock, so status() never waits on a load and a fork during
+    # a load can't leave _lock held in the child
+    with _build_lock:
+        loaded = resident()
+        if loaded:
+            return loaded  # Another thread finished loading it meanwhile
+
+        start = time.time()
+        try:
+            bundle = get_bundle()
+            model = _build_model(bundle, device)
+            if quantized:
+                model = quantize(model)
+        except Exception as e:
+            logger.error(f"Error loading {BUNDLE_NAME}: {str(e)}")
+            return None, None
+        load_seconds = time.time() - start
+
+        with _lock:
+            _bundle, _model, _device, _quantized = bundle, model, device, quantized
+            _load_seconds = load_seconds
+        logger.info(
+            f"Loaded {BUNDLE_NAME}{' (int8)' if quantized else ''} on {device} "
+            f"in {load_seconds:.2f}s (pid {os.getpid()})")
+        return bundle, model
+
+
+def warm_up():
+    """Load the model into this process ahead of the first alignment"""
+    if ALIGNMENT_MODEL_CONFIG["runtime"] == "onnx":
+        from generators import onnx_model
+        if onnx_model.onnx_available():
+            onnx_model.get_session()  # Exports the model on first use
+            logger.info(f"{BUNDLE_NAME} ONNX session warmed up")
+            return True
+    _, model = get_model()
+    if model is None:
+        return False
+    logger.info(f"{BUNDLE_NAME} warmed up")
+    return True
+
+
+def status():
+    """Return the model state of this process for the status endpoint"""
+    path = weights_path()
+    return {
+        "model": BUNDLE_NAME,
+        "loaded": _model is not None,
+        "device": str(_device) if _device is not None else None,
+        "quantized": bool(_quantized),
+        "load_seconds": round(_load_seconds, 3) if _load_seconds is not None else None,
+        "weights_file": path if os.path.exists(path) else None,
+    }
@@ -0,0 +1,100 @@
+"""
+Multi-output rendering: one background decode feeding several voices.
+
+The background segment is decoded, cropped and scaled once and `split` into
+one branch per voice. Each branch is trimmed to its voice's length, gets that
+voice's subtitles burned in and is muxed with that voice's audio into its own
+MP4, all from a single ffmpeg invocation.
+"""
+
+import subprocess
+from utils.logger import log_info, log_error
+from utils.cpu_budget import ffmpeg_thread_args
+from utils.ffmpeg_runner import run_ffmpeg
+from generators.video_generator import (
+    build_background_filters, build_background_input, build_subtitle_filter, get_output_profile)
+from constants import FFMPEG_PARAMS
+
+
+def build_multi_output_command(input_video_path, start_time, jobs, crop=True, threads=None, profile=None):
+    """Build the ffmpeg command rendering every job from one background decode.
+
+    Args:
+        input_video_path: Path to the background video
+        start_time: Offset into the background video in seconds
+        jobs: List of dicts with "subtitle", "audio", "output" and "duration"
+        crop: Crop/scale to 9:16. Disable for already vertical inputs.
+        threads: Encoder threads shared by all outputs (defaults to the
+            process's CPU budget allocation)
+        profile: Output profile name, see OUTPUT_PROFILES
+
+    Returns:
+        The ffmpeg command as a list of arguments
+    """
+    max_duration = max(job["duration"] for job in jobs)
+    settings = get_output_profile(profile)
+    if threads:
+        thread_args = ["-threads", str(max(1, threads // len(jobs)))]
+    else:
+        thread_args = ffmpeg_thread_args(divisor=len(jobs))
+
+    cmd = ["ffmpeg", *build_background_input(input_video_path, start_time, max_duration)]
+    for job in jobs:
+        cmd += ["-i", job["audio"]]
+
+    shared = build_background_filters(crop, profile)
+    shared.append(f"split={len(jobs)}" + ''.join(f"[s{i}]" for i in range(len(jobs))))
+    graph = [f"[0:v]{','.join(shared)}"]
+    for i, job in enumerate(jobs):
+        graph.append(
+            f"[s{i}]trim=duration={job['duration']},setpts=PTS-STARTPTS,"
+            f"{build_subtitle_filter(job['subtitle'])}[v{i}]")
+    cmd += ["-filter_complex", ';'.join(graph)]
+
+    for i, job in enumerate(jobs):
+        cmd += [
+            "-map", f"[v{i}]",
+            "-map", f"{i + 1}:a:0",
+            "-c:v", FFMPEG_PARAMS["video_codec"],
+            "-preset", settings["preset"],
+            "-crf", str(settings["crf"]),
+            "-c:a", FFMPEG_PARAMS["audio_codec"],
+            "-b:a", settings["audio_bitrate"],
+            "-shortest",
+            *thread_args,
+            "-y", job["output"]
+        ]
+    return cmd
+
+
+def render_multi_output(input_video_path, start_time, jobs, crop=True, threads=None, profile=None):
+    """
+    Render the final video of every job from a single background decode.
+
+    Args:
+        input_video_path (str): Path to the background video
+        start_time (float): Offset into the background video in seconds
+        jobs (list): Dicts with "subtitle", "audio", "output" and "duration"
+        crop (bool): Crop/scale to 9:16. Disable for already vertical inputs.
+        threads (int, optional): Encoder threads shared by all outputs
+        profile (str, optional): Output profile name, see OUTPUT_PROFILES
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if not jobs:
+        return True
+
+    try:
+        cmd = build_multi_output_command(
+            input_video_path, start_time, jobs, crop=crop, threads=threads, profile=profile)
+        log_info(
+            f"Running multi-output render for {len(jobs)} videos: {' '.join(cmd)}")
+        run_ffmpeg(cmd, label=f"multi-output render ({len(jobs)} videos)")
+        return True
+    except subprocess.CalledProcessError as e:
+        log_error(f"Error in multi-output render: {str(e)}")
+        return False
+    except Exception as e:
+        log_error(f"Unexpected error in multi-output render: {str(e)}")
+        return False
@@ -0,0 +1,205 @@
+"""
+ONNX Runtime inference for the alignment acoustic model.
+
+With ALIGNMENT_MODEL_CONFIG["runtime"] = "onnx", the emission pass of
+WAV2VEC2_ASR_BASE_960H runs on onnxruntime's CPU execution provider instead
+of eager PyTorch. The model (with its log-softmax) is exported once to
+ALIGNMENT_MODEL_CONFIG["dir"], next to a JSON sidecar holding its labels
+and sample rate; exporting is the only step that needs torch. Each process
+keeps one InferenceSession per model file, limited to its CPU budget
+threads.
+
+`align()` gives word timings from the session with NumPy only: this module,
+utils.silence (WAV reading) and generators.alignment_engine (trellis and
+backtrack) don't import torch. force_alignment.align_speech() uses it with
+the "onnx" runtime; class_label_prob() uses the same session and keeps its
+torch tensor interface.
+"""
+
+import os
+import json
+import time
+import fcntl
+import logging
+import threading
+import importlib.util
+import numpy as np
+from constants import ALIGNMENT_CONFIG, ALIGNMENT_MODEL_CONFIG
+from utils.silence import load_wav
+from utils.cpu_budget import get_process_threads
+from generators.alignment_engine import (
+    emission_windows, timings_from_emission, WAV2VEC2_FRAME_STRIDE)
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_sessions = {}
+
+
+def _reset_lock():
+    """Give a forked child a fresh lock; a thread of the parent may have held it"""
+    global _lock
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_lock)
+
+
+def onnx_available():
+    """Return True if the optional onnxruntime package is installed"""
+    return importlib.util.find_spec("onnxruntime") is not None
+
+
+def model_path():
+    """Return the path of the exported ONNX model"""
+    return os.path.join(ALIGNMENT_MODEL_CONFIG["dir"], "wav2vec2_asr_base_960h.onnx")
+
+
+def _sidecar_path(path):
+    return f"{path}.json"
+
+
+def export(path=None):
+    """Export the alignment model to ONNX with its labels sidecar (needs torch)"""
+    import torch
+    from generators import model_registry
+
+    path = path or model_path()
+    bundle, model = model_registry.get_model(torch.device("cpu"), quantized=False)
+    if model is None:
+        raise RuntimeError("Could not load the alignment model to export")
+
+    class LogProbs(torch.nn.Module):
+        """(batch, samples) waveform -> (batch, frames, labels) log-probabilities"""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, waveform):
+            emission, _ = self.model(waveform)
+            return torch.log_softmax(emission, dim=-1)
+
+    start = time.time()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        # Sidecar first: a model file on disk always has its labels next to it
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "labels": list(bundle.get_labels()),
+                "sample_rate": bundle.sample_rate,
+                "frame_stride": WAV2VEC2_FRAME_STRIDE,
+            }, f)
+        os.replace(temp_path, _sidecar_path(path))
+
+        torch.onnx.export(
+            LogProbs(model).eval(), torch.zeros(1, bundle.sample_rate), temp_path,
+            input_names=["waveform"], output_names=["log_probs"],
+            dynamic_axes={"waveform": {0: "batch", 1: "samples"},
+                          "log_probs": {0: "batch", 1: "frames"}},
+            opset_version=ALIGNMENT_MODEL_CONFIG["onnx_opset"])
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    logger.info(f"Exported alignment model to {path} in {time.time() - start:.1f}s")
+    return path
+
+
+def ensure_model(path=None):
+    """Export the ONNX model if it's missing. Returns its path.
+
+    A lock file makes concurrent workers wait for a single export.
+    """
+    path = path or model_path()
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f"{path}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if not os.path.exists(path):
+                export(path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return path
+
+
+def get_session(path=None):
+    """Return (session, info) of this process for the ONNX model, creating it on first use.
+
+    `info` is the sidecar: labels, sample_rate and frame_stride.
+    """
+    import onnxruntime
+
+    path = ensure_model(path)
+    mtime = os.path.getmtime(path)
+    key = (path, os.getpid())  # Sessions don't survive a fork
+    with _lock:
+        entry = _sessions.get(key)
+        if entry is None or entry[0] != mtime:
+            options = onnxruntime.SessionOptions()
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            threads = get_process_threads()
+            if threads:
+                options.intra_op_num_threads = threads
+                options.inter_op_num_threads = 1
+            session = onnxruntime.InferenceSession(
+                path, sess_options=options, providers=["CPUExecutionProvider"])
+            with open(_sidecar_path(path), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            entry = _sessions[key] = (mtime, session, info)
+            logger.info(f"Created ONNX Runtime session for {path} (pid {os.getpid()})")
+        return entry[1], entry[2]
+
+
+def load_audio(speech_file, sample_rate):
+    """Read a 16-bit PCM WAV as float32 samples in [-1, 1), first channel only"""
+    samples, file_sample_rate = load_wav(speech_file)
+    if file_sample_rate != sample_rate:
+        raise ValueError(
+            f"{speech_file} is {file_sample_rate}Hz, the alignment model needs {sample_rate}Hz")
+    if samples.ndim > 1:
+        samples = samples[:, 0]
+    return np.asarray(samples, dtype=np.float32) / 32768.0
+
+
+def compute_emission(waveform, session, info):
+    """(frames, labels) log-probabilities of a waveform, windowed for long audio"""
+    window_samples = int(ALIGNMENT_CONFIG["window_seconds"] * info["sample_rate"])
+    if not window_samples or len(waveform) <= window_samples:
+        return session.run(None, {"waveform": waveform[None, :]})[0][0]
+
+    overlap_samples = int(ALIGNMENT_CONFIG["window_overlap_seconds"] * info["sample_rate"])
+    pieces = []
+    for start, end, keep_from, keep_to in emission_windows(
+            len(waveform), window_samples, overlap_samples, info["frame_stride"]):
+        log_probs = session.run(None, {"waveform": waveform[None, start:end]})[0][0]
+        pieces.append(log_probs[keep_from:keep_to])
+    return np.concatenate(pieces)
+
+
+def class_label_prob(speech_file):
+    """Emission of a speech file with ONNX Runtime.
+
+    Returns:
+        (emission, labels): (frames, labels) NumPy log-probabilities and the label set
+    """
+    session, info = get_session()
+    waveform = load_audio(speech_file, info["sample_rate"])
+    return compute_emission(waveform, session, info), tuple(info["labels"])
+
+
+def align(speech_file, text, backend=None):
+    """Align a script with its speech without torch.
+
+    Returns:
+        List of (word, start, end, score) with times in seconds
+    """
+    session, info = get_session()
+    waveform = load_audio(speech_file, info["sample_rate"])
+    emission = compute_emission(waveform, session, info)
+    frame_seconds = len(waveform) / len(emission) / info["sample_rate"]
+    return timings_from_emission(emission, tuple(info["labels"]), text, frame_seconds, backend)
@@ -0,0 +1,306 @@
+"""
+Warm pool of pre-cut vertical background segments.
+
+While the server is idle, random segments of common lengths are cut from each
+background in AVAILABLE_VIDEOS, cropped/scaled to the output format and stored
+under SEGMENT_POOL_CONFIG["dir"]/<asset>/. A job claims the shortest ready
+segment that covers its audio (an atomic rename, so concurrent workers never
+get the same file) and trims it by stream copy, which takes background
+extraction and cropping out of request latency.
+
+Backgrounds with an up-to-date mezzanine are skipped: cutting from the
+mezzanine is already a stream copy.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+import subprocess
+from utils.ffmpeg_runner import run_ffmpeg, FFmpegCancelled
+from utils.media_probe import probe_duration
+from generators.asset_library import get_mezzanine
+from constants import AVAILABLE_VIDEOS, FFMPEG_PARAMS, SEGMENT_POOL_CONFIG, VIDEO_CONFIG
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+# Ready segments are named "<length>s_<id>.mp4"
+SEGMENT_PATTERN = re.compile(r'^(\d+)s_[0-9a-f]+\.mp4$')
+
+# Claimed or partially written files older than this are left over from crashes
+STALE_SECONDS = 3600
+
+
+def _asset_name(source_path):
+    """Return the AVAILABLE_VIDEOS key of a source video (or its file name)"""
+    source_key = os.path.normpath(source_path)
+    for name, path in AVAILABLE_VIDEOS.items():
+        if os.path.normpath(path) == source_key:
+            return name
+    return os.path.splitext(os.path.basename(source_path))[0]
+
+
+def _pool_dir(source_path):
+    """Return the pool directory of a source video"""
+    return os.path.join(SEGMENT_POOL_CONFIG["dir"], _asset_name(source_path))
+
+
+def _sync_source(source_path):
+    """Drop pooled segments cut from an older version of the source video"""
+    pool_dir = _pool_dir(source_path)
+    os.makedirs(pool_dir, exist_ok=True)
+    stat = os.stat(source_path)
+    signature = {"source": source_path, "size": stat.st_size, "mtime": stat.st_mtime}
+
+    signature_path = os.path.join(pool_dir, "source.json")
+    try:
+        with open(signature_path, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+    except (FileNotFoundError, ValueError):
+        current = None
+
+    if current != signature:
+        if current is not None:
+            logger.info(f"Background {source_path} changed, clearing its segment pool")
+        for length, path in list_segments(source_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        temp_path = f"{signature_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(signature, f)
+        os.replace(temp_path, signature_path)
+    return pool_dir
+
+
+def list_segments(source_path):
+    """Return (length, path) of the ready segments of a source video, shortest first"""
+    pool_dir = _pool_dir(source_path)
+    if not os.path.isdir(pool_dir):
+        return []
+    segments = []
+    for name in os.listdir(pool_dir):
+        match = SEGMENT_PATTERN.match(name)
+        if match:
+            segments.append((int(match.group(1)), os.path.join(pool_dir, name)))
+    return sorted(segments)
+
+
+def pool_size_bytes():
+    """Return the total size of all files in the pool"""
+    total = 0
+    for root, _, files in os.walk(SEGMENT_POOL_CONFIG["dir"]):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def take_segment(source_path, duration, output_path):
+    """Claim a pooled segment covering `duration` and trim it to output_path.
+
+    Args:
+        source_path: Path of the original background video
+        duration: Required segment length in seconds
+        output_path: Where to write the trimmed, already vertical segment
+
+    Returns:
+        True if a pooled segment was used, False if none was available
+        (or the pool is disabled)
+    """
+    if not SEGMENT_POOL_CONFIG["enabled"] or not os.path.exists(source_path):
+        return False
+    _sync_source(source_path)
+
+    for length, path in list_segments(source_path):
+        if length < duration:
+            continue
+
+        # The rename is atomic, only one worker can win a given segment
+        claimed_path = f"{path}.claimed-{os.getpid()}"
+        try:
+            os.rename(path, claimed_path)
+        except FileNotFoundError:
+            continue
+
+        try:
+            command = [
+                'ffmpeg', '-y',
+                '-i', claimed_path,
+                '-t', str(duration),
+                '-c', 'copy',
+                output_path
+            ]
+            run_ffmpeg(command, label="trim pooled segment")
+            logger.info(
+                f"Using pooled {length}s background segment for {duration:.2f}s of audio")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to trim pooled segment {claimed_path}: {str(e)}")
+            return False
+        finally:
+            try:
+                os.remove(claimed_path)
+            except OSError:
+                pass
+    return False
+
+
+def produce_segment(source_path, length, cancel_event=None):
+    """Cut, crop and encode one random segment of a source video into the pool.
+
+    Returns:
+        Path of the new segment, or None if the source is too short
+    """
+    total_duration = probe_duration(source_path)
+    if total_duration < length:
+        return None
+
+    pool_dir = _sync_source(source_path)
+    start = random.uniform(0, total_duration - length)
+    fps = VIDEO_CONFIG["fps"]
+    output_path = os.path.join(pool_dir, f"{length}s_{uuid.uuid4().hex}.mp4")
+    temp_path = output_path + '.tmp.mp4'
+
+    command = [
+        'ffmpeg', '-y',
+        '-ss', str(start),
+        '-t', str(length),
+        '-i', source_path,
+        '-vf', f"crop=ih*9/16:ih,scale={VIDEO_CONFIG['width']}:{VIDEO_CONFIG['height']},fps={fps}",
+        '-c:v', FFMPEG_PARAMS["video_codec"],
+        '-preset', FFMPEG_PARAMS["preset"],
+        '-crf', str(FFMPEG_PARAMS["crf"]),
+        '-pix_fmt', 'yuv420p',
+        '-an',
+        '-threads', str(SEGMENT_POOL_CONFIG["threads"]),
+        temp_path
+    ]
+    try:
+        run_ffmpeg(command, label=f"pool {_asset_name(source_path)} {length}s",
+                   cancel_event=cancel_event)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return output_path
+
+
+def _evict_to_cap():
+    """Remove the oldest ready segments while the pool exceeds its size cap"""
+    segments = []
+    for source_path in AVAILABLE_VIDEOS.values():
+        for _, path in list_segments(source_path):
+            try:
+                segments.append((os.path.getmtime(path), path))
+            except OSError:
+                pass  # Claimed meanwhile
+    segments = [path for _, path in sorted(segments)]
+
+    total = pool_size_bytes()
+    while segments and total > SEGMENT_POOL_CONFIG["max_bytes"]:
+        path = segments.pop(0)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            total -= size
+            logger.info(f"Evicted pooled segment {path} (pool over size cap)")
+        except OSError:
+            pass
+
+
+def _remove_stale_files():
+    """Delete claimed/partial files left behind by crashed processes"""
+    now = time.time()
+    for root, _, files in os.walk(SEGMENT_POOL_CONFIG["dir"]):
+        for name in files:
+            if '.claimed-' not in name and not name.endswith('.tmp.mp4'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                if now - os.path.getmtime(path) > STALE_SECONDS:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def next_missing_segment(skip=()):
+    """Return (source_path, length) of the most needed segment, or None if the pool is full.
+
+    Lengths with the fewest ready segments are refilled first; (source_path,
+    length) pairs in `skip` are ignored.
+    """
+    if pool_size_bytes() >= SEGMENT_POOL_CONFIG["max_bytes"]:
+        return None
+
+    best = None
+    for source_path in AVAILABLE_VIDEOS.values():
+        if not os.path.exists(source_path) or get_mezzanine(source_path):
+            continue
+        ready = [length for length, _ in list_segments(source_path)]
+        for length in SEGMENT_POOL_CONFIG["lengths"]:
+            if (source_path, length) in skip:
+                continue
+            count = ready.count(length)
+            if count < SEGMENT_POOL_CONFIG["segments_per_length"]:
+                if best is None or count < best[0]:
+                    best = (count, source_path, length)
+    return best[1:] if best else None
+
+
+class _BusySignal:
+    """Cancel-event stand-in that is set while the server is busy"""
+
+    def __init__(self, is_idle):
+        self.is_idle = is_idle
+
+    def is_set(self):
+        return not self.is_idle()
+
+
+def refill_loop(is_idle, stop_event=None):
+    """Keep the pool filled while the server is idle.
+
+    Runs until stop_event is set. A segment being encoded when the server
+    becomes busy is abandoned, so the pool never competes with requests.
+
+    Args:
+        is_idle: Callable returning True when no request is being processed
+        stop_event: Optional threading.Event to stop the loop
+    """
+    stop_event = stop_event or threading.Event()
+    busy = _BusySignal(is_idle)
+    too_short = set()
+
+    while not stop_event.is_set():
+        if not is_idle():
+            stop_event.wait(SEGMENT_POOL_CONFIG["refill_interval"])
+            continue
+
+        try:
+            _remove_stale_files()
+            _evict_to_cap()
+            missing = next_missing_segment(skip=too_short)
+            if missing is None:
+                stop_event.wait(SEGMENT_POOL_CONFIG["refill_interval"])
+                continue
+
+            source_path, length = missing
+            if produce_segment(source_path, length, cancel_event=busy) is None:
+                logger.warning(f"{source_path} is shorter than {length}s, not pooling it")
+                too_short.add(missing)
+            else:
+                logger.info(f"Added {length}s segment of {source_path} to the pool")
+        except FFmpegCancelled:
+            logger.info("Server became busy, pausing segment pool refill")
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError, ValueError) as e:
+            logger.error(f"Segment pool refill failed: {str(e)}")
+            stop_event.wait(SEGMENT_POOL_CONFIG["refill_interval"])
@@ -0,0 +1,229 @@
+"""
+Segmented (parallel chunked) rendering of the final video.
+
+The timeline is split at keyframes of the background into N chunks. Each
+chunk is cropped, has its slice of the subtitles burned in (with event times
+shifted to the chunk) and is encoded by its own ffmpeg process. The encoded
+chunks are then joined with the concat demuxer by stream copy, and the audio
+is muxed once over the whole video.
+"""
+
+import os
+import threading
+import subprocess
+import concurrent.futures
+from utils.logger import log_info, log_error
+from utils.keyframe_index import get_keyframes
+from utils.cpu_budget import ffmpeg_thread_args, get_process_threads
+from utils.ffmpeg_runner import run_ffmpeg
+from generators.video_generator import (
+    build_background_filters, build_background_input, build_subtitle_filter, format_time_ass, get_output_profile, render_single_pass)
+from constants import FFMPEG_PARAMS, RENDER_CONFIG
+
+
+def ass_time_to_seconds(time_str):
+    """Convert ASS time format (H:MM:SS.cc) to seconds"""
+    h, m, s = time_str.strip().split(':')
+    return float(h) * 3600 + float(m) * 60 + float(s)
+
+
+def plan_chunks(keyframes, start_time, duration, num_chunks, min_chunk_seconds=0.0):
+    """Split [start_time, start_time + duration) into chunks at keyframes.
+
+    Boundaries are placed at the keyframe closest to an even split so every
+    chunk seeks straight onto a keyframe of the background.
+
+    Args:
+        keyframes: Sorted keyframe timestamps of the background video
+        start_time: Start of the rendered segment in the background video
+        duration: Length of the rendered segment
+        num_chunks: Desired number of chunks
+        min_chunk_seconds: Minimum length of a chunk
+
+    Returns:
+        List of (chunk_start, chunk_duration) in background video time
+    """
+    end_time = start_time + duration
+    if min_chunk_seconds > 0:
+        num_chunks = min(num_chunks, max(1, int(duration // min_chunk_seconds)))
+
+    inner = [k for k in keyframes if start_time < k < end_time]
+    boundaries = [start_time]
+    for i in range(1, num_chunks):
+        target = start_time + duration * i / num_chunks
+        boundary = min(inner, key=lambda k: abs(k - target)) if inner else target
+        if boundary - boundaries[-1] >= max(min_chunk_seconds, 1e-3) and \
+                end_time - boundary >= max(min_chunk_seconds, 1e-3):
+            boundaries.append(boundary)
+    boundaries.append(end_time)
+
+    return [(boundaries[i], boundaries[i + 1] - boundaries[i])
+            for i in range(len(boundaries) - 1)]
+
+
+def shift_ass_events(subtitle_path, offset, duration, output_path):
+    """Write a copy of an ASS file with events shifted into a chunk's timeline.
+
+    Events are moved back by `offset` seconds; events entirely outside
+    [0, duration) are dropped and the rest are clamped to the chunk.
+    """
+    with open(subtitle_path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+
+    shifted = []
+    for line in lines:
+        if not line.startswith('Dialogue:'):
+            shifted.append(line)
+            continue
+
+        # Split only first 9 commas to keep text intact
+        parts = line.split(',', 9)
+        if len(parts) < 10:
+            shifted.append(line)
+            continue
+
+        start = ass_time_to_seconds(parts[1]) - offset
+        end = ass_time_to_seconds(parts[2]) - offset
+        if end <= 0 or start >= duration:
+            continue
+
+        parts[1] = format_time_ass(max(0.0, start))
+        parts[2] = format_time_ass(min(duration, end))
+        shifted.append(','.join(parts))
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(shifted) + '\n')
+    return output_path
+
+
+def _render_chunk(input_video_path, chunk_start, chunk_duration, subtitle_path, output_path, crop, threads,
+                  cancel_event=None, profile=None):
+    """Encode one video-only chunk with its subtitles burned in"""
+    settings = get_output_profile(profile)
+    filters = build_background_filters(crop, profile)
+    filters.append(build_subtitle_filter(subtitle_path))
+
+    cmd = [
+        "ffmpeg",
+        *build_background_input(input_video_path, chunk_start, chunk_duration),
+        "-vf", ','.join(filters),
+        "-an",
+        "-c:v", FFMPEG_PARAMS["video_codec"],
+        "-preset", settings["preset"],
+        "-crf", str(settings["crf"]),
+        "-threads", str(threads),
+        "-y", output_path
+    ]
+    run_ffmpeg(cmd, label=os.path.basename(output_path), cancel_event=cancel_event)
+    return output_path
+
+
+def render_segmented(
+    input_video_path,
+    subtitle_file_path,
+    audio_file_path,
+    output_path,
+    temp_dir,
+    start_time=0.0,
+    duration=None,
+    crop=True,
+    num_chunks=None,
+    profile=None
+):
+    """
+    Render the final video as parallel chunks joined by stream copy.
+
+    Args:
+        input_video_path (str): Path to the full background video
+        subtitle_file_path (str): Path to the subtitle file in ASS format
+        audio_file_path (str): Path to the audio file
+        output_path (str): Path to write output video
+        temp_dir (str): Directory for chunk files
+        start_time (float): Offset into the background video in seconds
+        duration (float): Length of the output in seconds
+        crop (bool): Crop/scale to 9:16. Disable for already vertical inputs.
+        num_chunks (int, optional): Number of chunks, defaults to RENDER_CONFIG["chunks"]
+        profile (str, optional): Output profile name, see OUTPUT_PROFILES
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if num_chunks is None:
+        num_chunks = RENDER_CONFIG["chunks"]
+    available_threads = get_process_threads() or os.cpu_count() or 1
+    num_chunks = max(1, min(num_chunks, available_threads))
+
+    chunks = plan_chunks(get_keyframes(input_video_path), start_time, duration,
+                         num_chunks, RENDER_CONFIG["min_chunk_seconds"])
+    if len(chunks) < 2:
+        log_info("Segment too short to split, falling back to single-pass render")
+        return render_single_pass(input_video_path, subtitle_file_path, audio_file_path,
+                                  output_path, start_time=start_time, duration=duration, crop=crop,
+                                  profile=profile)
+
+    threads = max(1, available_threads // len(chunks))
+    log_info(
+        f"Rendering {len(chunks)} chunks in parallel ({threads} threads each)")
+
+    chunk_dir = os.path.join(temp_dir, "render_chunks")
+    os.makedirs(chunk_dir, exist_ok=True)
+
+    # Set when a chunk fails so the remaining encodes stop early
+    cancel_event = threading.Event()
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            futures = []
+            for i, (chunk_start, chunk_duration) in enumerate(chunks):
+                chunk_subtitles = shift_ass_events(
+                    subtitle_file_path, chunk_start - start_time, chunk_duration,
+                    os.path.join(chunk_dir, f"chunk_{i:03d}.ass"))
+                futures.append(executor.submit(
+                    _render_chunk, input_video_path, chunk_start, chunk_duration,
+                    chunk_subtitles, os.path.join(chunk_dir, f"chunk_{i:03d}.mp4"),
+                    crop, threads, cancel_event, profile))
+            try:
+                chunk_paths = [future.result() for future in futures]
+            except Exception:
+                cancel_event.set()
+                raise
+
+        # Join the chunks losslessly and mux the audio once
+        concat_file = os.path.join(chunk_dir, "concat_list.txt")
+        with open(concat_file, 'w') as f:
+            for chunk_path in chunk_paths:
+                f.write(f"file '{os.path.abspath(chunk_path)}'\n")
+
+        concat_cmd = [
+            "ffmpeg",
+            "-f", "concat", "-safe", "0",
+            "-i", concat_file,
+            "-i", audio_file_path,
+            "-map", "0:v:0",
+            "-map", "1:a:0",
+            "-c:v", "copy",
+            "-c:a", FFMPEG_PARAMS["audio_codec"],
+            "-b:a", get_output_profile(profile)["audio_bitrate"],
+            "-shortest",
+            *ffmpeg_thread_args(),
+            "-y", output_path
+        ]
+        log_info(f"Running concat command: {' '.join(concat_cmd)}")
+        run_ffmpeg(concat_cmd, label="concat chunks")
+        return True
+    except subprocess.CalledProcessError as e:
+        log_error(f"Error in segmented render: {str(e)} {e.stderr or ''}")
+        return False
+    except Exception as e:
+        log_error(f"Unexpected error in segmented render: {str(e)}")
+        return False
+    finally:
+        for name in os.listdir(chunk_dir):
+            try:
+                os.remove(os.path.join(chunk_dir, name))
+            except OSError:
+                pass
+        try:
+            os.rmdir(chunk_dir)
+        except OSError:
+            pass
@@ -9,7 +9,12 @@ from pathlib import Path
 from generators.brainrot_generator import transform_to_brainrot, clean_text_for_tts
 from pydub import AudioSegment
 from utils.logger import log_info, log_error
-from constants import SUBTITLE_STYLE, FFMPEG_PARAMS
+from utils.media_probe import probe_duration
+from utils.cpu_budget import ffmpeg_thread_args
+from utils.ffmpeg_runner import run_ffmpeg
+from utils.keyframe_index import get_keyframes, choose_keyframe_start
+from constants import SUBTITLE_STYLE, FFMPEG_PARAMS, OUTPUT_PROFILES, DEFAULT_OUTPUT_PROFILE
+from constants import VIDEO_CONFIG as OUTPUT_VIDEO_CONFIG
 
 # ===== SUBTITLE STYLE CONFIGURATION =====
 SUBTITLE_STYLES = {
@@ -86,15 +91,8 @@ def generate_ass_style_line(style_name, style_config):
 
 
 def get_duration(file_path):
-    """Get duration of a media file using ffprobe"""
-    cmd = [
-        'ffprobe',
-        '-v', 'error',
-        '-show_entries', 'format=duration',
-        '-of', 'default=noprint_wrappers=1:nokey=1',
-        file_path
-    ]
-    return float(subprocess.check_output(cmd).decode('utf-8').strip())
+    """Get duration of a media file (ffprobe results are cached, see utils.media_probe)"""
+    return probe_duration(file_path)
 
 # Use this if you need to trim longer videos from sample video
 
@@ -112,7 +110,7 @@ def trim_video(input_path, output_path, duration=120):
             '-y',  # Overwrite without asking
             output_path
         ]
-        subprocess.run(command, check=True)
+        run_ffmpeg(command, label="trim")
 
 # Crop video to 9:16 aspect ratio
 
@@ -124,7 +122,7 @@ def crop_to_vertical(input_path, output_path):
     target_height = VIDEO_CONFIG["height"]
 
     # Create proper 9:16 aspect ratio
-    subprocess.run([
+    run_ffmpeg([
         'ffmpeg',
         '-i', input_path,
         # This maintains the height and adjusts width for 9:16 ratio
@@ -133,9 +131,10 @@ def crop_to_vertical(input_path, output_path):
         '-preset', FFMPEG_PARAMS["preset"],
         '-crf', str(FFMPEG_PARAMS["crf"]),
         '-c:a', 'copy',
+        *ffmpeg_thread_args(),
         '-y',
         output_path
-    ], check=True)
+    ], label="crop")
 
     log_info(f"Cropped video to 9:16 ratio: {target_width}x{target_height}")
     return output_path
@@ -274,6 +273,177 @@ def generate_ffmpeg_filters(subtitle_entries, font_size=80, font_path="/System/L
     return filter_string
 
 
+def escape_filter_value(value):
+    """Escape a filter option value for use in an ffmpeg filtergraph.
+
+    Values with special characters are quoted for the option parser (which
+    splits on ':') and then backslash-escaped for the filtergraph parser
+    (which splits on ',', ';' and '[...]' and strips one level of quoting).
+    Plain values are returned unchanged.
+    """
+    value = str(value)
+    if not re.search(r"[\\'\[\],;:=]", value):
+        return value
+    quoted = "'" + value.replace("'", "'\\''") + "'"
+    return re.sub(r"([\\'\[\],;])", r"\\\1", quoted)
+
+
+def build_subtitle_filter(
+    subtitle_file_path,
+    font_size=None,
+    font_name=None,
+    margin_v=None,
+    margin_h=None,
+    outline=None,
+    shadow=None,
+    bg_opacity=None,
+    position=None,
+    border_style=None
+):
+    """Build the ffmpeg `subtitles=` filter, applying any style overrides.
+
+    Overrides default to the values in SUBTITLE_STYLE; when none are given the
+    styles embedded in the ASS file are used unchanged.
+    """
+    subtitle_file = escape_filter_value(subtitle_file_path)
+    if not any([font_size, font_name, margin_v, margin_h, outline, shadow, bg_opacity, position, border_style]):
+        return f"subtitles={subtitle_file}"
+
+    # Start with defaults from constants
+    style_params = {
+        'font_size': font_size or SUBTITLE_STYLE['font_size'],
+        'font_name': font_name or SUBTITLE_STYLE['font_name'],
+        'margin_v': margin_v or SUBTITLE_STYLE['margin_v'],
+        'margin_l': margin_h or SUBTITLE_STYLE['margin_l'],
+        'margin_r': margin_h or SUBTITLE_STYLE['margin_r'],
+        'outline': outline or SUBTITLE_STYLE['outline'],
+        'shadow': shadow or SUBTITLE_STYLE['shadow'],
+        'bg_opacity': bg_opacity if bg_opacity is not None else SUBTITLE_STYLE['bg_opacity'],
+        'position': position or SUBTITLE_STYLE['alignment'],
+        'border_style': border_style or SUBTITLE_STYLE['border_style']
+    }
+
+    # Create the custom ASS style string with overrides (libass expects commas)
+    custom_style = (f"FontName={style_params['font_name']},"
+                    f"FontSize={style_params['font_size']},"
+                    f"PrimaryColour={SUBTITLE_STYLE['primary_color']},"
+                    f"SecondaryColour={SUBTITLE_STYLE['secondary_color']},"
+                    f"OutlineColour={SUBTITLE_STYLE['outline_color']},"
+                    f"BackColour={SUBTITLE_STYLE['back_color']},"
+                    f"Bold=1,Italic=0,"
+                    f"BorderStyle={style_params['border_style']},"
+                    f"Outline={style_params['outline']},"
+                    f"Shadow={style_params['shadow']},"
+                    f"Alignment={style_params['position']},"
+                    f"MarginL={style_params['margin_l']},"
+                    f"MarginR={style_params['margin_r']},"
+                    f"MarginV={style_params['margin_v']}")
+
+    return f"subtitles={subtitle_file}:force_style={escape_filter_value(custom_style)}"
+
+
+def get_output_profile(profile=None):
+    """Return the settings of a named output profile (see OUTPUT_PROFILES)"""
+    name = profile or DEFAULT_OUTPUT_PROFILE
+    if name not in OUTPUT_PROFILES:
+        raise ValueError(
+            f"Unknown output profile '{name}'. Available: {list(OUTPUT_PROFILES.keys())}")
+    return OUTPUT_PROFILES[name]
+
+
+def build_background_input(input_video_path, start_time=0.0, duration=None):
+    """Return ffmpeg input arguments reading a background segment.
+
+    If the segment runs past the end of the background, the input is looped
+    with -stream_loop: playback starts at start_time, wraps around to the
+    beginning and continues until duration is reached. No concat list or
+    extended copy of the background is written.
+
+    Args:
+        input_video_path: Path to the background video
+        start_time: Offset into the background in seconds
+        duration: Length of the segment (None reads to the end, no looping)
+
+    Returns:
+        List of ffmpeg arguments ending with "-i input_video_path"
+    """
+    args = []
+    if duration is not None:
+        total_duration = get_duration(input_video_path)
+        start_time = start_time % total_duration if total_duration > 0 else 0.0
+        if start_time + duration > total_duration:
+            args += ["-stream_loop", "-1"]
+    # Input seeking (-ss before -i) is frame accurate when transcoding
+    args += ["-ss", str(start_time)]
+    if duration is not None:
+        args += ["-t", str(duration)]
+    args += ["-i", input_video_path]
+    return args
+
+
+def choose_segment_start(input_video, target_duration):
+    """Pick a random start time for a segment of target_duration.
+
+    The start is taken from the video's keyframe index when available. If the
+    video is shorter than the target duration any start works: the renders
+    loop the background (see build_background_input) and wrap around.
+    Returns None if the video is missing or has no duration.
+    """
+    # Get total duration of input video
+    try:
+        total_duration = get_duration(input_video)
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        log_error(f"Could not probe input video {input_video}: {str(e)}")
+        return None
+    if total_duration <= 0:
+        log_error(f"Input video {input_video} has no duration")
+        return None
+
+    # Calculate maximum start time to ensure we can get the full target duration
+    max_start = total_duration - target_duration
+
+    if max_start < 0:
+        log_info(
+            f"Input video ({total_duration:.2f}s) is shorter than target duration "
+            f"({target_duration:.2f}s), it will be looped")
+        keyframes = [k for k in get_keyframes(input_video) if k < total_duration]
+        return random.choice(keyframes) if keyframes else random.uniform(0, total_duration)
+
+    # Start on a keyframe so stream-copy cuts are exact and seeking is cheap
+    keyframe_start = choose_keyframe_start(
+        get_keyframes(input_video), total_duration, target_duration)
+    if keyframe_start is not None:
+        return keyframe_start
+
+    log_info(
+        f"No keyframe index available for {input_video}, using an arbitrary start time")
+    # Generate random start time
+    return random.uniform(0, max_start)
+
+
+def build_background_filters(crop=True, profile=None):
+    """Return the filters bringing the background to an output profile's format.
+
+    Args:
+        crop: Crop a landscape background to 9:16 first
+        profile: Output profile name, defaults to DEFAULT_OUTPUT_PROFILE
+
+    Returns:
+        List of ffmpeg video filters (possibly empty)
+    """
+    settings = get_output_profile(profile)
+    filters = []
+    if crop:
+        filters.append("crop=ih*9/16:ih")
+    # Vertical backgrounds are already at the production size
+    if crop or (settings["width"], settings["height"]) != \
+            (OUTPUT_VIDEO_CONFIG["width"], OUTPUT_VIDEO_CONFIG["height"]):
+        filters.append(f"scale={settings['width']}:{settings['height']}")
+    if settings["fps"]:
+        filters.append(f"fps={settings['fps']}")
+    return filters
+
+
 def add_subtitles_and_overlay_audio(
     input_video_path,
     subtitle_file_path,
@@ -313,47 +483,14 @@ def add_subtitles_and_overlay_audio(
         bool: True if successful, False otherwise
     """
     try:
-        # Create a custom style string if any overrides were provided
-        custom_style = None
-        if any([font_size, font_name, margin_v, margin_h, outline, shadow, bg_opacity, position, border_style]):
-            # Start with defaults from constants
-            style_params = {
-                'font_size': font_size or SUBTITLE_STYLE['font_size'],
-                'font_name': font_name or SUBTITLE_STYLE['font_name'],
-                'margin_v': margin_v or SUBTITLE_STYLE['margin_v'],
-                'margin_l': margin_h or SUBTITLE_STYLE['margin_l'],
-                'margin_r': margin_h or SUBTITLE_STYLE['margin_r'],
-                'outline': outline or SUBTITLE_STYLE['outline'],
-                'shadow': shadow or SUBTITLE_STYLE['shadow'],
-                'bg_opacity': bg_opacity if bg_opacity is not None else SUBTITLE_STYLE['bg_opacity'],
-                'position': position or SUBTITLE_STYLE['alignment'],
-                'border_style': border_style or SUBTITLE_STYLE['border_style']
-            }
-
-            # Create the custom ASS style string with overrides
-            custom_style = (f"FontName={style_params['font_name']}:"
-                            f"FontSize={style_params['font_size']}:"
-                            f"PrimaryColour={SUBTITLE_STYLE['primary_color']}:"
-                            f"SecondaryColour={SUBTITLE_STYLE['secondary_color']}:"
-                            f"OutlineColour={SUBTITLE_STYLE['outline_color']}:"
-                            f"BackColour={SUBTITLE_STYLE['back_color']}:"
-                            f"Bold=1:Italic=0:"
-                            f"BorderStyle={style_params['border_style']}:"
-                            f"Outline={style_params['outline']}:"
-                            f"Shadow={style_params['shadow']}:"
-                            f"Alignment={style_params['position']}:"
-                            f"MarginL={style_params['margin_l']}:"
-                            f"MarginR={style_params['margin_r']}:"
-                            f"MarginV={style_params['margin_v']}")
-
         # FFmpeg command to add subtitles and audio
         output_with_sub_path = os.path.join(temp_dir, "output_with_sub.mp4")
 
-        # Construct subtitle filter based on whether we have a custom style
-        if custom_style:
-            subtitle_filter = f"subtitles={subtitle_file_path}:force_style='{custom_style}'"
-        else:
-            subtitle_filter = f"subtitles={subtitle_file_path}"
+        subtitle_filter = build_subtitle_filter(
+            subtitle_file_path, font_size=font_size, font_name=font_name,
+            margin_v=margin_v, margin_h=margin_h, outline=outline,
+            shadow=shadow, bg_opacity=bg_opacity, position=position,
+            border_style=border_style)
 
         # Add subtitles first
         subtitle_cmd = [
@@ -364,11 +501,12 @@ def add_subtitles_and_overlay_audio(
             "-preset", FFMPEG_PARAMS["preset"],
             "-crf", str(FFMPEG_PARAMS["crf"]),
             "-c:a", "copy",
+            *ffmpeg_thread_args(),
             "-y", output_with_sub_path
         ]
 
         log_info(f"Running subtitle command: {' '.join(subtitle_cmd)}")
-        subprocess.run(subtitle_cmd, check=True)
+        run_ffmpeg(subtitle_cmd, label="subtitles")
 
         # Then overlay audio
         audio_cmd = [
@@ -384,7 +522,7 @@ def add_subtitles_and_overlay_audio(
         ]
 
         log_info(f"Running audio overlay command: {' '.join(audio_cmd)}")
-        subprocess.run(audio_cmd, check=True)
+        run_ffmpeg(audio_cmd, label="audio overlay")
 
         return True
     except subprocess.CalledProcessError as e:
@@ -395,6 +533,74 @@ def add_subtitles_and_overlay_audio(
         return False
 
 
+def render_single_pass(
+    input_video_path,
+    subtitle_file_path,
+    audio_file_path,
+    output_path,
+    start_time=0.0,
+    duration=None,
+    crop=True,
+    profile=None,
+    **style_overrides
+):
+    """
+    Render the final video in a single ffmpeg invocation.
+
+    Seeks into the background video, crops/scales it to the vertical output
+    size, burns in the subtitles and muxes the audio track in one filtergraph,
+    so every frame is decoded and encoded exactly once. This replaces the
+    extract_random_segment -> crop_to_vertical -> add_subtitles_and_overlay_audio
+    chain used by the "multi_pass" render mode.
+
+    Args:
+        input_video_path (str): Path to the full background video
+        subtitle_file_path (str): Path to the subtitle file in ASS format
+        audio_file_path (str): Path to the audio file
+        output_path (str): Path to write output video
+        start_time (float): Offset into the background video in seconds
+        duration (float, optional): Length of the output; defaults to the audio length
+        crop (bool): Crop/scale to 9:16. Disable for already vertical inputs.
+        profile (str, optional): Output profile name, see OUTPUT_PROFILES
+        **style_overrides: Subtitle style overrides, see build_subtitle_filter
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        settings = get_output_profile(profile)
+        filters = build_background_filters(crop, profile)
+        filters.append(build_subtitle_filter(
+            subtitle_file_path, **style_overrides))
+
+        cmd = ["ffmpeg", *build_background_input(input_video_path, start_time, duration)]
+        cmd += [
+            "-i", audio_file_path,
+            "-filter_complex", f"[0:v]{','.join(filters)}[v]",
+            "-map", "[v]",
+            "-map", "1:a:0",
+            "-c:v", FFMPEG_PARAMS["video_codec"],
+            "-preset", settings["preset"],
+            "-crf", str(settings["crf"]),
+            "-c:a", FFMPEG_PARAMS["audio_codec"],
+            "-b:a", settings["audio_bitrate"],
+            "-shortest",
+            *ffmpeg_thread_args(),
+            "-y", output_path
+        ]
+
+        log_info(f"Running single-pass render command: {' '.join(cmd)}")
+        run_ffmpeg(cmd, label="single-pass render")
+
+        return True
+    except subprocess.CalledProcessError as e:
+        log_error(f"Error in single-pass render: {str(e)}")
+        return False
+    except Exception as e:
+        log_error(f"Unexpected error in single-pass render: {str(e)}")
+        return False
+
+
 def extend_video(video_path, temp_dir, target_duration, video_duration):
     """Extend a video by looping to reach target duration"""
     temp_extended_video = os.path.join(temp_dir, "temp_extended_video.mp4")
@@ -402,20 +608,16 @@ def extend_video(video_path, temp_dir, target_duration, video_duration):
     # Calculate the number of loops needed (round up)
     loops_needed = math.ceil(target_duration / video_duration)
 
-    # Create a temporary file list for concat
-    concat_file = os.path.join(temp_dir, "concat_list.txt")
-    with open(concat_file, 'w') as f:
-        for _ in range(loops_needed):
-            f.write(f"file '{os.path.abspath(video_path)}'\n")
-
-    # Concatenate the video with itself multiple times
-    concat_cmd = [
-        'ffmpeg', '-y', '-f', 'concat', '-safe', '0',
-        '-i', concat_file,
+    # Loop the input in the demuxer, no concat list needed
+    loop_cmd = [
+        'ffmpeg', '-y',
+        '-stream_loop', str(loops_needed - 1),
+        '-i', video_path,
+        '-t', str(target_duration),
         '-c', 'copy',
         temp_extended_video
     ]
-    subprocess.run(concat_cmd, check=True)
+    run_ffmpeg(loop_cmd, label="extend")
     print(f"Extended video created with duration for {loops_needed} loops")
 
     return temp_extended_video
@@ -436,16 +638,14 @@ def ensure_matching_duration(video_path, target_duration, temp_dir):
         # Create temp file for the adjusted video
         temp_adjusted = os.path.join(temp_dir, "temp_adjusted.mp4")
 
-        # Use ffmpeg to extend the video
+        # Use ffmpeg to trim the video, looping it if it is too short
         trim_cmd = [
             'ffmpeg', '-y',
-            '-i', video_path,
-            # Duration in seconds with buffer
-            '-t', str(target_duration_with_buffer),
+            *build_background_input(video_path, 0.0, target_duration_with_buffer),
             '-c:v', 'copy', '-c:a', 'copy',
             temp_adjusted
         ]
-        subprocess.run(trim_cmd, check=True)
+        run_ffmpeg(trim_cmd, label="match duration")
 
         # Replace the output file with the adjusted version
         os.replace(temp_adjusted, video_path)
@@ -921,45 +1121,52 @@ def seconds_to_srt_time(seconds):
 
 
 def adjust_subtitles_with_silence_data(subtitle_entries, silence_periods, audio_duration):
-    """Adjust subtitle timing based on detected silence periods in audio"""
+    """Adjust subtitle timing based on detected silence periods in audio
+
+    Subtitles end where a pause starts inside them, and a subtitle starting
+    shortly before the end of a pause is delayed until speech resumes. Both
+    lists are sorted, so a single merge sweep handles them in O(n + m).
+    """
     if not subtitle_entries or not silence_periods:
         return subtitle_entries
 
-    adjusted_entries = subtitle_entries.copy()
-
     # Find significant pauses (longer than 0.3 seconds)
-    significant_pauses = [(start, end)
-                          for start, end in silence_periods if end - start > 0.3]
+    significant_pauses = sorted((start, end)
+                                for start, end in silence_periods if end - start > 0.3)
 
     if not significant_pauses:
         return subtitle_entries
 
     # Sort entries by start time
-    adjusted_entries = sorted(adjusted_entries, key=lambda e: e.start_time)
+    adjusted_entries = sorted(subtitle_entries, key=lambda e: e.start_time)
 
-    # For each subtitle, check if there's a silence period nearby
+    pause_count = len(significant_pauses)
+    by_start = 0  # First pause starting after the current subtitle's start
+    by_end = 0    # First pause ending after the current subtitle's start
     for i, entry in enumerate(adjusted_entries):
-        # Look for silence periods that overlap with this subtitle timing
-        for silence_start, silence_end in significant_pauses:
-            # If a silence period starts during this subtitle, try to end the subtitle there
-            if entry.start_time < silence_start < entry.end_time:
-                # End subtitle at silence start (with small buffer)
-                adjusted_entries[i].end_time = silence_start - 0.1
+        # If a silence period ends just after this subtitle starts, delay the
+        # subtitle to align with the speech after the pause
+        if i > 0:
+            while by_end < pause_count and significant_pauses[by_end][1] <= entry.start_time:
+                by_end += 1
+            if by_end < pause_count:
+                silence_end = significant_pauses[by_end][1]
+                # Add a small buffer after silence ends
+                if silence_end - entry.start_time < 0.5 and silence_end + 0.1 < entry.end_time:
+                    entry.start_time = silence_end + 0.1
+                    print(f"Delayed subtitle {i+1} to align with speech after pause")
+
+        # If a silence period starts during this subtitle, end the subtitle there
+        while by_start < pause_count and significant_pauses[by_start][0] <= entry.start_time:
+            by_start += 1
+        if by_start < pause_count:
+            silence_start = significant_pauses[by_start][0]
+            # End subtitle at silence start (with small buffer)
+            if silence_start < entry.end_time and silence_start - 0.1 > entry.start_time:
+                entry.end_time = silence_start - 0.1
                 print(
                     f"Adjusted subtitle {i+1} to end at natural pause: {silence_start:.2f}s")
 
-            # If next subtitle exists and a silence period ends just before it
-            if i < len(adjusted_entries) - 1:
-                next_subtitle = adjusted_entries[i+1]
-                # If silence ends shortly before next subtitle, delay next subtitle to align with speech
-                if abs(silence_end - next_subtitle.start_time) < 0.5:
-                    time_diff = silence_end - next_subtitle.start_time
-                    if time_diff > 0:
-                        # Add a small buffer after silence ends
-                        adjusted_entries[i+1].start_time = silence_end + 0.1
-                        print(
-                            f"Delayed subtitle {i+2} to align with speech after pause")
-
     return adjusted_entries
 
 
@@ -1,4 +1,4 @@
-from core.server import app
+from core.server import run_server
 
 if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0', port=5500)
+    run_server(host='0.0.0.0', port=5500, debug=True)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the forced alignment backends on a 3-minute clip.
+
+By default a synthetic emission matrix of a 3-minute, ~300-word script is
+used (wav2vec2 emits 50 frames per second), so no model download is needed:
+
+    python tests/benchmark_alignment.py
+
+The reference torch loop (force_alignment.trellis_algo) is included when
+torch is installed. With --audio and --text the emission of a real clip is
+computed with the wav2vec2 model first.
+
+The Numba and NumPy backends are timed with the full trellis and with the
+banded trellis of ALIGNMENT_CONFIG["band_tokens"], whose memory is shown too.
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import ALIGNMENT_CONFIG
+from generators.alignment_engine import (
+    available_backends, backtrack, band_offsets, forced_align, prepare_transcript)
+
+LABELS = tuple("-|ETAONIHSRDLUMWCFGYPBVK'XJQZ")
+WORDS = ("the fake news will not tell you this but we have huge numbers folks "
+         "tremendous really beautiful everybody is talking about it").split()
+
+
+def synthetic_clip(seconds=180, words=300, frame_rate=50, seed=0):
+    """Return (labels, text, emission) of a synthetic clip"""
+    rng = np.random.default_rng(seed)
+    text = ' '.join(rng.choice(WORDS, size=words))
+    _, _, tokens = prepare_transcript(text, LABELS)
+
+    num_frame = seconds * frame_rate
+    logits = rng.normal(-6.0, 1.0, size=(num_frame, len(LABELS))).astype(np.float32)
+    logits[:, 0] = 0.0
+    positions = np.linspace(0, num_frame - 1, len(tokens), dtype=np.int64)
+    logits[positions, tokens] = 4.0
+    logits -= np.log(np.exp(logits).sum(axis=1, keepdims=True))
+    return LABELS, text, logits
+
+
+def real_clip(audio_path, text_path):
+    """Return (labels, text, emission) of a real clip using the wav2vec2 model"""
+    from generators.force_alignment import class_label_prob
+    emission, labels, _, _ = class_label_prob(audio_path)
+    if emission.dim() == 3:
+        emission = emission[:, 0, :]
+    with open(text_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    return labels, text, emission.numpy()
+
+
+def measure(function, repeat):
+    """Return the best wall time of `repeat` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark forced alignment backends")
+    parser.add_argument("--audio", help="16kHz WAV of a real clip")
+    parser.add_argument("--text", help="Script of the real clip")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.audio and args.text:
+        labels, text, emission = real_clip(args.audio, args.text)
+    else:
+        labels, text, emission = synthetic_clip()
+    _, transcript, tokens = prepare_transcript(text, labels)
+    print(f"Emission: {emission.shape[0]} frames "
+          f"({emission.shape[0] / 50:.0f}s), {len(tokens)} tokens")
+
+    band_tokens = ALIGNMENT_CONFIG["band_tokens"]
+    _, width = band_offsets(emission.shape[0], len(tokens), band_tokens)
+    print(f"Trellis memory: full {emission.shape[0] * len(tokens) * 4 / 1024 ** 2:.1f} MiB, "
+          f"band of {band_tokens} tokens {emission.shape[0] * width * 4 / 1024 ** 2:.1f} MiB")
+
+    results = {}
+    for backend in available_backends():
+        variants = {backend: 0} if backend == "torchaudio" else {
+            f"{backend} (full)": 0, f"{backend} (banded)": band_tokens}
+        for name, band in variants.items():
+            # First call compiles the Numba kernel
+            forced_align(emission, tokens, backend=backend, band_tokens=band)
+            results[name] = measure(
+                lambda: forced_align(emission, tokens, backend=backend, band_tokens=band),
+                args.repeat)
+
+    try:
+        import torch
+        from generators.force_alignment import trellis_algo
+
+        def reference():
+            trellis, _, ref_tokens = trellis_algo(labels, transcript, torch.from_numpy(emission))
+            backtrack(trellis.numpy(), emission, ref_tokens)
+        results["reference (torch loop)"] = measure(reference, 1)
+    except ImportError:
+        print("torch not installed, skipping the reference implementation")
+
+    baseline = results.get("reference (torch loop)")
+    for name, seconds in sorted(results.items(), key=lambda item: item[1]):
+        speedup = f"  {baseline / seconds:6.1f}x" if baseline else ""
+        print(f"{name:>24}: {seconds * 1000:9.1f} ms{speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the int8 quantized alignment model against fp32.
+
+Runs the emission pass of both models over a fixed set of generated clips
+(the `*_audio_converted.wav` and `*_text.txt` pairs the pipeline writes to
+outputs/), then aligns each script with both emissions and reports the
+emission speedup and how far the int8 word boundaries land from fp32's:
+
+    python tests/benchmark_quantized_alignment.py --clips outputs --limit 10
+
+Needs torch/torchaudio and downloads the wav2vec2 model on first use.
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import numpy as np
+import torch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import ALIGNMENT_CONFIG
+from generators import model_registry
+from generators.force_alignment import load_waveform, windowed_emission, timings_from_emission
+
+
+def find_clips(directory, limit):
+    """Return sorted (wav, text) pairs of pipeline outputs"""
+    clips = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, "**", "*_audio_converted.wav"),
+                                     recursive=True)):
+        text_path = wav_path[:-len("_audio_converted.wav")] + "_text.txt"
+        if os.path.exists(text_path):
+            clips.append((wav_path, text_path))
+    return clips[:limit]
+
+
+def emission_pass(model, waveform, sample_rate):
+    """Log-probabilities of a (samples,) waveform, windowed like the pipeline"""
+    window_samples = int(ALIGNMENT_CONFIG["window_seconds"] * sample_rate) or waveform.size(0)
+    overlap_samples = int(ALIGNMENT_CONFIG["window_overlap_seconds"] * sample_rate)
+    return windowed_emission(model, waveform, window_samples, overlap_samples)
+
+
+def measure(function, repeat):
+    """Return (result, best wall time) of `repeat` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the int8 alignment model against fp32")
+    parser.add_argument("--clips", default="outputs", help="Directory of generated clips")
+    parser.add_argument("--limit", type=int, default=10, help="Number of clips")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, help="Torch threads (default: torch's)")
+    args = parser.parse_args()
+
+    clips = find_clips(args.clips, args.limit)
+    if not clips:
+        print(f"No *_audio_converted.wav / *_text.txt pairs found in {args.clips}")
+        return 1
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    cpu = torch.device("cpu")
+    bundle, fp32 = model_registry.get_model(cpu, quantized=False)
+    _, int8 = model_registry.get_model(cpu, quantized=True)
+    if fp32 is None or int8 is None:
+        print("Could not load the alignment model")
+        return 1
+    labels = bundle.get_labels()
+
+    total_fp32 = total_int8 = total_audio = 0.0
+    errors = []
+    print(f"{'clip':>40}  {'audio':>7}  {'fp32':>9}  {'int8':>9}  {'speedup':>7}  {'mean err':>8}  {'max err':>8}")
+    for wav_path, text_path in clips:
+        waveform = load_waveform(wav_path, bundle.sample_rate)[0]
+        with open(text_path, 'r', encoding='utf-8') as f:
+            text = f.read().strip()
+        seconds = waveform.size(0) / bundle.sample_rate
+
+        emission_pass(fp32, waveform, bundle.sample_rate)  # Warm up
+        fp32_emission, fp32_time = measure(
+            lambda: emission_pass(fp32, waveform, bundle.sample_rate), args.repeat)
+        int8_emission, int8_time = measure(
+            lambda: emission_pass(int8, waveform, bundle.sample_rate), args.repeat)
+
+        frame_seconds = seconds / fp32_emission.size(0)
+        reference = timings_from_emission(fp32_emission.numpy(), labels, text, frame_seconds)
+        quantized = timings_from_emission(int8_emission.numpy(), labels, text, frame_seconds)
+        clip_errors = [abs(value - expected) * 1000
+                       for (_, *times), (_, *expected_times) in zip(quantized, reference)
+                       for value, expected in zip(times[:2], expected_times[:2])]
+        errors.extend(clip_errors)
+
+        total_fp32 += fp32_time
+        total_int8 += int8_time
+        total_audio += seconds
+        print(f"{os.path.basename(wav_path)[-40:]:>40}  {seconds:6.1f}s  {fp32_time * 1000:7.0f}ms  "
+              f"{int8_time * 1000:7.0f}ms  {fp32_time / int8_time:6.2f}x  "
+              f"{np.mean(clip_errors):6.1f}ms  {np.max(clip_errors):6.1f}ms")
+
+    errors = np.array(errors)
+    print(f"\n{len(clips)} clips, {total_audio:.0f}s of audio")
+    print(f"Emission pass: fp32 {total_fp32:.2f}s, int8 {total_int8:.2f}s "
+          f"({total_fp32 / total_int8:.2f}x faster)")
+    print(f"Word boundary error vs fp32: mean {errors.mean():.1f}ms, "
+          f"p95 {np.percentile(errors, 95):.1f}ms, max {errors.max():.1f}ms "
+          f"({np.mean(errors == 0) * 100:.0f}% identical)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared alignment service.
+Verifies job batching within the window, length-bucketed batch planning and
+the client round trip over the Unix socket (with a stand-in service).
+"""
+
+import os
+import sys
+import time
+import queue
+import tempfile
+import threading
+from unittest.mock import patch
+from multiprocessing.connection import Listener
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generators import alignment_service
+
+
+def test_gather_batch_window():
+    """Jobs arriving within the window share a batch, capped at max_batch"""
+    jobs = queue.Queue()
+    for i in range(5):
+        jobs.put(i)
+    assert alignment_service.gather_batch(jobs, 0.05, max_batch=3) == [0, 1, 2]
+
+    def late_job():
+        time.sleep(0.02)
+        jobs.put(5)
+    threading.Thread(target=late_job).start()
+    assert alignment_service.gather_batch(jobs, 0.2, max_batch=8) == [3, 4, 5]
+
+    jobs.put(6)
+    start = time.monotonic()
+    assert alignment_service.gather_batch(jobs, 0.05, max_batch=8) == [6]
+    assert time.monotonic() - start < 0.5
+    print("✓ Batch window test passed")
+
+
+def test_plan_batches():
+    """Similar lengths are grouped until the padded size exceeds the cap"""
+    lengths = [100, 900, 120, 1000, 110]
+    assert alignment_service.plan_batches(lengths, max_samples=2000) == [[3, 1], [2, 4, 0]]
+    # A sequence longer than the cap still gets its own pass
+    assert alignment_service.plan_batches([5000, 10], max_samples=1000) == [[0], [1]]
+    assert alignment_service.plan_batches([], max_samples=1000) == []
+    print("✓ Batch planning test passed")
+
+
+def test_client_round_trip():
+    """align() sends the job and returns the service's word timings"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = {"enabled": True, "address": os.path.join(temp_dir, "align.sock"), "timeout": 5}
+        with patch.dict(alignment_service.ALIGNMENT_SERVICE_CONFIG, config):
+            # Not running yet: the caller aligns inline
+            assert alignment_service.align("speech.wav", "hello") is None
+
+            listener = Listener(config["address"], family='AF_UNIX',
+                                authkey=alignment_service.AUTHKEY)
+            received = []
+
+            def service():
+                for status in ("ok", "error"):
+                    with listener.accept() as connection:
+                        received.append(connection.recv())
+                        connection.send((status, [("hello", 0.1, 0.4, 0.9)]))
+            thread = threading.Thread(target=service)
+            thread.start()
+
+            timings = alignment_service.align("speech.wav", "hello")
+            assert timings == [("hello", 0.1, 0.4, 0.9)]
+            assert received == [(os.path.abspath("speech.wav"), "hello")]
+            try:
+                alignment_service.align("speech.wav", "hello")
+                assert False, "Expected the service error to be raised"
+            except RuntimeError:
+                pass
+            thread.join()
+            listener.close()
+    print("✓ Client round trip test passed")
+
+
+def test_onnx_runtime_skips_service():
+    """With the ONNX runtime the service isn't started and workers align inline"""
+    config = {"enabled": True}
+    with patch.dict(alignment_service.ALIGNMENT_SERVICE_CONFIG, config), \
+            patch.dict(alignment_service.ALIGNMENT_CONFIG, config), \
+            patch.dict(alignment_service.ALIGNMENT_MODEL_CONFIG, {"runtime": "onnx"}):
+        assert alignment_service.start() is None
+        assert alignment_service.align("speech.wav", "hello") is None
+    print("✓ ONNX runtime test passed")
+
+
+if __name__ == "__main__":
+    print("Testing alignment service...")
+    test_gather_batch_window()
+    test_plan_batches()
+    test_client_round_trip()
+    test_onnx_runtime_skips_service()
+    print("\n✅ All alignment service tests passed!")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for the mezzanine asset library.
+Verifies that manifest entries are only used while the source video is
+unchanged, and that mezzanines are encoded with a fixed GOP and no audio.
+"""
+
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generators import asset_library
+from constants import VIDEO_CONFIG
+
+
+def fake_ffmpeg(commands):
+    """run_ffmpeg stand-in that records the command and writes its output file"""
+    def run(command, **kwargs):
+        commands.append(command)
+        with open(command[-1], 'wb') as f:
+            f.write(b"mezzanine")
+    return run
+
+
+def build(temp_dir, source_path, **kwargs):
+    """prepare_mezzanine into temp_dir with ffmpeg mocked out, returns (entry, commands)"""
+    commands = []
+    config = {"dir": temp_dir, "gop_seconds": 1.0}
+    with patch.dict(asset_library.MEZZANINE_CONFIG, config), \
+            patch.object(asset_library, "run_ffmpeg", fake_ffmpeg(commands)):
+        entry = asset_library.prepare_mezzanine("test", source_path, **kwargs)
+    return entry, commands
+
+
+def test_mezzanine_command():
+    """Fixed keyframe interval, no scene-cut keyframes, audio dropped"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = os.path.join(temp_dir, "source.mp4")
+        with open(source_path, 'wb') as f:
+            f.write(b"source")
+
+        entry, commands = build(temp_dir, source_path, threads=2)
+        assert len(commands) == 1
+        cmd = commands[0]
+        gop_frames = str(int(round(VIDEO_CONFIG["fps"] * 1.0)))
+        assert cmd[cmd.index("-g") + 1] == gop_frames
+        assert cmd[cmd.index("-keyint_min") + 1] == gop_frames
+        assert cmd[cmd.index("-sc_threshold") + 1] == "0"
+        assert "-an" in cmd
+        assert cmd[cmd.index("-threads") + 1] == "2"
+        assert cmd[cmd.index("-i") + 1] == source_path
+        assert f"scale={VIDEO_CONFIG['width']}:{VIDEO_CONFIG['height']}" in cmd[cmd.index("-vf") + 1]
+
+        # Written through a temp file, then moved into place
+        assert cmd[-1] != entry["path"] and os.path.exists(entry["path"])
+        assert not os.path.exists(cmd[-1])
+        assert entry["gop_seconds"] == 1.0
+    print("✓ Mezzanine command test passed")
+
+
+def test_stale_entries_are_rejected():
+    """A changed source size or mtime invalidates the manifest entry"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = os.path.join(temp_dir, "source.mp4")
+        with open(source_path, 'wb') as f:
+            f.write(b"source")
+        os.utime(source_path, (1000000, 1000000))
+
+        with patch.dict(asset_library.MEZZANINE_CONFIG, {"dir": temp_dir}):
+            entry, commands = build(temp_dir, source_path)
+            assert asset_library.get_mezzanine(source_path) == entry
+
+            # Up to date: not rebuilt
+            _, commands = build(temp_dir, source_path)
+            assert commands == []
+
+            # Same size, different mtime
+            os.utime(source_path, (2000000, 2000000))
+            assert asset_library.get_mezzanine(source_path) is None
+
+            # Same mtime as the manifest, different size
+            with open(source_path, 'wb') as f:
+                f.write(b"a longer source")
+            os.utime(source_path, (1000000, 1000000))
+            assert asset_library.get_mezzanine(source_path) is None
+
+            # A stale entry is rebuilt and replaced
+            entry, commands = build(temp_dir, source_path)
+            assert len(commands) == 1
+            assert asset_library.get_mezzanine(source_path) == entry
+            assert entry["source_size"] == len(b"a longer source")
+
+            # Missing mezzanine file or source
+            os.remove(entry["path"])
+            assert asset_library.get_mezzanine(source_path) is None
+            assert asset_library.get_mezzanine(os.path.join(temp_dir, "missing.mp4")) is None
+    print("✓ Stale manifest entry test passed")
+
+
+if __name__ == "__main__":
+    print("Testing mezzanine asset library...")
+    test_mezzanine_command()
+    test_stale_entries_are_rejected()
+    print("\n✅ All asset library tests passed!")
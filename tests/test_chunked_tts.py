@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for chunked TTS synthesis.
+Verifies script splitting, stitching and the per-chunk timing output.
+"""
+
+import os
+import sys
+import json
+import wave
+import asyncio
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import audio
+from utils.audio import build_stitch_command, split_script, stitch_wav_files, synthesize_chunked
+
+
+def write_wav(path, frames, value=1, sample_rate=16000):
+    """Write a mono 16-bit WAV file of constant samples"""
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(value.to_bytes(2, 'little') * frames)
+
+
+def test_split_at_sentences_and_breaks():
+    """Chunks end at sentences or pause markers and respect max_chars"""
+    text = ("Wow, what a crowd! (break) We have HUGE news. "
+            "The fake news won't tell you this. (long-break) Believe me.")
+    chunks = split_script(text, max_chars=50)
+    assert chunks == [
+        "Wow, what a crowd! (break) We have HUGE news.",
+        "The fake news won't tell you this. (long-break)",
+        "Believe me.",
+    ]
+    # Nothing is lost or reordered
+    assert ' '.join(chunks).split() == text.split()
+
+    # Short scripts stay in one chunk, oversized sentences split between words
+    assert split_script("One. Two.", max_chars=300) == ["One. Two."]
+    chunks = split_script("word " * 30, max_chars=20)
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    assert ' '.join(chunks).split() == ["word"] * 30
+    print("✓ Script splitting test passed")
+
+
+def test_stitch_wav_with_gap():
+    """WAV chunks are concatenated in order with silence between them"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = [os.path.join(temp_dir, f"{i}.wav") for i in range(2)]
+        write_wav(paths[0], 1600, value=1)
+        write_wav(paths[1], 800, value=2)
+        output = os.path.join(temp_dir, "out.wav")
+        stitch_wav_files(paths, output, gap_ms=100)
+
+        with wave.open(output, 'rb') as wf:
+            assert wf.getnframes() == 1600 + 1600 + 800
+            data = wf.readframes(wf.getnframes())
+        assert data[:2] == b'\x01\x00'
+        assert data[3200:3202] == b'\x00\x00'
+        assert data[-2:] == b'\x02\x00'
+    print("✓ WAV stitching test passed")
+
+
+def test_stitch_command():
+    """ffmpeg stitching pads or crossfades between chunks"""
+    cmd = build_stitch_command(["a.mp3", "b.mp3", "c.mp3"], "out.wav", gap_ms=250)
+    graph = cmd[cmd.index('-filter_complex') + 1]
+    assert graph == ("[0:a]apad=pad_dur=0.25[p0];[1:a]apad=pad_dur=0.25[p1];"
+                     "[p0][p1][2:a]concat=n=3:v=0:a=1[out]")
+
+    cmd = build_stitch_command(["a.mp3", "b.mp3", "c.mp3"], "out.wav", crossfade_ms=50)
+    graph = cmd[cmd.index('-filter_complex') + 1]
+    assert graph == "[0:a][1:a]acrossfade=d=0.05[x1];[x1][2:a]acrossfade=d=0.05[out]"
+    assert cmd[-1] == "out.wav"
+    print("✓ Stitch command test passed")
+
+
+def test_chunks_synthesized_concurrently_in_order():
+    """Chunks run concurrently up to the limit and are stitched in script order"""
+    state = {"running": 0, "peak": 0}
+
+    async def fake_generate_voice(text, voice_id, output_path, audio_format=None):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        # Later chunks finish first
+        await asyncio.sleep(0.05 * (4 - int(text)))
+        write_wav(output_path, 1600 * (int(text) + 1), value=int(text) + 1)
+        state["running"] -= 1
+        return output_path
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output = os.path.join(temp_dir, "audio.wav")
+        with patch.object(audio, "generate_voice", side_effect=fake_generate_voice):
+            _, timing = asyncio.run(synthesize_chunked(
+                ["0", "1", "2", "3"], "voice", output, audio_format="pcm",
+                max_concurrency=2, gap_ms=0, crossfade_ms=0))
+
+        assert state["peak"] == 2
+        with wave.open(output, 'rb') as wf:
+            data = wf.readframes(wf.getnframes())
+        assert data[:2] == b'\x01\x00' and data[-2:] == b'\x04\x00'
+
+        starts = [chunk["start"] for chunk in timing["chunks"]]
+        assert starts == [0.0, 0.1, 0.3, 0.6]
+        with open(os.path.join(temp_dir, "audio_chunks.json"), encoding='utf-8') as f:
+            assert json.load(f)["chunks"][3]["end"] == 1.0
+        # Chunk files are removed once stitched
+        assert sorted(os.listdir(temp_dir)) == ["audio.wav", "audio_chunks.json"]
+    print("✓ Concurrent synthesis test passed")
+
+
+if __name__ == "__main__":
+    print("Testing chunked TTS...")
+    test_split_at_sentences_and_breaks()
+    test_stitch_wav_with_gap()
+    test_stitch_command()
+    test_chunks_synthesized_concurrently_in_order()
+    print("\n✅ All chunked TTS tests passed!")
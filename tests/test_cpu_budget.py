@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for the CPU budget.
+Verifies worker/thread allocation, release and the per-process ffmpeg arguments.
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.cpu_budget import CpuBudget, THREADS_ENV_VAR, ffmpeg_thread_args, get_process_threads
+
+
+def test_single_request_gets_whole_budget():
+    """One request splits all budgeted cores between its workers"""
+    budget = CpuBudget(total_cores=16, reserved_cores=0)
+    allocation = budget.reserve(4)
+    assert allocation.workers == 4
+    assert allocation.threads_per_worker == 4
+    assert budget.snapshot()["cores_in_use"] == 16
+    print("✓ Single request allocation test passed")
+
+
+def test_overlapping_requests_share_budget():
+    """A second request only gets what is left, but at least one core"""
+    budget = CpuBudget(total_cores=8, reserved_cores=0)
+    first = budget.reserve(2)
+    assert first.cores == 8
+
+    second = budget.reserve(5)
+    assert second.workers == 1
+    assert second.threads_per_worker == 1
+
+    budget.release(first)
+    third = budget.reserve(3)
+    assert third.workers == 3
+    assert third.threads_per_worker == 2
+    assert budget.snapshot()["active_allocations"] == 2
+    print("✓ Overlapping requests test passed")
+
+
+def test_threads_per_worker_cap():
+    """Threads per worker never exceed the configured cap"""
+    budget = CpuBudget(total_cores=64, reserved_cores=0, max_threads_per_worker=16)
+    allocation = budget.reserve(1)
+    assert allocation.threads_per_worker == 16
+    print("✓ Threads per worker cap test passed")
+
+
+def test_ffmpeg_thread_args():
+    """ffmpeg arguments follow the process allocation"""
+    with patch.dict(os.environ, {THREADS_ENV_VAR: "6"}):
+        assert get_process_threads() == 6
+        assert ffmpeg_thread_args() == ["-threads", "6"]
+        assert ffmpeg_thread_args(divisor=4) == ["-threads", "1"]
+
+    with patch.dict(os.environ, {}, clear=True):
+        assert get_process_threads() is None
+        assert ffmpeg_thread_args() == []
+    print("✓ ffmpeg thread arguments test passed")
+
+
+if __name__ == "__main__":
+    print("Testing CPU budget...")
+    test_single_request_gets_whole_budget()
+    test_overlapping_requests_share_budget()
+    test_threads_per_worker_cap()
+    test_ffmpeg_thread_args()
+    print("\n✅ All CPU budget tests passed!")
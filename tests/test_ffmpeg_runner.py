@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared ffmpeg runner.
+Verifies progress parsing, event publishing, errors, cancellation and stall detection
+using a small fake ffmpeg executable.
+"""
+
+import os
+import sys
+import stat
+import tempfile
+import threading
+import subprocess
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ffmpeg_runner import FFmpegCancelled, parse_progress_block, run_ffmpeg
+
+# Writes two progress blocks like `ffmpeg -progress pipe:1`, then exits with $FAKE_EXIT
+FAKE_FFMPEG = """#!/bin/sh
+echo "frame=60"
+echo "fps=30.00"
+echo "out_time_us=1000000"
+echo "speed=0.5x"
+echo "progress=continue"
+trap 'kill $pid; exit 143' TERM
+sleep "${FAKE_SLEEP:-0}" &
+pid=$!
+wait $pid
+echo "frame=120"
+echo "fps=40.00"
+echo "out_time_us=2000000"
+echo "total_size=1024"
+echo "speed=0.75x"
+echo "progress=end"
+echo "fake error output" >&2
+exit "${FAKE_EXIT:-0}"
+"""
+
+
+def make_fake_ffmpeg(directory):
+    """Write the fake ffmpeg script and return its path"""
+    path = os.path.join(directory, "ffmpeg")
+    with open(path, 'w') as f:
+        f.write(FAKE_FFMPEG)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+def test_parse_progress_block():
+    """Progress keys are converted to typed fields"""
+    event = parse_progress_block({
+        "frame": "300", "fps": "59.94", "out_time_us": "5000000",
+        "speed": "1.25x", "total_size": "2048", "progress": "continue"})
+    assert event.frame == 300
+    assert event.fps == 59.94
+    assert event.out_time == 5.0
+    assert event.speed == 1.25
+    assert event.total_size == 2048
+    assert not event.done
+
+    event = parse_progress_block({"speed": "N/A", "out_time_us": "N/A", "progress": "end"})
+    assert event.speed is None
+    assert event.out_time == 0.0
+    assert event.done
+    print("✓ Progress parsing test passed")
+
+
+def test_run_publishes_progress():
+    """A successful run reports every progress block and the final event"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ffmpeg = make_fake_ffmpeg(temp_dir)
+        events = []
+        result = run_ffmpeg([ffmpeg, "-i", "in.mp4", "out.mp4"], on_progress=events.append)
+
+        assert result.args[1:4] == ["-progress", "pipe:1", "-nostats"]
+        assert [e.frame for e in events] == [60, 120]
+        assert events[0].label == "out.mp4"
+        assert result.progress.done
+        assert result.progress.speed == 0.75
+        assert "fake error output" in result.stderr
+    print("✓ Progress publishing test passed")
+
+
+def test_run_raises_on_failure():
+    """A non-zero exit raises CalledProcessError with the stderr tail"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ffmpeg = make_fake_ffmpeg(temp_dir)
+        os.environ["FAKE_EXIT"] = "1"
+        try:
+            run_ffmpeg([ffmpeg, "out.mp4"])
+            assert False, "Expected CalledProcessError"
+        except subprocess.CalledProcessError as e:
+            assert e.returncode == 1
+            assert "fake error output" in e.stderr
+        finally:
+            del os.environ["FAKE_EXIT"]
+    print("✓ Failure test passed")
+
+
+def test_cancel_and_stall():
+    """Cancelled and stalled runs are stopped early"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ffmpeg = make_fake_ffmpeg(temp_dir)
+        os.environ["FAKE_SLEEP"] = "30"
+        try:
+            cancel_event = threading.Event()
+            threading.Timer(0.5, cancel_event.set).start()
+            try:
+                run_ffmpeg([ffmpeg, "out.mp4"], cancel_event=cancel_event)
+                assert False, "Expected FFmpegCancelled"
+            except FFmpegCancelled:
+                pass
+
+            try:
+                run_ffmpeg([ffmpeg, "out.mp4"], stall_timeout=1)
+                assert False, "Expected TimeoutExpired"
+            except subprocess.TimeoutExpired:
+                pass
+        finally:
+            del os.environ["FAKE_SLEEP"]
+    print("✓ Cancellation and stall test passed")
+
+
+if __name__ == "__main__":
+    print("Testing ffmpeg runner...")
+    test_parse_progress_block()
+    test_run_publishes_progress()
+    test_run_raises_on_failure()
+    test_cancel_and_stall()
+    print("\n✅ All ffmpeg runner tests passed!")
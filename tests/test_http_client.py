@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared event loop and pooled HTTP client.
+Verifies that sync callers reuse one loop and one client per process.
+"""
+
+import os
+import sys
+import asyncio
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import http_client
+
+
+async def get_shared_client():
+    """Coroutine returning the pooled client seen from the shared loop"""
+    assert http_client.on_shared_loop()
+    return http_client.get_client(), asyncio.get_running_loop()
+
+
+def test_client_reused_across_calls():
+    """Every run_coroutine() call shares the same loop and client"""
+    first_client, first_loop = http_client.run_coroutine(get_shared_client())
+    second_client, second_loop = http_client.run_coroutine(get_shared_client())
+    assert first_client is second_client
+    assert first_loop is second_loop
+    print("✓ Client reuse test passed")
+
+
+def test_other_loops_not_shared():
+    """Coroutines on other loops don't get the pooled client"""
+    async def check():
+        return http_client.on_shared_loop()
+    assert asyncio.run(check()) is False
+    print("✓ Foreign loop test passed")
+
+
+def test_errors_propagate():
+    """Exceptions raised on the shared loop reach the caller"""
+    async def fail():
+        raise ValueError("boom")
+    try:
+        http_client.run_coroutine(fail())
+        assert False, "Expected ValueError"
+    except ValueError as e:
+        assert str(e) == "boom"
+    print("✓ Error propagation test passed")
+
+
+def test_close_and_restart():
+    """After close() a new loop and client are created on demand"""
+    client, loop = http_client.run_coroutine(get_shared_client())
+    http_client.close()
+    assert client.is_closed
+    assert loop.is_closed()
+    new_client, new_loop = http_client.run_coroutine(get_shared_client())
+    assert new_client is not client and new_loop is not loop
+    print("✓ Close and restart test passed")
+
+
+if __name__ == "__main__":
+    print("Testing HTTP client...")
+    test_client_reused_across_calls()
+    test_other_loops_not_shared()
+    test_errors_propagate()
+    test_close_and_restart()
+    print("\n✅ All HTTP client tests passed!")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the background video keyframe index.
+Verifies packet parsing, keyframe-based start selection and index persistence.
+"""
+
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import keyframe_index
+from utils.keyframe_index import parse_keyframe_packets, choose_keyframe_start, get_keyframes
+
+
+def test_parse_keyframe_packets():
+    """Only packets flagged as keyframes are returned, sorted"""
+    output = "2.000000,K_\n0.016667,__\n0.000000,K_\nN/A,K_\n1.000000,K_\n\n"
+    assert parse_keyframe_packets(output) == [0.0, 1.0, 2.0]
+
+
+def test_choose_keyframe_start():
+    """The chosen start is a keyframe that leaves room for the whole segment"""
+    keyframes = [0.0, 10.0, 20.0, 30.0, 40.0]
+    for _ in range(50):
+        start = choose_keyframe_start(keyframes, 45.0, 20.0)
+        assert start in (0.0, 10.0, 20.0)
+
+    assert choose_keyframe_start(keyframes, 45.0, 50.0) is None
+    assert choose_keyframe_start([], 45.0, 10.0) is None
+
+
+def test_index_is_persisted_and_invalidated():
+    """The index is reused across processes until the file changes"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        video_path = os.path.join(temp_dir, "background.mp4")
+        with open(video_path, "wb") as f:
+            f.write(b"not really a video")
+
+        index_dir = os.path.join(temp_dir, "index")
+        with patch.dict(keyframe_index.KEYFRAME_INDEX_CONFIG, {"dir": index_dir}), \
+                patch.object(keyframe_index, "_probe_keyframes", return_value=[0.0, 1.0]) as probe:
+            keyframe_index._memory_cache.clear()
+            assert get_keyframes(video_path) == [0.0, 1.0]
+            assert probe.call_count == 1
+
+            # Simulate a new process: memory cache empty, disk index reused
+            keyframe_index._memory_cache.clear()
+            assert get_keyframes(video_path) == [0.0, 1.0]
+            assert probe.call_count == 1
+
+            # Changing the file invalidates the index
+            with open(video_path, "ab") as f:
+                f.write(b" with more bytes")
+            probe.return_value = [0.0, 2.0]
+            assert get_keyframes(video_path) == [0.0, 2.0]
+            assert probe.call_count == 2
+
+        keyframe_index._memory_cache.clear()
+
+
+if __name__ == "__main__":
+    test_parse_keyframe_packets()
+    test_choose_keyframe_start()
+    test_index_is_persisted_and_invalidated()
+    print("✅ Keyframe index tests passed")
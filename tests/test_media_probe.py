@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached media probe.
+Verifies in-process WAV parsing, cache reuse/invalidation and persistence.
+"""
+
+import os
+import sys
+import wave
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import media_probe
+from utils.media_probe import probe, probe_duration, clear_cache
+
+
+def write_silent_wav(path, seconds, rate=16000):
+    """Write a mono 16-bit silent WAV file"""
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b'\x00\x00' * int(seconds * rate))
+
+
+def test_wav_is_parsed_in_process():
+    """WAV files never spawn ffprobe"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        wav_path = os.path.join(temp_dir, "speech.wav")
+        write_silent_wav(wav_path, 1.5)
+
+        clear_cache()
+        with patch.object(media_probe, "_probe_ffprobe") as ffprobe:
+            info = probe(wav_path)
+            assert ffprobe.call_count == 0
+        assert abs(info["duration"] - 1.5) < 1e-6
+        assert info["streams"][0]["sample_rate"] == 16000
+        assert info["streams"][0]["channels"] == 1
+
+
+def test_results_are_cached_until_file_changes():
+    """A second probe of an unchanged file is served from the cache"""
+    fake = {"duration": 12.0, "format": "mov,mp4", "streams": [],
+            "width": 1080, "height": 1920, "fps": 60.0}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        video_path = os.path.join(temp_dir, "background.mp4")
+        with open(video_path, "wb") as f:
+            f.write(b"video")
+
+        clear_cache()
+        with patch.object(media_probe, "_probe_ffprobe", return_value=fake) as ffprobe:
+            assert probe_duration(video_path) == 12.0
+            assert probe(video_path)["fps"] == 60.0
+            assert ffprobe.call_count == 1
+
+            with open(video_path, "ab") as f:
+                f.write(b" changed")
+            probe(video_path)
+            assert ffprobe.call_count == 2
+
+
+def test_results_are_persisted():
+    """Probe results survive a process restart when persistence is enabled"""
+    fake = {"duration": 3.0, "format": "mov,mp4", "streams": [],
+            "width": None, "height": None, "fps": None}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        video_path = os.path.join(temp_dir, "clip.mp4")
+        with open(video_path, "wb") as f:
+            f.write(b"video")
+        persist_path = os.path.join(temp_dir, "probe_cache.json")
+
+        with patch.dict(media_probe.PROBE_CACHE_CONFIG, {"persist_path": persist_path}), \
+                patch.object(media_probe, "_probe_ffprobe", return_value=fake) as ffprobe:
+            clear_cache()
+            probe(video_path)
+            assert os.path.exists(persist_path)
+
+            # Simulate a new process
+            clear_cache()
+            assert probe_duration(video_path) == 3.0
+            assert ffprobe.call_count == 1
+
+        clear_cache()
+
+
+if __name__ == "__main__":
+    test_wav_is_parsed_in_process()
+    test_results_are_cached_until_file_changes()
+    test_results_are_persisted()
+    print("✅ Media probe tests passed")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for the resident alignment model registry.
+Verifies the memory-mapped weights round trip and that each process loads
+the model only once. Uses a small stand-in module, no model download.
+"""
+
+import os
+import sys
+import time
+import signal
+import tempfile
+import threading
+from unittest.mock import patch
+import torch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generators import model_registry
+
+
+def test_memory_mapped_weights_round_trip():
+    """Weights saved once load into a meta-device skeleton unchanged"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "models", "weights.pt")
+        model = torch.nn.Linear(8, 4)
+        model_registry.save_weights(model, path)
+        assert os.listdir(os.path.dirname(path)) == ["weights.pt"]
+
+        with torch.device("meta"):
+            skeleton = torch.nn.Linear(8, 4)
+        loaded = model_registry.load_weights(skeleton, path)
+        assert not loaded.weight.is_meta and not loaded.training
+
+        x = torch.randn(3, 8)
+        with torch.inference_mode():
+            assert torch.allclose(loaded(x), model(x))
+    print("✓ Memory-mapped weights test passed")
+
+
+def test_quantized_model_close_to_fp32():
+    """Int8 Linear layers give nearly the same outputs"""
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(64, 64), torch.nn.ReLU(), torch.nn.Linear(64, 8))
+    x = torch.randn(16, 64)
+    with torch.inference_mode():
+        expected = model(x)
+
+    quantized = model_registry.quantize(model)
+    assert type(quantized[0]) is not torch.nn.Linear
+    with torch.inference_mode():
+        error = (quantized(x) - expected).abs().max().item()
+    assert error < 0.05, error
+    print("✓ Quantization test passed")
+
+
+def test_model_loaded_once_per_process():
+    """get_model() builds the model on first use only"""
+    built = []
+
+    def build(bundle, device):
+        built.append(device)
+        return torch.nn.Linear(2, 2)
+
+    with patch.object(model_registry, "_build_model", build), \
+            patch.object(model_registry, "get_bundle", lambda: "bundle"), \
+            patch.object(model_registry, "_model", None):
+        cpu = torch.device("cpu")
+        bundle, model = model_registry.get_model(cpu, quantized=False)
+        assert bundle == "bundle"
+        assert model_registry.get_model(cpu, quantized=False)[1] is model
+        with patch.dict(model_registry.ALIGNMENT_MODEL_CONFIG, {"quantize": False}):
+            assert model_registry.warm_up()
+        assert built == [cpu]
+        # Switching to the int8 model rebuilds it
+        assert model_registry.get_model(cpu, quantized=True)[1] is not model
+        assert built == [cpu, cpu]
+        assert model_registry.status()["loaded"]
+    print("✓ Load once test passed")
+
+
+def test_fork_during_load():
+    """A worker forked while another thread loads the model doesn't deadlock"""
+    parent = os.getpid()
+    loading, release = threading.Event(), threading.Event()
+
+    def build(bundle, device):
+        if os.getpid() == parent:
+            loading.set()
+            release.wait(10)
+        return torch.nn.Linear(2, 2)
+
+    with patch.object(model_registry, "_build_model", build), \
+            patch.object(model_registry, "get_bundle", lambda: "bundle"), \
+            patch.object(model_registry, "_model", None):
+        cpu = torch.device("cpu")
+        loader = threading.Thread(target=model_registry.get_model, args=(cpu, False))
+        loader.start()
+        assert loading.wait(10)
+        assert model_registry.status()["loaded"] is False  # Doesn't block on the load
+
+        pid = os.fork()
+        if pid == 0:
+            _, model = model_registry.get_model(cpu, quantized=False)
+            os._exit(0 if model is not None else 1)
+
+        deadline = time.time() + 10
+        while True:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            if time.time() > deadline:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                assert False, "Forked child deadlocked loading the model"
+            time.sleep(0.05)
+        release.set()
+        loader.join()
+        assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+        assert model_registry.get_model(cpu, quantized=False)[1] is not None
+    print("✓ Fork during load test passed")
+
+
+if __name__ == "__main__":
+    print("Testing alignment model registry...")
+    test_memory_mapped_weights_round_trip()
+    test_quantized_model_close_to_fp32()
+    test_model_loaded_once_per_process()
+    test_fork_during_load()
+    print("\n✅ All model registry tests passed!")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-output rendering.
+Verifies the ffmpeg command rendering several voices from one background
+decode: split count, per-branch trim and subtitles, stream mapping and the
+encoder threads shared between outputs.
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generators import video_generator, multi_output_render
+from generators.multi_output_render import build_multi_output_command
+
+JOBS = [
+    {"subtitle": "a.ass", "audio": "a.wav", "output": "a.mp4", "duration": 40.0},
+    {"subtitle": "b.ass", "audio": "b.wav", "output": "b.mp4", "duration": 55.5},
+    {"subtitle": "c.ass", "audio": "c.wav", "output": "c.mp4", "duration": 31.25},
+]
+
+
+def build(jobs, **kwargs):
+    with patch.object(video_generator, "get_duration", lambda path: 600.0):
+        return build_multi_output_command("bg.mp4", 12.0, jobs, **kwargs)
+
+
+def output_options(cmd, jobs):
+    """Split the command after the filtergraph into one argument list per output"""
+    options = []
+    start = cmd.index("-filter_complex") + 2
+    for job in jobs:
+        end = cmd.index(job["output"], start) + 1
+        options.append(cmd[start:end])
+        start = end
+    assert start == len(cmd)
+    return options
+
+
+def test_filtergraph():
+    """One split feeding a trimmed, subtitled branch per job"""
+    cmd = build(JOBS, threads=6)
+
+    # One background input for the longest job, then one audio input per job
+    inputs = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"]
+    assert inputs == ["bg.mp4", "a.wav", "b.wav", "c.wav"]
+    assert cmd[cmd.index("-t") + 1] == "55.5"
+
+    graph = cmd[cmd.index("-filter_complex") + 1].split(';')
+    assert len(graph) == 1 + len(JOBS)
+    assert graph[0].startswith("[0:v]crop=ih*9/16:ih,")
+    assert graph[0].endswith("split=3[s0][s1][s2]")
+    for i, job in enumerate(JOBS):
+        assert graph[i + 1] == (f"[s{i}]trim=duration={job['duration']},setpts=PTS-STARTPTS,"
+                                f"subtitles={job['subtitle']}[v{i}]")
+
+    vertical = build(JOBS, crop=False, threads=6)
+    assert "crop=" not in vertical[vertical.index("-filter_complex") + 1]
+    print("✓ Filtergraph test passed")
+
+
+def test_output_mapping():
+    """Each output maps its own branch and audio input, ends with its path"""
+    cmd = build(JOBS, threads=6)
+    for i, (options, job) in enumerate(zip(output_options(cmd, JOBS), JOBS)):
+        maps = [options[k + 1] for k, arg in enumerate(options) if arg == "-map"]
+        assert maps == [f"[v{i}]", f"{i + 1}:a:0"]
+        assert "-shortest" in options and options[-2:] == ["-y", job["output"]]
+    print("✓ Output mapping test passed")
+
+
+def test_thread_split():
+    """Encoder threads are divided between the outputs, at least one each"""
+    for threads, expected in ((6, "2"), (7, "2"), (2, "1")):
+        cmd = build(JOBS, threads=threads)
+        for options in output_options(cmd, JOBS):
+            assert options[options.index("-threads") + 1] == expected
+
+    # Without an explicit count, the CPU budget is divided by the job count
+    divisors = []
+    def thread_args(divisor=1):
+        divisors.append(divisor)
+        return ["-threads", "3"]
+    with patch.object(multi_output_render, "ffmpeg_thread_args", thread_args):
+        cmd = build(JOBS[:2])
+    assert divisors == [2]
+    assert [options[options.index("-threads") + 1]
+            for options in output_options(cmd, JOBS[:2])] == ["3", "3"]
+    print("✓ Thread split test passed")
+
+
+if __name__ == "__main__":
+    print("Testing multi-output render...")
+    test_filtergraph()
+    test_output_mapping()
+    test_thread_split()
+    print("\n✅ All multi-output render tests passed!")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for the ONNX Runtime alignment model.
+Verifies WAV loading without torch and the windowed emission pass through
+an inference session (a stand-in with the same `run()` interface, so no
+model export or onnxruntime install is needed).
+"""
+
+import os
+import sys
+import wave
+import tempfile
+import subprocess
+from unittest.mock import patch
+import numpy as np
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generators import onnx_model
+
+INFO = {"labels": ["-", "|", "A", "B"], "sample_rate": 16000, "frame_stride": 320}
+
+
+class FakeSession:
+    """Strided 'model' with wav2vec2's frame stride and a 400-sample receptive field"""
+
+    def __init__(self):
+        self.input_sizes = []
+
+    def run(self, output_names, inputs):
+        waveform = inputs["waveform"][0]
+        self.input_sizes.append(len(waveform))
+        count = (len(waveform) - 400) // 320 + 1
+        frames = np.array([waveform[k * 320:k * 320 + 400].sum() for k in range(count)])
+        logits = np.stack([frames, -frames, frames * 0.5, np.zeros(count)], axis=1)
+        log_probs = logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+        return [log_probs[None].astype(np.float32)]
+
+
+def write_wav(path, samples, sample_rate=16000):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.astype('<i2').tobytes())
+
+
+def test_load_audio():
+    """16-bit PCM is scaled like torchaudio.load, other rates are rejected"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "speech.wav")
+        write_wav(path, np.array([0, 16384, -32768, 32767]))
+        samples = onnx_model.load_audio(path, 16000)
+        assert samples.dtype == np.float32
+        assert np.allclose(samples, [0.0, 0.5, -1.0, 32767 / 32768])
+
+        write_wav(path, np.zeros(10), sample_rate=22050)
+        try:
+            onnx_model.load_audio(path, 16000)
+            assert False, "Expected a sample rate error"
+        except ValueError:
+            pass
+    print("✓ Audio loading test passed")
+
+
+def test_windowed_emission_matches_single_pass():
+    """Long audio goes through bounded windows with the same result"""
+    rng = np.random.default_rng(0)
+    waveform = rng.uniform(-0.5, 0.5, size=16000 * 5 + 77).astype(np.float32)
+    single = FakeSession().run(None, {"waveform": waveform[None]})[0][0]
+
+    session = FakeSession()
+    config = {"window_seconds": 1.5, "window_overlap_seconds": 0.1}
+    with patch.dict(onnx_model.ALIGNMENT_CONFIG, config):
+        emission = onnx_model.compute_emission(waveform, session, INFO)
+    assert emission.shape == single.shape
+    assert np.allclose(emission, single, atol=1e-5)
+    assert len(session.input_sizes) > 1 and max(session.input_sizes) <= 24000
+    print(f"✓ Windowed emission test passed ({len(session.input_sizes)} windows)")
+
+
+def test_class_label_prob_interface():
+    """Returns (emission, labels) like the torch model"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "speech.wav")
+        write_wav(path, np.random.default_rng(1).integers(-3000, 3000, size=16000))
+        with patch.object(onnx_model, "get_session", lambda: (FakeSession(), INFO)):
+            emission, labels = onnx_model.class_label_prob(path)
+    assert labels == ("-", "|", "A", "B")
+    assert emission.shape == ((16000 - 400) // 320 + 1, len(labels))
+    assert np.allclose(np.exp(emission).sum(axis=1), 1.0, atol=1e-4)
+    print("✓ Interface test passed")
+
+
+def test_align_without_torch():
+    """align() turns the session's emission into word timings, torch never imported"""
+    torch_loaded = "torch" in sys.modules  # By other tests in the same run
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "speech.wav")
+        write_wav(path, np.random.default_rng(2).integers(-3000, 3000, size=16000 * 2))
+        with patch.object(onnx_model, "get_session", lambda: (FakeSession(), INFO)):
+            timings = onnx_model.align(path, "ab ba (break) b", backend="numpy")
+    assert [word for word, _, _, _ in timings] == ["ab", "ba", "b"]
+    assert all(0.0 <= start < end <= 2.0 for _, start, end, _ in timings)
+    assert torch_loaded or "torch" not in sys.modules
+    print("✓ Torch-free alignment test passed")
+
+
+def test_align_speech_without_torch():
+    """The alignment modules import without torch, and align_speech() uses ONNX Runtime"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = ("import sys\n"
+            "from generators import force_alignment, model_registry, alignment_service\n"
+            "model_registry.status()\n"
+            "assert 'torch' not in sys.modules and 'torchaudio' not in sys.modules\n")
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
+
+    from generators import force_alignment
+    torch_loaded = "torch" in sys.modules
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "speech.wav")
+        write_wav(path, np.random.default_rng(3).integers(-3000, 3000, size=16000 * 2))
+        with patch.dict(force_alignment.ALIGNMENT_MODEL_CONFIG, {"runtime": "onnx"}), \
+                patch.object(onnx_model, "onnx_available", lambda: True), \
+                patch.object(onnx_model, "get_session", lambda: (FakeSession(), INFO)):
+            timings = force_alignment.align_speech(path, "ab ba b", backend="numpy")
+    assert [word for word, _, _, _ in timings] == ["ab", "ba", "b"]
+    assert torch_loaded or "torch" not in sys.modules
+    print("✓ Torch-free align_speech test passed")
+
+
+if __name__ == "__main__":
+    print("Testing ONNX alignment model...")
+    test_load_audio()
+    test_windowed_emission_matches_single_pass()
+    test_class_label_prob_interface()
+    test_align_without_torch()
+    test_align_speech_without_torch()
+    print("\n✅ All ONNX alignment model tests passed!")
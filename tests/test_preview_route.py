@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for the /preview endpoint.
+Renders a (stand-in) draft through the route and checks that the returned
+video_url serves the draft. The pipeline itself is mocked out and the
+worker process replaced by a thread, so no API keys or ffmpeg are needed.
+"""
+
+import os
+import sys
+import tempfile
+import concurrent.futures
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import server
+
+DRAFT = b"draft video bytes"
+
+
+def fake_preview_voice(text, voice, model, video, use_special_effects=False, profile="draft"):
+    """Writes a draft where main() would, under outputs/"""
+    output_dir = os.path.join("outputs", f"123_{voice}")
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"Daily_Brainrot_by_{voice}_draft.mp4")
+    with open(path, 'wb') as f:
+        f.write(DRAFT)
+    return path
+
+
+def test_preview_url_serves_draft():
+    """The video_url returned by /preview can be fetched"""
+    voice = next(iter(server.VOICES))
+    video = next(iter(server.AVAILABLE_VIDEOS))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        try:
+            with patch.object(server, "preview_voice", fake_preview_voice), \
+                    patch.object(concurrent.futures, "ProcessPoolExecutor",
+                                 lambda **kwargs: concurrent.futures.ThreadPoolExecutor(max_workers=1)), \
+                    patch.dict(os.environ, {"OPENAI_API_KEY": "test", "FISH_API_KEY": "test"}):
+                client = server.app.test_client()
+                response = client.post('/preview', json={"text": "hello there", "voice": voice,
+                                                         "video": video})
+                assert response.status_code == 200, response.get_json()
+                data = response.get_json()
+                assert data["success"] == 1
+                assert data["video_url"].startswith("/final/")
+
+                video_response = client.get(data["video_url"])
+                assert video_response.status_code == 200
+                assert video_response.data == DRAFT
+                video_response.close()
+
+                # Moved out of the processing directory
+                assert not os.listdir(os.path.join("outputs", f"123_{voice}"))
+        finally:
+            os.chdir(cwd)
+    print("✓ Preview URL test passed")
+
+
+if __name__ == "__main__":
+    print("Testing preview route...")
+    test_preview_url_serves_draft()
+    print("\n✅ All preview route tests passed!")
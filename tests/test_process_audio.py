@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for the audio stage.
+Verifies PCM streaming into WAV files and the ffmpeg command producing the
+alignment WAV and the mix track.
+"""
+
+import os
+import sys
+import wave
+import asyncio
+import tempfile
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.audio import build_process_audio_command, write_pcm_stream
+
+
+def test_both_outputs_from_one_decode():
+    """One ffmpeg call writes the 16kHz mono and the 44.1kHz stereo tracks"""
+    cmd = build_process_audio_command("tts.mp3", "align.wav", "mix.wav", 300)
+
+    assert cmd.count('-i') == 1
+    graph = cmd[cmd.index('-filter_complex') + 1]
+    assert graph == "[0:a]adelay=delays=300:all=1,asplit=2[align][mix]"
+
+    align = cmd[cmd.index('[align]'):cmd.index('align.wav') + 1]
+    assert align[align.index('-ar') + 1] == '16000'
+    assert align[align.index('-ac') + 1] == '1'
+
+    mix = cmd[cmd.index('[mix]'):]
+    assert mix[mix.index('-ar') + 1] == '44100'
+    assert mix[mix.index('-ac') + 1] == '2'
+    assert mix[-1] == 'mix.wav'
+    print("✓ Two-output command test passed")
+
+
+def test_alignment_only():
+    """Without a mix path only the alignment WAV is written"""
+    cmd = build_process_audio_command("tts.mp3", "align.wav", None, 0)
+    assert cmd[cmd.index('-filter_complex') + 1] == "[0:a]adelay=delays=0:all=1[align]"
+    assert 'asplit' not in ' '.join(cmd)
+    assert cmd[-1] == 'align.wav'
+    print("✓ Alignment-only command test passed")
+
+
+def test_pcm_stream_written_as_wav():
+    """Raw PCM chunks, even ones splitting a sample, end up in a valid WAV"""
+    samples = bytes(range(200)) * 10  # 1000 frames of 16-bit audio
+
+    async def chunks():
+        for i in range(0, len(samples), 333):  # Odd chunk size splits samples
+            yield samples[i:i + 333]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "tts.wav")
+        frames = asyncio.run(write_pcm_stream(chunks(), path, sample_rate=16000))
+        assert frames == 1000
+
+        with wave.open(path, 'rb') as wf:
+            assert wf.getnchannels() == 1
+            assert wf.getsampwidth() == 2
+            assert wf.getframerate() == 16000
+            assert wf.getnframes() == 1000
+            assert wf.readframes(1000) == samples
+    print("✓ PCM stream test passed")
+
+
+if __name__ == "__main__":
+    print("Testing audio processing...")
+    test_both_outputs_from_one_decode()
+    test_alignment_only()
+    test_pcm_stream_written_as_wav()
+    print("\n✅ All audio processing tests passed!")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared rate limiter and hedged requests.
+Verifies the token bucket, Retry-After blocking and p95 hedging.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+from email.utils import formatdate
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import rate_limit
+
+
+def make_config(temp_dir, hedge=False):
+    """Rate limit config with one fast test provider"""
+    return {
+        "dir": temp_dir,
+        "providers": {"test": {"rate": 10.0, "burst": 2, "hedge": hedge}},
+        "latency_window": 50,
+        "hedge_percentile": 95,
+        "hedge_min_samples": 5,
+        "hedge_min_delay": 0.01,
+    }
+
+
+def test_token_bucket():
+    """A burst goes through at once, then calls are paced at the refill rate"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with patch.dict(rate_limit.RATE_LIMIT_CONFIG, make_config(temp_dir)):
+            assert rate_limit.try_acquire("test") == 0
+            assert rate_limit.try_acquire("test") == 0
+            wait = rate_limit.try_acquire("test")
+            assert 0 < wait <= 0.1
+
+            start = time.time()
+            rate_limit.acquire("test")
+            assert time.time() - start >= 0.05
+
+            # Providers without a config are not limited
+            assert rate_limit.try_acquire("unknown") == 0
+    print("✓ Token bucket test passed")
+
+
+def test_retry_after_blocks_provider():
+    """A 429 blocks the shared bucket for the Retry-After period"""
+    assert rate_limit.parse_retry_after("3") == 3.0
+    assert rate_limit.parse_retry_after(None) is None
+    assert 8 < rate_limit.parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with patch.dict(rate_limit.RATE_LIMIT_CONFIG, make_config(temp_dir)):
+            rate_limit.block("test", 0.3)
+            assert rate_limit.try_acquire("test") > 0.2
+            start = time.time()
+            asyncio.run(rate_limit.acquire_async("test"))
+            assert time.time() - start >= 0.25
+    print("✓ Retry-After test passed")
+
+
+def test_hedging():
+    """A call slower than p95 gets a duplicate and the first result wins"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with patch.dict(rate_limit.RATE_LIMIT_CONFIG, make_config(temp_dir, hedge=True)):
+            assert rate_limit.hedge_delay("test") is None
+            for _ in range(10):
+                rate_limit.record_latency("test", 0.05)
+            assert rate_limit.hedge_delay("test") == 0.05
+
+            cancelled = []
+
+            async def call(index):
+                try:
+                    await asyncio.sleep(1.0 if index == 0 else 0.01)
+                    return index
+                except asyncio.CancelledError:
+                    cancelled.append(index)
+                    raise
+
+            start = time.time()
+            assert asyncio.run(rate_limit.hedged_async("test", call)) == 1
+            assert time.time() - start < 0.5
+            assert cancelled == [0]
+
+            calls = []
+
+            def slow_then_fast():
+                calls.append(time.time())
+                time.sleep(0.5 if len(calls) == 1 else 0.01)
+                return len(calls)
+
+            assert rate_limit.hedged_call("test", slow_then_fast) == 2
+    print("✓ Hedging test passed")
+
+
+if __name__ == "__main__":
+    print("Testing rate limiter...")
+    test_token_bucket()
+    test_retry_after_blocks_provider()
+    test_hedging()
+    print("\n✅ All rate limiter tests passed!")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for the multi-voice batch render coordinator.
+Runs the coordinator against worker threads sharing a real
+multiprocessing.Manager, with the render itself mocked out: every submitted
+job is rendered once, a worker failing without submitting doesn't block the
+batch, and a worker that gives up before the batch starts is left out of it.
+"""
+
+import os
+import sys
+import time
+import threading
+import multiprocessing
+from concurrent.futures import Future
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.render_coordinator import BatchRenderCoordinator
+
+
+def job(voice, duration=10.0):
+    return {"voice": voice, "subtitle": f"{voice}.ass", "audio": f"{voice}.wav",
+            "output": f"{voice}.mp4", "duration": duration}
+
+
+def start_worker(coordinator, voice, results, delay=0.0, timeout=None, fail=False):
+    """Thread standing in for a voice worker process; returns its future"""
+    future = Future()
+
+    def work():
+        time.sleep(delay)
+        if fail:
+            future.set_exception(RuntimeError(f"{voice} failed"))
+            return
+        results[voice] = coordinator.request_render(job(voice), timeout=timeout)
+        future.set_result(voice)
+
+    threading.Thread(target=work, daemon=True).start()
+    return future
+
+
+def run_batch(manager, workers, render_result=True):
+    """Run a coordinator over (voice, options) workers; returns (results, rendered batches)"""
+    voices = [voice for voice, _ in workers]
+    coordinator = BatchRenderCoordinator(voices, "bg.mp4", manager)
+    batches = []
+
+    def render(jobs):
+        batches.append(sorted(j["voice"] for j in jobs))
+        return render_result
+
+    results = {}
+    with patch.object(coordinator, "_render", render):
+        futures = {start_worker(coordinator, voice, results, **options): voice
+                   for voice, options in workers}
+        coordinator.run(futures, poll_interval=0.05)
+        for future in futures:
+            while not future.done():
+                time.sleep(0.01)
+    return results, batches
+
+
+def test_all_voices_submit():
+    """Every voice is rendered in one batch and told it succeeded"""
+    with multiprocessing.Manager() as manager:
+        results, batches = run_batch(manager, [("a", {}), ("b", {"delay": 0.2}), ("c", {})])
+        assert batches == [["a", "b", "c"]]
+        assert results == {"a": True, "b": True, "c": True}
+
+        results, batches = run_batch(manager, [("a", {}), ("b", {})], render_result=False)
+        assert batches == [["a", "b"]]
+        assert results == {"a": False, "b": False}
+        print("✓ Batch handshake test passed")
+
+
+def test_failed_worker():
+    """A worker that fails without submitting doesn't hold up the others"""
+    with multiprocessing.Manager() as manager:
+        results, batches = run_batch(manager, [("a", {}), ("b", {"delay": 0.1, "fail": True}), ("c", {})])
+        assert batches == [["a", "c"]]
+        assert results == {"a": True, "c": True}
+
+        # Nobody submits: nothing is rendered and run() still returns
+        results, batches = run_batch(manager, [("a", {"fail": True}), ("b", {"fail": True})])
+        assert batches == [] and results == {}
+        print("✓ Failed worker test passed")
+
+
+def test_timed_out_worker():
+    """A worker giving up before the batch starts is withdrawn from it"""
+    with multiprocessing.Manager() as manager:
+        results, batches = run_batch(manager, [("a", {"timeout": 0.1}), ("b", {"delay": 0.5})])
+        assert batches == [["b"]]
+        assert results == {"a": False, "b": True}
+
+        # The render outlasting the timeout: the worker waits for its result
+        voices = ["a", "b"]
+        coordinator = BatchRenderCoordinator(voices, "bg.mp4", manager)
+
+        def slow_render(jobs):
+            time.sleep(0.3)
+            return True
+
+        results = {}
+        with patch.object(coordinator, "_render", slow_render):
+            futures = {start_worker(coordinator, voice, results, timeout=0.1): voice for voice in voices}
+            coordinator.run(futures, poll_interval=0.05)
+            while not all(future.done() for future in futures):
+                time.sleep(0.01)
+        assert results == {"a": True, "b": True}
+        print("✓ Timed out worker test passed")
+
+
+def test_render_error():
+    """An exception in the batch render still releases every worker"""
+    with multiprocessing.Manager() as manager:
+        coordinator = BatchRenderCoordinator(["a"], "bg.mp4", manager)
+        results = {}
+
+        def broken_render(jobs):
+            raise RuntimeError("ffmpeg exploded")
+
+        with patch.object(coordinator, "_render", broken_render):
+            future = start_worker(coordinator, "a", results)
+            coordinator.run({future: "a"}, poll_interval=0.05)
+            while not future.done():
+                time.sleep(0.01)
+        assert results == {"a": False}
+        print("✓ Render error test passed")
+
+
+if __name__ == "__main__":
+    print("Testing batch render coordinator...")
+    test_all_voices_submit()
+    test_failed_worker()
+    test_timed_out_worker()
+    test_render_error()
+    print("\n✅ All batch render coordinator tests passed!")
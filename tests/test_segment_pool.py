@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for the warm background segment pool.
+Verifies claiming, refill selection, source invalidation and the size cap.
+"""
+
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generators import segment_pool
+from generators.segment_pool import list_segments, next_missing_segment, take_segment
+
+
+def fake_trim(cmd, **kwargs):
+    """Stand-in for run_ffmpeg that copies the input to the output"""
+    with open(cmd[cmd.index('-i') + 1], 'rb') as src, open(cmd[-1], 'wb') as dst:
+        dst.write(src.read())
+
+
+def make_pool(temp_dir, lengths, max_bytes=10 ** 9):
+    """Create a source video and a pool config rooted in temp_dir"""
+    source = os.path.join(temp_dir, "bg.mp4")
+    with open(source, 'wb') as f:
+        f.write(b'source')
+    config = {
+        "enabled": True,
+        "dir": os.path.join(temp_dir, "pool"),
+        "lengths": lengths,
+        "segments_per_length": 1,
+        "max_bytes": max_bytes,
+        "refill_interval": 1,
+        "threads": 1,
+    }
+    return source, config
+
+
+def add_segment(source, length, name):
+    """Put a ready segment of the given length into the pool"""
+    pool_dir = segment_pool._sync_source(source)
+    path = os.path.join(pool_dir, f"{length}s_{name}.mp4")
+    with open(path, 'wb') as f:
+        f.write(b'x' * 100)
+    return path
+
+
+def test_claim_shortest_covering_segment():
+    """Jobs get the shortest segment that covers them, and each segment only once"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source, config = make_pool(temp_dir, [60, 120])
+        with patch.dict(segment_pool.SEGMENT_POOL_CONFIG, config), \
+                patch.dict(segment_pool.AVAILABLE_VIDEOS, {"bg": source}, clear=True), \
+                patch.object(segment_pool, "run_ffmpeg", side_effect=fake_trim):
+            add_segment(source, 60, "aa")
+            add_segment(source, 120, "bb")
+
+            output = os.path.join(temp_dir, "out.mp4")
+            assert take_segment(source, 90, output)
+            assert os.path.exists(output)
+            assert [length for length, _ in list_segments(source)] == [60]
+
+            # Nothing left that covers 90s
+            assert not take_segment(source, 90, output)
+            assert take_segment(source, 45, output)
+            assert list_segments(source) == []
+
+            # Disabled pool: segments left over from earlier runs aren't used
+            add_segment(source, 60, "cc")
+            with patch.dict(segment_pool.SEGMENT_POOL_CONFIG, {"enabled": False}):
+                assert not take_segment(source, 45, output)
+            assert len(list_segments(source)) == 1
+    print("✓ Claim test passed")
+
+
+def test_refill_selection_and_cap():
+    """Missing lengths are refilled, nothing is produced over the size cap"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source, config = make_pool(temp_dir, [60, 120])
+        with patch.dict(segment_pool.SEGMENT_POOL_CONFIG, config), \
+                patch.dict(segment_pool.AVAILABLE_VIDEOS, {"bg": source}, clear=True), \
+                patch.object(segment_pool, "get_mezzanine", return_value=None):
+            assert next_missing_segment() == (source, 60)
+            assert next_missing_segment(skip={(source, 60)}) == (source, 120)
+
+            add_segment(source, 60, "aa")
+            assert next_missing_segment() == (source, 120)
+            add_segment(source, 120, "bb")
+            assert next_missing_segment() is None
+
+            segment_pool.SEGMENT_POOL_CONFIG["segments_per_length"] = 2
+            segment_pool.SEGMENT_POOL_CONFIG["max_bytes"] = 250
+            assert next_missing_segment() is None
+
+            segment_pool._evict_to_cap()
+            assert len(list_segments(source)) == 1
+    print("✓ Refill selection and size cap test passed")
+
+
+def test_changed_source_clears_pool():
+    """Segments cut from an older version of the source are dropped"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source, config = make_pool(temp_dir, [60])
+        with patch.dict(segment_pool.SEGMENT_POOL_CONFIG, config), \
+                patch.dict(segment_pool.AVAILABLE_VIDEOS, {"bg": source}, clear=True):
+            add_segment(source, 60, "aa")
+            with open(source, 'wb') as f:
+                f.write(b'a different source')
+            segment_pool._sync_source(source)
+            assert list_segments(source) == []
+    print("✓ Source invalidation test passed")
+
+
+if __name__ == "__main__":
+    print("Testing segment pool...")
+    test_claim_shortest_covering_segment()
+    test_refill_selection_and_cap()
+    test_changed_source_clears_pool()
+    print("\n✅ All segment pool tests passed!")
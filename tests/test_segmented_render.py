@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the segmented (parallel chunk) renderer.
+Verifies keyframe-aligned chunk planning and per-chunk subtitle shifting.
+"""
+
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generators.segmented_render import plan_chunks, shift_ass_events, ass_time_to_seconds
+from generators.video_generator import build_background_filters, build_background_input
+
+
+def test_plan_chunks_snaps_to_keyframes():
+    """Chunk boundaries land on keyframes and cover the whole segment"""
+    keyframes = [float(k) for k in range(0, 200, 2)]
+    chunks = plan_chunks(keyframes, 11.0, 120.0, 4)
+
+    assert len(chunks) == 4
+    assert chunks[0][0] == 11.0
+    for chunk_start, _ in chunks[1:]:
+        assert chunk_start in keyframes
+    total = sum(chunk_duration for _, chunk_duration in chunks)
+    assert abs(total - 120.0) < 1e-9
+
+
+def test_plan_chunks_respects_minimum_length():
+    """Short segments are not split into tiny chunks"""
+    keyframes = [float(k) for k in range(0, 100)]
+    assert len(plan_chunks(keyframes, 0.0, 20.0, 8, min_chunk_seconds=15)) == 1
+    assert len(plan_chunks(keyframes, 0.0, 45.0, 8, min_chunk_seconds=15)) == 3
+
+
+def test_shift_ass_events():
+    """Events are moved into the chunk timeline, clamped and filtered"""
+    content = """[Script Info]
+ScriptType: v4.00+
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+Dialogue: 0,0:00:01.00,0:00:03.00,Default,,0,0,0,,{\\blur0.6}Before, chunk
+Dialogue: 0,0:00:09.00,0:00:11.50,Default,,0,0,0,,Straddles start
+Dialogue: 0,0:00:15.00,0:00:16.00,Default,,0,0,0,,Inside
+Dialogue: 0,0:00:19.00,0:00:22.00,Default,,0,0,0,,Straddles end
+Dialogue: 0,0:00:25.00,0:00:26.00,Default,,0,0,0,,After
+"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, "subs.ass")
+        target = os.path.join(temp_dir, "chunk.ass")
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+        shift_ass_events(source, 10.0, 10.0, target)
+        with open(target, 'r', encoding='utf-8') as f:
+            dialogues = [line.split(',', 9) for line in f.read().splitlines()
+                         if line.startswith('Dialogue:')]
+
+    assert [d[9] for d in dialogues] == [
+        "Straddles start", "Inside", "Straddles end"]
+    assert ass_time_to_seconds(dialogues[0][1]) == 0.0
+    assert abs(ass_time_to_seconds(dialogues[0][2]) - 1.5) < 0.011
+    assert abs(ass_time_to_seconds(dialogues[1][1]) - 5.0) < 0.011
+    assert abs(ass_time_to_seconds(dialogues[2][2]) - 10.0) < 0.011
+
+
+def test_background_filters_follow_output_profile():
+    """Draft renders are scaled down and resampled, vertical production input is untouched"""
+    assert build_background_filters(crop=True, profile="production") == [
+        "crop=ih*9/16:ih", "scale=1080:1920"]
+    assert build_background_filters(crop=False, profile="production") == []
+    assert build_background_filters(crop=False, profile="draft") == [
+        "scale=540:960", "fps=30"]
+
+
+def test_short_background_is_looped_in_the_input():
+    """Segments running past the end of the background loop it with wrap-around"""
+    with patch("generators.video_generator.get_duration", return_value=10.0):
+        assert build_background_input("bg.mp4", 2.0, 5.0) == [
+            "-ss", "2.0", "-t", "5.0", "-i", "bg.mp4"]
+        assert build_background_input("bg.mp4", 8.0, 25.0) == [
+            "-stream_loop", "-1", "-ss", "8.0", "-t", "25.0", "-i", "bg.mp4"]
+        # Chunk offsets past the end wrap around to the matching position
+        assert build_background_input("bg.mp4", 23.0, 2.0) == [
+            "-ss", "3.0", "-t", "2.0", "-i", "bg.mp4"]
+
+
+if __name__ == "__main__":
+    test_plan_chunks_snaps_to_keyframes()
+    test_plan_chunks_respects_minimum_length()
+    test_shift_ass_events()
+    test_background_filters_follow_output_profile()
+    test_short_background_is_looped_in_the_input()
+    print("✅ Segmented render tests passed")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for pause detection and silence-based subtitle adjustment.
+Verifies the RMS detector on a synthetic WAV and the merge sweep adjuster.
+"""
+
+import os
+import sys
+import time
+import wave
+import tempfile
+import numpy as np
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.silence import detect_silences, load_wav
+from generators.video_generator import SubtitleEntry, adjust_subtitles_with_silence_data
+
+
+def write_speech_wav(path, segments, sample_rate=16000):
+    """Write a mono 16-bit WAV of (seconds, is_speech) segments"""
+    parts = []
+    for seconds, is_speech in segments:
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        amplitude = 8000 if is_speech else 20
+        parts.append(amplitude * np.sin(2 * np.pi * 220 * t))
+    samples = np.concatenate(parts).astype(np.int16)
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.tobytes())
+
+
+def test_detects_pauses():
+    """Pauses longer than min_silence are found at the right place"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "speech.wav")
+        write_speech_wav(path, [(0.3, False), (1.0, True), (0.5, False),
+                                (1.0, True), (0.1, False), (0.5, True)])
+        samples, sample_rate = load_wav(path)
+        assert isinstance(samples, np.memmap) and sample_rate == 16000
+
+        silences = detect_silences(path, threshold_db=-40, min_silence=0.25)
+        assert len(silences) == 2, silences
+        # Leading silence and the 0.5s pause, not the 0.1s gap
+        assert silences[0][0] == 0.0 and abs(silences[0][1] - 0.3) < 0.03
+        assert abs(silences[1][0] - 1.3) < 0.03 and abs(silences[1][1] - 1.8) < 0.03
+    print("✓ Pause detection test passed")
+
+
+def test_three_minute_track_is_fast():
+    """A 3-minute track is analysed in well under a second"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "long.wav")
+        write_speech_wav(path, [(4.0, True), (0.5, False)] * 40)
+        start = time.time()
+        silences = detect_silences(path)
+        elapsed = time.time() - start
+        assert len(silences) == 40
+        print(f"  3-minute track analysed in {elapsed * 1000:.1f} ms")
+        assert elapsed < 1.0
+    print("✓ Detection speed test passed")
+
+
+def test_subtitles_snap_to_pauses():
+    """Subtitles end at pauses inside them and wait for speech after a pause"""
+    entries = [
+        SubtitleEntry("one", 0.5, 2.0),
+        SubtitleEntry("two", 2.1, 3.5),
+        SubtitleEntry("three", 3.6, 5.0),
+    ]
+    pauses = [(1.5, 2.3), (4.0, 4.1), (6.0, 7.0)]
+    adjusted = adjust_subtitles_with_silence_data(entries, pauses, 7.0)
+
+    assert [e.text for e in adjusted] == ["one", "two", "three"]
+    assert abs(adjusted[0].end_time - 1.4) < 1e-9     # Ends at the pause
+    assert abs(adjusted[1].start_time - 2.4) < 1e-9   # Waits for speech
+    assert adjusted[1].end_time == 3.5
+    # The 0.1s pause is not significant
+    assert (adjusted[2].start_time, adjusted[2].end_time) == (3.6, 5.0)
+    print("✓ Subtitle adjustment test passed")
+
+
+if __name__ == "__main__":
+    print("Testing silence detection...")
+    test_detects_pauses()
+    test_three_minute_track_is_fast()
+    test_subtitles_snap_to_pauses()
+    print("\n✅ All silence detection tests passed!")
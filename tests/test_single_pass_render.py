@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test script for the single-pass render command.
+Verifies the ffmpeg invocation of render_single_pass (input seek and loop,
+crop/scale chain, subtitle filter escaping, stream mapping) and the choice
+of background segment start for short or missing videos.
+"""
+
+import os
+import re
+import sys
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generators import video_generator
+from generators.video_generator import build_subtitle_filter, choose_segment_start, render_single_pass
+from constants import OUTPUT_PROFILES, DEFAULT_OUTPUT_PROFILE
+
+
+def get_token(text, terminators):
+    """Python version of ffmpeg's av_get_token(): unquote/unescape up to a terminator"""
+    out = []
+    i = 0
+    while i < len(text) and text[i] not in terminators:
+        if text[i] == '\\' and i + 1 < len(text):
+            out.append(text[i + 1])
+            i += 2
+        elif text[i] == "'":
+            end = text.find("'", i + 1)
+            end = len(text) if end < 0 else end
+            out.append(text[i + 1:end])
+            i = end + 1
+        else:
+            out.append(text[i])
+            i += 1
+    return ''.join(out), text[i:]
+
+
+def parse_subtitles_filter(filter_text):
+    """Decode a `subtitles=` filter the way ffmpeg does: graph level, then options"""
+    name, args = filter_text.split('=', 1)
+    assert name == "subtitles"
+    args, rest = get_token(args, "[],;")
+    assert rest == "", f"Filtergraph would split at {rest!r}"
+
+    options = []
+    while args:
+        match = re.match(r'([\w-]+)=', args)
+        key = match.group(1) if match else None
+        value, args = get_token(args[match.end():] if match else args, ":")
+        options.append((key, value))
+        args = args[1:]
+    return options
+
+
+def render_command(**kwargs):
+    """Run render_single_pass with ffmpeg mocked out and return its command"""
+    commands = []
+    with patch.object(video_generator, "run_ffmpeg", lambda cmd, **_: commands.append(cmd)), \
+            patch.object(video_generator, "get_duration", lambda path: 300.0), \
+            patch.object(video_generator, "ffmpeg_thread_args", lambda *a: ["-threads", "4"]):
+        assert render_single_pass("bg.mp4", "subs.ass", "voice.wav", "out.mp4", **kwargs)
+    assert len(commands) == 1
+    return commands[0]
+
+
+def test_single_pass_command():
+    """One ffmpeg call seeks the background, filters it and muxes the voice"""
+    cmd = render_command(start_time=12.5, duration=60.0)
+    settings = OUTPUT_PROFILES[DEFAULT_OUTPUT_PROFILE]
+
+    # Input seek and length before the background input, no loop needed
+    background = cmd.index("bg.mp4")
+    assert cmd[background - 1] == "-i"
+    assert cmd[cmd.index("-ss") + 1] == "12.5" and cmd.index("-ss") < background
+    assert cmd[cmd.index("-t") + 1] == "60.0" and cmd.index("-t") < background
+    assert "-stream_loop" not in cmd
+    assert cmd[cmd.index("voice.wav") - 1] == "-i"
+
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert graph.startswith("[0:v]crop=ih*9/16:ih,") and graph.endswith("[v]")
+    assert f"scale={settings['width']}:{settings['height']}" in graph
+    assert graph.index("scale=") < graph.index("subtitles=subs.ass")
+
+    maps = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-map"]
+    assert maps == ["[v]", "1:a:0"]
+    assert "-shortest" in cmd and cmd[-1] == "out.mp4"
+    assert cmd[cmd.index("-crf") + 1] == str(settings["crf"])
+    assert cmd[cmd.index("-threads") + 1] == "4"
+    print("✓ Single-pass command test passed")
+
+
+def test_short_background_is_looped():
+    """A segment running past the end loops the input from the wrapped start"""
+    cmd = render_command(start_time=310.0, duration=295.0, crop=False)
+    assert cmd[cmd.index("-stream_loop") + 1] == "-1"
+    assert cmd[cmd.index("-ss") + 1] == "10.0"
+    assert "crop=" not in cmd[cmd.index("-filter_complex") + 1]
+    print("✓ Background loop test passed")
+
+
+def test_subtitle_filter_escaping():
+    """Paths and force_style survive both levels of filtergraph parsing"""
+    assert build_subtitle_filter("outputs/run/subs.ass") == "subtitles=outputs/run/subs.ass"
+
+    path = "outputs/it's [odd],one;x:y.ass"
+    assert parse_subtitles_filter(build_subtitle_filter(path)) == [(None, path)]
+
+    options = parse_subtitles_filter(build_subtitle_filter(path, font_size=72, margin_v=200))
+    assert options[0] == (None, path)
+    assert options[1][0] == "force_style"
+    style = dict(entry.split('=', 1) for entry in options[1][1].split(','))
+    assert style["FontSize"] == "72" and style["MarginV"] == "200"
+    assert style["Bold"] == "1"
+    print("✓ Subtitle filter escaping test passed")
+
+
+def test_choose_segment_start():
+    """Keyframe starts for long videos, wrap-around starts for short ones, None if missing"""
+    keyframes = [float(k) for k in range(0, 100, 2)]
+    with patch.object(video_generator, "get_keyframes", lambda path: keyframes):
+        with patch.object(video_generator, "get_duration", lambda path: 100.0):
+            for _ in range(20):
+                start = choose_segment_start("bg.mp4", 30.0)
+                assert start in keyframes and start + 30.0 <= 100.0
+            # Shorter than the target: any keyframe, the render loops the input
+            for _ in range(20):
+                assert choose_segment_start("bg.mp4", 250.0) in keyframes
+
+        with patch.object(video_generator, "get_duration", lambda path: 0.0):
+            assert choose_segment_start("bg.mp4", 30.0) is None
+
+    def missing(path):
+        raise FileNotFoundError(path)
+    with patch.object(video_generator, "get_duration", missing):
+        assert choose_segment_start("missing.mp4", 30.0) is None
+
+    # No keyframe index: an arbitrary start that still fits
+    with patch.object(video_generator, "get_keyframes", lambda path: []), \
+            patch.object(video_generator, "get_duration", lambda path: 40.0):
+        assert 0.0 <= choose_segment_start("bg.mp4", 30.0) <= 10.0
+        assert 0.0 <= choose_segment_start("bg.mp4", 60.0) < 40.0
+    print("✓ Segment start test passed")
+
+
+if __name__ == "__main__":
+    print("Testing single-pass render...")
+    test_single_pass_command()
+    test_short_background_is_looped()
+    test_subtitle_filter_escaping()
+    test_choose_segment_start()
+    print("\n✅ All single-pass render tests passed!")
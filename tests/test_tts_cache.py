@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for the TTS audio cache.
+Verifies keying, hits and misses, and LRU eviction under the size cap.
+"""
+
+import os
+import sys
+import time
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import tts_cache
+
+
+def make_audio(directory, name, size):
+    """Write a fake audio file of the given size"""
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(name.encode('utf-8')[:1] * size)
+    return path
+
+
+def test_key_covers_request_settings():
+    """Anything that changes the audio changes the key"""
+    key = tts_cache.cache_key("Hello", "voice", "speech-1.6", 1.25, "mp3")
+    assert key == tts_cache.cache_key("Hello", "voice", "speech-1.6", 1.25, "mp3")
+    assert key != tts_cache.cache_key("Hello!", "voice", "speech-1.6", 1.25, "mp3")
+    assert key != tts_cache.cache_key("Hello", "other", "speech-1.6", 1.25, "mp3")
+    assert key != tts_cache.cache_key("Hello", "voice", "speech-1.6", 1.0, "mp3")
+    assert key != tts_cache.cache_key("Hello", "voice", "speech-1.6", 1.25, "pcm", 16000)
+    print("✓ Cache key test passed")
+
+
+def test_hit_miss_and_eviction():
+    """Misses and hits are counted, least recently used entries go first"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = {"enabled": True, "dir": os.path.join(temp_dir, "cache"), "max_bytes": 250}
+        with patch.dict(tts_cache.TTS_CACHE_CONFIG, config):
+            output = os.path.join(temp_dir, "out", "voice.mp3")
+            assert not tts_cache.get("a" * 64, "mp3", output)
+
+            tts_cache.put("a" * 64, "mp3", make_audio(temp_dir, "a.mp3", 100))
+            tts_cache.put("b" * 64, "mp3", make_audio(temp_dir, "b.mp3", 100))
+            assert tts_cache.get("a" * 64, "mp3", output)
+            with open(output, 'rb') as f:
+                assert f.read() == b'a' * 100
+
+            # "a" was used last, so adding "c" evicts "b"
+            future = time.time() + 10
+            os.utime(tts_cache._entry_path("a" * 64, "mp3"), (future, future))
+            tts_cache.put("c" * 64, "mp3", make_audio(temp_dir, "c.mp3", 100))
+            assert tts_cache.get("a" * 64, "mp3", output)
+            assert not tts_cache.get("b" * 64, "mp3", output)
+
+            stats = tts_cache.stats()
+            assert stats["hits"] == 2
+            assert stats["misses"] == 2
+            assert stats["evictions"] == 1
+            assert stats["entries"] == 2
+            assert stats["bytes"] == 200
+    print("✓ Hit/miss and eviction test passed")
+
+
+def test_disabled_cache():
+    """A disabled cache never hits and stores nothing"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = {"enabled": False, "dir": os.path.join(temp_dir, "cache"), "max_bytes": 10 ** 6}
+        with patch.dict(tts_cache.TTS_CACHE_CONFIG, config):
+            tts_cache.put("a" * 64, "mp3", make_audio(temp_dir, "a.mp3", 10))
+            assert not tts_cache.get("a" * 64, "mp3", os.path.join(temp_dir, "out.mp3"))
+            assert not os.path.exists(config["dir"])
+    print("✓ Disabled cache test passed")
+
+
+if __name__ == "__main__":
+    print("Testing TTS cache...")
+    test_key_covers_request_settings()
+    test_hit_miss_and_eviction()
+    test_disabled_cache()
+    print("\n✅ All TTS cache tests passed!")
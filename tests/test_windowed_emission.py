@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for windowed emission computation.
+Verifies that stitching overlapping windows gives the same log-probabilities
+as one pass over the whole clip for a model with a local receptive field,
+with every forward pass bounded by the window length, and stays close to a
+single pass for wav2vec2 itself. Uses a small convolutional stand-in with
+wav2vec2's frame stride and a randomly initialised wav2vec2 base model, no
+model download.
+"""
+
+import os
+import sys
+import torch
+import torchaudio
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generators.force_alignment import windowed_emission, WAV2VEC2_FRAME_STRIDE
+
+
+class ConvModel(torch.nn.Module):
+    """(batch, samples) -> ((batch, frames, labels), None) like the wav2vec2 model"""
+
+    def __init__(self, num_labels=6):
+        super().__init__()
+        torch.manual_seed(0)
+        self.conv = torch.nn.Conv1d(1, num_labels, kernel_size=400, stride=WAV2VEC2_FRAME_STRIDE)
+        self.input_sizes = []
+
+    def forward(self, waveforms, lengths=None):
+        self.input_sizes.append(waveforms.size(-1))
+        return self.conv(waveforms.unsqueeze(1)).transpose(1, 2), None
+
+
+def test_windows_match_single_pass():
+    """Stitched windows equal the single pass over the whole clip"""
+    model = ConvModel()
+    waveform = torch.randn(16000 * 7 + 123)
+    with torch.inference_mode():
+        expected = torch.log_softmax(model(waveform.unsqueeze(0))[0][0], dim=-1)
+
+    model.input_sizes = []
+    emission = windowed_emission(model, waveform, window_samples=16000, overlap_samples=1600)
+    assert emission.shape == expected.shape, (emission.shape, expected.shape)
+    assert torch.allclose(emission, expected, atol=1e-5)
+    assert len(model.input_sizes) > 1 and max(model.input_sizes) <= 16000
+    print(f"✓ Windowed emission test passed ({len(model.input_sizes)} windows)")
+
+
+def test_short_clip_single_window():
+    """Audio shorter than a window takes one pass"""
+    model = ConvModel()
+    waveform = torch.randn(8000)
+    emission = windowed_emission(model, waveform, window_samples=16000, overlap_samples=1600)
+    assert model.input_sizes == [8000]
+    assert emission.size(0) == (8000 - 400) // WAV2VEC2_FRAME_STRIDE + 1
+    print("✓ Short clip test passed")
+
+
+def test_wav2vec2_windows_close_to_single_pass():
+    """wav2vec2 sees less context per window, its emission stays close to one pass"""
+    torch.manual_seed(0)
+    model = torchaudio.models.wav2vec2_base(aux_num_out=32).eval()
+    waveform = torch.randn(16000 * 6 + 321) * 0.1
+    with torch.inference_mode():
+        expected = torch.log_softmax(model(waveform.unsqueeze(0))[0][0], dim=-1)
+
+    emission = windowed_emission(model, waveform, window_samples=32000, overlap_samples=8000)
+    assert emission.shape == expected.shape, (emission.shape, expected.shape)
+    # Not exact: attention and the first layer's GroupNorm only see the window
+    correlation = torch.corrcoef(torch.stack((emission.flatten(), expected.flatten())))[0, 1]
+    assert correlation > 0.95, float(correlation)
+    print(f"✓ wav2vec2 windowed emission test passed (correlation {float(correlation):.4f}, "
+          f"max difference {float((emission - expected).abs().max()):.3f})")
+
+
+if __name__ == "__main__":
+    print("Testing windowed emission...")
+    test_windows_match_single_pass()
+    test_short_clip_single_window()
+    test_wav2vec2_windows_close_to_single_pass()
+    print("\n✅ All windowed emission tests passed!")
@@ -1,4 +1,7 @@
 import os
+import re
+import json
+import wave
 import subprocess
 from dotenv import load_dotenv
 import httpx
@@ -10,6 +13,12 @@ import asyncio
 import time
 import random
 from contextlib import asynccontextmanager
+from utils.ffmpeg_runner import run_ffmpeg
+from utils.media_probe import probe_duration
+from utils import tts_cache
+from utils import http_client
+from utils import rate_limit
+from constants import TTS_CHUNK_CONFIG
 
 # Configure module-level logger
 logger = logging.getLogger(__name__)
@@ -22,6 +31,7 @@ class TTSRequest(BaseModel):
     normalize: bool = True
     format: Literal["wav", "pcm", "mp3", "opus"] = "mp3"
     mp3_bitrate: Literal[64, 128, 192] = 192
+    sample_rate: Optional[int] = None  # For wav/pcm output
     latency: Literal["normal", "balanced"] = "normal"
     model: Literal["speech-1.6"] = "speech-1.6"  # Required model parameter
     prosody: Dict[str, float] = {
@@ -48,9 +58,171 @@ VOICE_SPEEDS = {
 }
 
 
-# Context manager for httpx client to ensure proper cleanup
+# Audio format requested from Fish Audio per voice:
+# "mp3": compressed download, decoded by ffmpeg in process_audio()
+# "pcm"/"wav": raw 16-bit mono PCM at TTS_PCM_SAMPLE_RATE, streamed straight
+#   into a WAV file (more bandwidth, no MP3 decode)
+VOICE_FORMATS = {
+    "default": "mp3"
+}
+
+# Sample rate of PCM output, matches the alignment track
+TTS_PCM_SAMPLE_RATE = 16000
+
+
+def get_voice_format(voice_name):
+    """Return the TTS output format of a voice ("mp3" or "pcm")"""
+    audio_format = VOICE_FORMATS.get(voice_name, VOICE_FORMATS["default"])
+    return "pcm" if audio_format in ("pcm", "wav") else "mp3"
+
+
+async def write_pcm_stream(chunks, output_path, sample_rate=TTS_PCM_SAMPLE_RATE):
+    """Write a stream of raw 16-bit mono PCM chunks into a WAV file.
+
+    Args:
+        chunks: Async iterator of bytes (e.g. response.aiter_bytes())
+        output_path: WAV file to write
+        sample_rate: Sample rate of the PCM data
+
+    Returns:
+        Number of audio frames written
+    """
+    frames = 0
+    leftover = b''
+    with wave.open(output_path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        async for chunk in chunks:
+            # Chunks can split a sample, keep the odd byte for the next one
+            data = leftover + chunk
+            usable = len(data) - len(data) % 2
+            leftover = data[usable:]
+            if usable:
+                wf.writeframesraw(data[:usable])
+                frames += usable // 2
+    return frames
+
+
+# A sentence (up to its closing punctuation/quotes) or text up to a pause marker
+SCRIPT_PIECE_PATTERN = re.compile(
+    r'.+?(?:[.!?]+["\')\]]*(?=\s|$)|\((?:long-)?break\)|$)', re.DOTALL)
+PAUSE_MARKER_PATTERN = re.compile(r'^\((?:long-)?break\)$')
+
+
+def split_script(text, max_chars=None):
+    """Split a script into TTS chunks at sentence and (break) boundaries.
+
+    Sentences are packed greedily into chunks of at most max_chars
+    characters; a (break)/(long-break) marker always stays with the text
+    before it. A sentence longer than max_chars is split between words.
+
+    Args:
+        text: Script text
+        max_chars: Maximum chunk length (TTS_CHUNK_CONFIG default)
+
+    Returns:
+        List of chunk strings, in order
+    """
+    if max_chars is None:
+        max_chars = TTS_CHUNK_CONFIG["max_chars"]
+
+    pieces = []
+    for match in SCRIPT_PIECE_PATTERN.finditer(text):
+        piece = ' '.join(match.group(0).split())
+        if not piece:
+            continue
+        if PAUSE_MARKER_PATTERN.match(piece) and pieces:
+            pieces[-1] += ' ' + piece
+        else:
+            pieces.append(piece)
+
+    chunks = []
+    current = ''
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) <= max_chars:
+            current += ' ' + piece
+            continue
+        if current:
+            chunks.append(current)
+        current = ''
+        # Oversized sentence, fall back to word boundaries
+        for word in piece.split(' '):
+            if current and len(current) + 1 + len(word) > max_chars:
+                chunks.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def stitch_wav_files(input_paths, output_path, gap_ms=0):
+    """Concatenate WAV files with identical formats, with optional silence between them"""
+    with wave.open(input_paths[0], 'rb') as first:
+        params = first.getparams()
+
+    frame_size = params.nchannels * params.sampwidth
+    gap = b'\x00' * (int(params.framerate * gap_ms / 1000) * frame_size)
+    with wave.open(output_path, 'wb') as out:
+        out.setparams(params)
+        for index, path in enumerate(input_paths):
+            with wave.open(path, 'rb') as wf:
+                if wf.getparams()[:3] != params[:3]:
+                    raise ValueError(f"WAV format of {path} differs from {input_paths[0]}")
+                if index and gap:
+                    out.writeframesraw(gap)
+                out.writeframesraw(wf.readframes(wf.getnframes()))
+    return output_path
+
+
+def build_stitch_command(input_paths, output_path, gap_ms=0, crossfade_ms=0):
+    """Build the ffmpeg command concatenating TTS chunks into one WAV file"""
+    command = ['ffmpeg', '-y']
+    for path in input_paths:
+        command += ['-i', path]
+
+    count = len(input_paths)
+    if crossfade_ms and count > 1:
+        # Chain pairwise crossfades: [0][1] -> [x1], [x1][2] -> [x2], ...
+        duration = crossfade_ms / 1000
+        filters = []
+        previous = '[0:a]'
+        for index in range(1, count):
+            label = '[out]' if index == count - 1 else f'[x{index}]'
+            filters.append(f"{previous}[{index}:a]acrossfade=d={duration}{label}")
+            previous = label
+        graph = ';'.join(filters)
+    else:
+        filters = []
+        inputs = ''
+        for index in range(count):
+            if gap_ms and index < count - 1:
+                filters.append(f"[{index}:a]apad=pad_dur={gap_ms / 1000}[p{index}]")
+                inputs += f'[p{index}]'
+            else:
+                inputs += f'[{index}:a]'
+        filters.append(f"{inputs}concat=n={count}:v=0:a=1[out]")
+        graph = ';'.join(filters)
+
+    command += [
+        '-filter_complex', graph,
+        '-map', '[out]',
+        '-c:a', 'pcm_s16le',
+        output_path
+    ]
+    return command
+
+
+# On the shared event loop this is the process-wide pooled client, whose
+# connections are kept alive between requests, so retries and chunks don't
+# pay DNS/TCP/TLS setup again. Other loops get a client closed after use.
 @asynccontextmanager
 async def get_httpx_client(timeout=60.0):
+    if http_client.on_shared_loop():
+        yield http_client.get_client()
+        return
     client = httpx.AsyncClient(timeout=timeout)
     try:
         yield client
@@ -58,8 +230,17 @@ async def get_httpx_client(timeout=60.0):
         await client.aclose()
 
 
-async def generate_voice(text, voice_id, output_path="audio/output.mp3", max_retries=5, timeout=90.0):
-    """Generate audio using Fish Audio API with special effects support"""
+async def generate_voice(text, voice_id, output_path="audio/output.mp3", max_retries=5, timeout=90.0,
+                         audio_format=None):
+    """Generate audio using Fish Audio API with special effects support
+
+    Results are looked up in and added to the TTS cache (utils.tts_cache),
+    so identical text with the same voice settings is only synthesized once.
+
+    Args:
+        audio_format: "mp3" or "pcm"; defaults to the voice's VOICE_FORMATS entry.
+            With "pcm" output_path is written as a 16-bit mono WAV file.
+    """
     load_dotenv()
     api_key = os.getenv("FISH_API_KEY")
 
@@ -72,12 +253,26 @@ async def generate_voice(text, voice_id, output_path="audio/output.mp3", max_ret
 
     # Add context to logs
     log_prefix = f"[Voice:{voice_name}]"
+    if audio_format is None:
+        audio_format = get_voice_format(voice_name)
     logger.info(
-        f"{log_prefix} Generating voice audio for output: {output_path}")
+        f"{log_prefix} Generating {audio_format} voice audio for output: {output_path}")
 
     # Ensure output directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
+    # Get voice-specific speed or use default
+    speed = VOICE_SPEEDS.get(voice_name, VOICE_SPEEDS["default"])
+    logger.info(f"{log_prefix} Using voice speed: {speed}")
+
+    # Identical text with the same voice settings was synthesized before
+    sample_rate = TTS_PCM_SAMPLE_RATE if audio_format == "pcm" else None
+    cache_key = tts_cache.cache_key(
+        text, voice_id, "speech-1.6", speed, audio_format, sample_rate)
+    if tts_cache.get(cache_key, audio_format, output_path):
+        logger.info(f"{log_prefix} Using cached voice audio")
+        return output_path
+
     retries = 0
     last_error = None
     max_timeout = timeout  # Store original timeout
@@ -87,15 +282,13 @@ async def generate_voice(text, voice_id, output_path="audio/output.mp3", max_ret
             # Increase timeout with each retry
             current_timeout = timeout * (retries + 1)
 
-            # Get voice-specific speed or use default
-            speed = VOICE_SPEEDS.get(voice_name, VOICE_SPEEDS["default"])
-            logger.info(f"{log_prefix} Using voice speed: {speed}")
-
             request = TTSRequest(
                 text=text,
                 reference_id=voice_id,
                 chunk_length=200,
+                format=audio_format,
                 mp3_bitrate=192,
+                sample_rate=sample_rate,
                 model="speech-1.6",
                 prosody={
                     "speed": speed,
@@ -111,10 +304,13 @@ async def generate_voice(text, voice_id, output_path="audio/output.mp3", max_ret
             logger.info(
                 f"{log_prefix} Making API request to Fish Audio (attempt {retries+1}/{max_retries}, timeout: {current_timeout}s)")
 
-            # Use context manager to ensure client is properly closed
-            async with get_httpx_client(timeout=current_timeout) as client:
-                start_time = time.time()
-                try:
+            # Shared with all workers, waits out a 429 seen by any of them
+            await rate_limit.acquire_async("fish_audio")
+
+            async def attempt(index):
+                # Hedged duplicates write to their own temporary file
+                temp_path = f"{output_path}.{index}.tmp"
+                async with get_httpx_client(timeout=current_timeout) as client:
                     async with client.stream(
                         "POST",
                         "https://api.fish.audio/v1/tts",
@@ -128,41 +324,55 @@ async def generate_voice(text, voice_id, output_path="audio/output.mp3", max_ret
                                 f"{log_prefix} Fish Audio API Error: {response.status_code}")
                             logger.error(
                                 f"{log_prefix} Error details: {error_text.decode()}")
+                            if response.status_code == 429:
+                                retry_after = rate_limit.parse_retry_after(
+                                    response.headers.get("retry-after"))
+                                rate_limit.block("fish_audio", retry_after or 2 ** (retries + 1))
+                                raise rate_limit.RateLimited(
+                                    f"Fish Audio API error: {response.status_code}")
                             raise Exception(
                                 f"Fish Audio API error: {response.status_code}")
 
-                        # Create a temporary file first
-                        temp_path = output_path + '.tmp'
                         try:
                             logger.info(
                                 f"{log_prefix} Received successful response, writing to temporary file")
-                            with open(temp_path, "wb") as f:
-                                async for chunk in response.aiter_bytes():
-                                    f.write(chunk)
+                            if audio_format == "pcm":
+                                await write_pcm_stream(
+                                    response.aiter_bytes(), temp_path)
+                            else:
+                                with open(temp_path, "wb") as f:
+                                    async for chunk in response.aiter_bytes():
+                                        f.write(chunk)
 
                             # Verify the file was written successfully
                             if os.path.getsize(temp_path) == 0:
                                 raise Exception(
                                     "Generated audio file is empty")
-
-                            # Move the temporary file to the final location
-                            os.replace(temp_path, output_path)
-
-                        except Exception as e:
-                            # Clean up temporary file if it exists
+                        except BaseException:
+                            # Clean up temporary file if it exists (also when
+                            # a hedged duplicate won and this one was cancelled)
                             if os.path.exists(temp_path):
                                 os.remove(temp_path)
                             raise
+                return temp_path
 
-                        duration = time.time() - start_time
-                        logger.info(
-                            f"{log_prefix} API request completed in {duration:.2f} seconds")
-                        return output_path
+            start_time = time.time()
+            try:
+                temp_path = await rate_limit.hedged_async("fish_audio", attempt)
+            except httpx.TimeoutException:
+                logger.warning(
+                    f"{log_prefix} Request timed out after {current_timeout} seconds")
+                raise
 
-                except httpx.TimeoutException:
-                    logger.warning(
-                        f"{log_prefix} Request timed out after {current_timeout} seconds")
-                    raise
+            # Move the temporary file to the final location
+            os.replace(temp_path, output_path)
+
+            duration = time.time() - start_time
+            rate_limit.record_latency("fish_audio", duration)
+            logger.info(
+                f"{log_prefix} API request completed in {duration:.2f} seconds")
+            tts_cache.put(cache_key, audio_format, output_path)
+            return output_path
 
         except Exception as e:
             last_error = e
@@ -170,6 +380,11 @@ async def generate_voice(text, voice_id, output_path="audio/output.mp3", max_ret
             logger.error(f"{log_prefix} Fish Audio API Error: {str(e)}")
 
             if retries < max_retries:
+                if isinstance(e, rate_limit.RateLimited):
+                    # The shared limiter holds every worker until it clears
+                    logger.info(
+                        f"{log_prefix} Retrying once the rate limit clears (attempt {retries+1}/{max_retries})")
+                    continue
                 # Exponential backoff with jitter
                 wait_time = (2 ** retries) + random.uniform(0, 1)
                 logger.info(
@@ -186,14 +401,128 @@ async def generate_voice(text, voice_id, output_path="audio/output.mp3", max_ret
     raise Exception(error_msg)
 
 
-async def audio(text_file_path, file_path="audio/output.wav", voice="donald_trump"):
+def chunk_timing_path(output_path):
+    """Path of the chunk timing JSON written next to a chunked synthesis"""
+    return f"{os.path.splitext(output_path)[0]}_chunks.json"
+
+
+async def synthesize_chunked(chunks, voice_id, output_path, audio_format="mp3",
+                             max_concurrency=None, gap_ms=None, crossfade_ms=None):
+    """Synthesize script chunks concurrently and stitch them into one WAV file.
+
+    Each chunk is a separate Fish Audio request (with its own retries), at
+    most max_concurrency in flight. The results are concatenated in order,
+    separated by gap_ms of silence or overlapped by crossfade_ms. The offset
+    of every chunk in the stitched audio is written next to it as
+    <output>_chunks.json (see chunk_timing_path), where core.main uses them
+    to anchor the estimated subtitle timings.
+
+    Args:
+        chunks: Chunk texts, see split_script()
+        voice_id: Fish Audio voice id
+        output_path: Stitched WAV file to write
+        audio_format: "mp3" or "pcm" format requested per chunk
+        max_concurrency, gap_ms, crossfade_ms: TTS_CHUNK_CONFIG defaults
+
+    Returns:
+        (output_path, timing) where timing is the dict written to the JSON file
+    """
+    if max_concurrency is None:
+        max_concurrency = TTS_CHUNK_CONFIG["max_concurrency"]
+    if gap_ms is None:
+        gap_ms = TTS_CHUNK_CONFIG["gap_ms"]
+    if crossfade_ms is None:
+        crossfade_ms = TTS_CHUNK_CONFIG["crossfade_ms"]
+
+    voice_name = next((k for k, v in VOICE_IDS.items()
+                      if v == voice_id), "unknown_voice")
+    log_prefix = f"[Voice:{voice_name}]"
+    logger.info(
+        f"{log_prefix} Synthesizing {len(chunks)} chunks, {max_concurrency} at a time")
+
+    base = os.path.splitext(output_path)[0]
+    extension = '.wav' if audio_format == "pcm" else '.mp3'
+    chunk_paths = [f"{base}_chunk{index:02d}{extension}" for index in range(len(chunks))]
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    start_time = time.time()
+
+    async def synthesize(index):
+        async with semaphore:
+            queued = time.time() - start_time
+            chunk_start = time.time()
+            await generate_voice(chunks[index], voice_id, chunk_paths[index],
+                                 audio_format=audio_format)
+            return queued, time.time() - chunk_start
+
+    tasks = [asyncio.ensure_future(synthesize(index)) for index in range(len(chunks))]
+    try:
+        try:
+            results = await asyncio.gather(*tasks)
+        except Exception:
+            # One chunk failed for good, don't leave the others running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        synthesis_seconds = time.time() - start_time
+
+        if audio_format == "pcm" and not crossfade_ms:
+            stitch_wav_files(chunk_paths, output_path, gap_ms)
+        else:
+            command = build_stitch_command(chunk_paths, output_path, gap_ms, crossfade_ms)
+            run_ffmpeg(command, label=f"{voice_name} stitch {len(chunks)} chunks")
+
+        # Offsets of the chunks in the stitched audio
+        timing_chunks = []
+        offset = 0.0
+        for index, (queued, seconds) in enumerate(results):
+            duration = probe_duration(chunk_paths[index])
+            timing_chunks.append({
+                "index": index,
+                "text": chunks[index],
+                "start": round(offset, 3),
+                "end": round(offset + duration, 3),
+                "queued_seconds": round(queued, 3),
+                "synthesis_seconds": round(seconds, 3),
+            })
+            # A crossfade overlaps the next chunk instead of leaving a gap
+            offset += duration + (-crossfade_ms if crossfade_ms else gap_ms) / 1000
+    finally:
+        for path in chunk_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    timing = {
+        "voice": voice_name,
+        "gap_ms": gap_ms,
+        "crossfade_ms": crossfade_ms,
+        "synthesis_seconds": round(synthesis_seconds, 3),
+        "chunks": timing_chunks,
+    }
+    with open(chunk_timing_path(output_path), 'w', encoding='utf-8') as f:
+        json.dump(timing, f, indent=2)
+
+    logger.info(
+        f"{log_prefix} Synthesized {len(chunks)} chunks in {synthesis_seconds:.2f} seconds "
+        f"(slowest chunk {max(seconds for _, seconds in results):.2f}s)")
+    return output_path, timing
+
+
+async def audio(text_file_path, file_path="audio/output.wav", voice="donald_trump", convert=True):
     """
     Generate audio from text using Fish Audio voices
 
     Args:
         text_file_path: Path to text file to convert
-        file_path: Output WAV file path
+        file_path: Output WAV file path (the MP3 path when convert is False)
         voice: Voice key from VOICE_IDS dict
+        convert: Convert the MP3 to WAV. Pass False when the result goes
+            through process_audio(), which decodes the MP3 itself.
+
+    Returns:
+        Path of the generated audio file. Voices configured for PCM output
+        (VOICE_FORMATS) and scripts synthesized in chunks (TTS_CHUNK_CONFIG)
+        are always written as WAV, with a .wav extension.
     """
     # Add context to logs
     log_prefix = f"[Voice:{voice}]"
@@ -216,23 +545,54 @@ async def audio(text_file_path, file_path="audio/output.wav", voice="donald_trum
         logger.error(f"{log_prefix} {error_msg}")
         raise ValueError(error_msg)
 
-    # Create voice-specific intermediate MP3 path (use same directory as the output file)
     output_dir = os.path.dirname(file_path)
-    mp3_filename = f"{os.path.splitext(os.path.basename(file_path))[0]}_{voice}_temp.mp3"
-    mp3_path = os.path.join(output_dir, mp3_filename)
-
-    # Create directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
+
+    # Long scripts are synthesized as concurrent chunks stitched into a WAV
+    if TTS_CHUNK_CONFIG["enabled"]:
+        chunks = split_script(text)
+        if len(chunks) > 1:
+            wav_path = os.path.splitext(file_path)[0] + '.wav'
+            try:
+                await synthesize_chunked(chunks, voice_id, wav_path,
+                                         audio_format=get_voice_format(voice))
+                logger.info(f"{log_prefix} Successfully generated chunked voice audio")
+            except Exception as e:
+                logger.error(f"{log_prefix} Failed to generate voice audio: {str(e)}")
+                raise
+            return wav_path
+
+    # PCM output is streamed straight into a WAV file, nothing to convert
+    if get_voice_format(voice) == "pcm":
+        wav_path = os.path.splitext(file_path)[0] + '.wav'
+        try:
+            await generate_voice(text, voice_id, wav_path, audio_format="pcm")
+            logger.info(f"{log_prefix} Successfully generated WAV voice audio")
+        except Exception as e:
+            logger.error(f"{log_prefix} Failed to generate voice audio: {str(e)}")
+            raise
+        return wav_path
+
+    # Create voice-specific intermediate MP3 path (use same directory as the output file)
+    if convert:
+        mp3_filename = f"{os.path.splitext(os.path.basename(file_path))[0]}_{voice}_temp.mp3"
+        mp3_path = os.path.join(output_dir, mp3_filename)
+    else:
+        mp3_path = file_path
+
     logger.info(f"{log_prefix} Using temporary MP3 path: {mp3_path}")
 
     # Generate MP3 with Fish Audio
     try:
-        await generate_voice(text, voice_id, mp3_path)
+        await generate_voice(text, voice_id, mp3_path, audio_format="mp3")
         logger.info(f"{log_prefix} Successfully generated MP3 voice audio")
     except Exception as e:
         logger.error(f"{log_prefix} Failed to generate voice audio: {str(e)}")
         raise
 
+    if not convert:
+        return mp3_path
+
     # Convert MP3 to WAV using ffmpeg
     try:
         logger.info(f"{log_prefix} Converting MP3 to WAV format: {file_path}")
@@ -243,8 +603,7 @@ async def audio(text_file_path, file_path="audio/output.wav", voice="donald_trum
             file_path
         ]
         # Capture ffmpeg output for logging
-        result = subprocess.run(command, check=True,
-                                capture_output=True, text=True)
+        result = run_ffmpeg(command, label=f"{voice} mp3 to wav")
         logger.info(f"{log_prefix} TTS conversion complete")
 
         if result.stderr:
@@ -265,10 +624,12 @@ async def audio(text_file_path, file_path="audio/output.wav", voice="donald_trum
         logger.warning(
             f"{log_prefix} Failed to remove temporary MP3 file: {str(e)}")
 
+    return file_path
+
 # Non-async wrapper for compatibility
 
 
-def audio_wrapper(text_file_path, file_path="audio/output.wav", voice="donald_trump"):
+def audio_wrapper(text_file_path, file_path="audio/output.wav", voice="donald_trump", convert=True):
     """Synchronous wrapper for the async audio function"""
     # Add context to logs
     log_prefix = f"[Voice:{voice}]"
@@ -276,14 +637,9 @@ def audio_wrapper(text_file_path, file_path="audio/output.wav", voice="donald_tr
         f"{log_prefix} Starting audio_wrapper for file: {text_file_path}")
 
     try:
-        import asyncio
-        # Create a new event loop for this process to avoid conflicts in multiprocessing
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(
-            audio(text_file_path, file_path, voice))
-        loop.close()
-        return result
+        # Run on the process's long-lived event loop, which owns the pooled client
+        return http_client.run_coroutine(
+            audio(text_file_path, file_path, voice, convert=convert))
     except Exception as e:
         logger.error(f"{log_prefix} Error in audio_wrapper: {str(e)}")
         raise
@@ -332,8 +688,7 @@ def convert_audio(input_path, output_path):
             ]
 
             # Capture output for better logging
-            result = subprocess.run(command, check=True,
-                                    capture_output=True, text=True)
+            result = run_ffmpeg(command, label=f"{voice_match or 'audio'} to 44.1kHz wav")
 
             if result.stderr:
                 logger.debug(
@@ -355,8 +710,7 @@ def convert_audio(input_path, output_path):
                 temp_wav2
             ]
 
-            result = subprocess.run(command, check=True,
-                                    capture_output=True, text=True)
+            result = run_ffmpeg(command, label=f"{voice_match or 'audio'} to 16kHz mono")
 
             if result.stderr:
                 logger.debug(
@@ -395,3 +749,78 @@ def convert_audio(input_path, output_path):
         error_msg = f"{log_prefix} Unexpected error during audio conversion: {str(e)}"
         logger.error(error_msg)
         raise
+
+
+def build_process_audio_command(input_path, alignment_path, mix_path=None, leading_silence_ms=300):
+    """Build the ffmpeg command of process_audio()"""
+    graph = f"[0:a]adelay=delays={int(leading_silence_ms)}:all=1"
+    if mix_path:
+        graph += ",asplit=2[align][mix]"
+    else:
+        graph += "[align]"
+
+    command = [
+        'ffmpeg', '-y',
+        '-i', input_path,
+        '-filter_complex', graph,
+        # 16kHz, 16-bit mono for force alignment
+        '-map', '[align]',
+        '-ac', '1',
+        '-ar', '16000',
+        '-c:a', 'pcm_s16le',
+        alignment_path
+    ]
+    if mix_path:
+        command += [
+            # Full quality track for the final mux
+            '-map', '[mix]',
+            '-ac', '2',
+            '-ar', '44100',
+            '-c:a', 'pcm_s16le',
+            mix_path
+        ]
+    return command
+
+
+def process_audio(input_path, alignment_path, mix_path=None, leading_silence_ms=300):
+    """Produce the alignment WAV and the mix track from the TTS output in one ffmpeg pass.
+
+    The input is decoded once, delayed by leading_silence_ms (which helps
+    subtitle synchronization) and written both as a 16kHz mono WAV for force
+    alignment and timing, and as a 44.1kHz stereo WAV for the final mux.
+    Replaces the audio -> convert_audio -> add_initial_silence chain.
+
+    Args:
+        input_path: TTS output (MP3 or WAV)
+        alignment_path: Output path of the 16kHz mono WAV
+        mix_path: Output path of the 44.1kHz stereo WAV, or None to skip it
+        leading_silence_ms: Silence added at the start of both outputs
+
+    Returns:
+        (alignment_path, mix_path)
+    """
+    log_prefix = f"[Audio:{os.path.basename(input_path)}]"
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(
+            f"{log_prefix} Input file not found: {input_path}")
+    if os.path.getsize(input_path) == 0:
+        raise ValueError(f"{log_prefix} Input file is empty: {input_path}")
+
+    for path in (alignment_path, mix_path):
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    command = build_process_audio_command(
+        input_path, alignment_path, mix_path, leading_silence_ms)
+    try:
+        run_ffmpeg(command, label="process audio")
+    except subprocess.CalledProcessError as e:
+        error_msg = f"{log_prefix} FFmpeg error during audio processing:\n"
+        if e.stderr:
+            error_msg += f"stderr: {e.stderr}\n"
+        logger.error(error_msg)
+        raise Exception(error_msg)
+
+    logger.info(
+        f"{log_prefix} AUDIO PROCESSING DONE! alignment: {alignment_path}, mix: {mix_path}")
+    return alignment_path, mix_path
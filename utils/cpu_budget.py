@@ -0,0 +1,141 @@
+"""
+Central CPU budget for generation requests.
+
+The server reserves cores for each request before starting its worker
+processes. Every worker gets a fixed number of threads, which is applied to
+ffmpeg (`-threads`), torch (`torch.set_num_threads`) and OpenMP/BLAS, so
+overlapping multi-voice requests share the machine instead of each assuming
+it owns every core.
+"""
+
+import os
+import sys
+import uuid
+import logging
+import threading
+from dataclasses import dataclass
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+# Environment variable carrying the per-process thread allocation
+THREADS_ENV_VAR = "BRAINROT_THREADS"
+
+
+@dataclass
+class Allocation:
+    token: str
+    workers: int
+    threads_per_worker: int
+
+    @property
+    def cores(self):
+        return self.workers * self.threads_per_worker
+
+
+class CpuBudget:
+    """Hands out worker/thread allocations from a fixed number of cores"""
+
+    def __init__(self, total_cores=None, reserved_cores=1, max_threads_per_worker=None):
+        if total_cores is None:
+            total_cores = os.cpu_count() or 1
+        # Leave some headroom for the web server and the OS
+        self.total_cores = max(1, total_cores - reserved_cores)
+        self.max_threads_per_worker = max_threads_per_worker
+        self._allocations = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, workers, label=None):
+        """Reserve cores for a request with up to `workers` worker processes.
+
+        When the machine is already busy the request gets fewer workers and/or
+        threads, but always at least one worker with one thread.
+
+        Args:
+            workers: Desired number of worker processes
+            label: Optional description used in logs
+
+        Returns:
+            Allocation to pass to release() when the request finishes
+        """
+        with self._lock:
+            in_use = sum(a.cores for a in self._allocations.values())
+            available = max(1, self.total_cores - in_use)
+            workers = max(1, min(workers, available))
+            threads = max(1, available // workers)
+            if self.max_threads_per_worker:
+                threads = min(threads, self.max_threads_per_worker)
+            allocation = Allocation(uuid.uuid4().hex, workers, threads)
+            self._allocations[allocation.token] = allocation
+
+        logger.info(
+            f"CPU budget: reserved {workers} worker(s) x {threads} thread(s) for {label or allocation.token} "
+            f"({in_use + allocation.cores}/{self.total_cores} cores in use)")
+        return allocation
+
+    def release(self, allocation):
+        """Return an allocation's cores to the budget"""
+        with self._lock:
+            self._allocations.pop(allocation.token, None)
+            in_use = sum(a.cores for a in self._allocations.values())
+        logger.info(
+            f"CPU budget: released {allocation.cores} core(s) ({in_use}/{self.total_cores} cores in use)")
+
+    def snapshot(self):
+        """Return the current allocation state for status/metrics endpoints"""
+        with self._lock:
+            allocations = list(self._allocations.values())
+        return {
+            "total_cores": self.total_cores,
+            "cores_in_use": sum(a.cores for a in allocations),
+            "active_allocations": len(allocations),
+            "allocations": [
+                {"workers": a.workers, "threads_per_worker": a.threads_per_worker}
+                for a in allocations
+            ],
+        }
+
+
+def get_process_threads():
+    """Return the thread allocation of the current process, or None if unset"""
+    value = os.getenv(THREADS_ENV_VAR)
+    try:
+        return max(1, int(value)) if value else None
+    except ValueError:
+        return None
+
+
+def ffmpeg_thread_args(divisor=1):
+    """Return ffmpeg `-threads` arguments matching this process's allocation.
+
+    Args:
+        divisor: Number of concurrent ffmpeg processes sharing the allocation
+
+    Returns:
+        ["-threads", "N"], or [] if no allocation is set (ffmpeg default)
+    """
+    threads = get_process_threads()
+    if threads is None:
+        return []
+    return ["-threads", str(max(1, threads // max(1, divisor)))]
+
+
+def apply_torch_threads():
+    """Limit torch intra-op threads to this process's allocation, if torch is loaded"""
+    threads = get_process_threads()
+    torch = sys.modules.get("torch")
+    if threads is None or torch is None:
+        return
+    if torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+        logger.info(f"Set torch intra-op threads to {threads}")
+
+
+def init_worker(threads):
+    """ProcessPoolExecutor initializer applying a per-worker thread allocation"""
+    os.environ[THREADS_ENV_VAR] = str(threads)
+    # Native thread pools (OpenMP/MKL/OpenBLAS) read these when first used
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    apply_torch_threads()
+    logger.info(f"Worker {os.getpid()} limited to {threads} thread(s)")
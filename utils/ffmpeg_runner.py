@@ -0,0 +1,282 @@
+"""
+Shared ffmpeg runner with progress telemetry, cancellation and timeouts.
+
+`run_ffmpeg()` is a drop-in replacement for `subprocess.run(cmd, check=True)`
+on ffmpeg commands. It adds `-progress pipe:1 -nostats` to the command and
+parses the key=value blocks ffmpeg writes into ProgressEvent objects carrying
+frame, fps, encode speed (x realtime) and out_time. Events are passed to the
+registered listeners, so slow renders show up in the logs and metrics.
+
+A render is stopped (terminate, then kill) when its cancel event is set, when
+it exceeds its timeout, or when it reports no progress for
+FFMPEG_RUNNER_CONFIG["stall_timeout"] seconds, so a stuck encode can't tie up
+a pool worker forever.
+"""
+
+import os
+import time
+import logging
+import threading
+import subprocess
+from collections import deque
+from dataclasses import dataclass, field
+from constants import FFMPEG_RUNNER_CONFIG
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+_listeners = []
+_listeners_lock = threading.Lock()
+
+# Processes started by run_ffmpeg in this process, for cancel_all()
+_active = {}
+_active_lock = threading.Lock()
+
+
+class FFmpegCancelled(Exception):
+    """Raised when an ffmpeg run is cancelled through its cancel event"""
+
+
+@dataclass
+class ProgressEvent:
+    label: str
+    pid: int
+    frame: int = 0
+    fps: float = 0.0
+    speed: float = None              # Encode speed as a multiple of realtime
+    out_time: float = 0.0            # Seconds of output written so far
+    total_size: int = 0
+    elapsed: float = 0.0             # Wall-clock seconds since start
+    done: bool = False
+    raw: dict = field(default_factory=dict, repr=False)
+
+
+def add_listener(callback):
+    """Register a callable receiving every ProgressEvent of this process"""
+    with _listeners_lock:
+        if callback not in _listeners:
+            _listeners.append(callback)
+
+
+def remove_listener(callback):
+    """Unregister a progress listener"""
+    with _listeners_lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
+
+
+def _publish(event, on_progress):
+    """Pass an event to the per-call callback and all listeners"""
+    with _listeners_lock:
+        callbacks = list(_listeners)
+    if on_progress:
+        callbacks.append(on_progress)
+    for callback in callbacks:
+        try:
+            callback(event)
+        except Exception as e:
+            logger.warning(f"ffmpeg progress listener failed: {str(e)}")
+
+
+def _parse_float(value):
+    """Parse a numeric progress value, returning None for N/A"""
+    if value is None:
+        return None
+    value = value.strip().rstrip('x')
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_progress_block(values, label="ffmpeg", pid=0, elapsed=0.0):
+    """Convert one `-progress` key=value block into a ProgressEvent.
+
+    Args:
+        values: Dict of the keys written by ffmpeg for one progress update
+        label: Name of the render the block belongs to
+        pid: ffmpeg process id
+        elapsed: Seconds since the render started
+
+    Returns:
+        ProgressEvent
+    """
+    out_time_us = _parse_float(values.get("out_time_us") or values.get("out_time_ms"))
+    return ProgressEvent(
+        label=label,
+        pid=pid,
+        frame=int(_parse_float(values.get("frame")) or 0),
+        fps=_parse_float(values.get("fps")) or 0.0,
+        speed=_parse_float(values.get("speed")),
+        # out_time_ms is in microseconds as well, despite its name
+        out_time=max(0.0, out_time_us / 1_000_000) if out_time_us is not None else 0.0,
+        total_size=int(_parse_float(values.get("total_size")) or 0),
+        elapsed=elapsed,
+        done=values.get("progress") == "end",
+        raw=dict(values),
+    )
+
+
+def _with_progress_args(cmd):
+    """Insert the progress reporting options after the ffmpeg executable"""
+    if "-progress" in cmd:
+        return list(cmd)
+    return [cmd[0], "-progress", "pipe:1", "-nostats"] + list(cmd[1:])
+
+
+def _stop(process):
+    """Terminate an ffmpeg process, killing it if it doesn't exit"""
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def cancel_all():
+    """Stop every ffmpeg process started by run_ffmpeg in this process"""
+    with _active_lock:
+        processes = list(_active.values())
+    for process in processes:
+        _stop(process)
+    return len(processes)
+
+
+def run_ffmpeg(cmd, label=None, timeout=None, cancel_event=None, on_progress=None,
+               stall_timeout=None):
+    """Run an ffmpeg command, publishing progress and enforcing limits.
+
+    Args:
+        cmd: ffmpeg command as a list of arguments
+        label: Name used in logs and events (defaults to the output file name)
+        timeout: Maximum run time in seconds (FFMPEG_RUNNER_CONFIG default)
+        cancel_event: threading/multiprocessing Event; setting it stops the render
+        on_progress: Optional callable receiving this run's ProgressEvents
+        stall_timeout: Stop the render if no progress is reported for this
+            many seconds (FFMPEG_RUNNER_CONFIG default)
+
+    Returns:
+        subprocess.CompletedProcess with the captured stderr text and a
+        `progress` attribute holding the final ProgressEvent (or None)
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg exits with an error
+        subprocess.TimeoutExpired: If the render times out or stalls
+        FFmpegCancelled: If the cancel event was set
+    """
+    if timeout is None:
+        timeout = FFMPEG_RUNNER_CONFIG["timeout"]
+    if stall_timeout is None:
+        stall_timeout = FFMPEG_RUNNER_CONFIG["stall_timeout"]
+    if label is None:
+        label = os.path.basename(str(cmd[-1]))
+
+    full_cmd = _with_progress_args(cmd)
+    start = time.monotonic()
+    process = subprocess.Popen(
+        full_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        stdin=subprocess.DEVNULL, text=True, errors='replace')
+    with _active_lock:
+        _active[process.pid] = process
+
+    state = {"last_event": None, "last_progress": start}
+    stderr_tail = deque(maxlen=FFMPEG_RUNNER_CONFIG["stderr_lines"])
+
+    def read_progress():
+        values = {}
+        for line in process.stdout:
+            key, sep, value = line.strip().partition('=')
+            if not sep:
+                continue
+            values[key] = value
+            if key == "progress":
+                event = parse_progress_block(
+                    values, label, process.pid, time.monotonic() - start)
+                state["last_event"] = event
+                state["last_progress"] = time.monotonic()
+                _publish(event, on_progress)
+                values = {}
+
+    def read_stderr():
+        for line in process.stderr:
+            stderr_tail.append(line)
+
+    readers = [
+        threading.Thread(target=read_progress, name=f"ffmpeg-progress-{process.pid}", daemon=True),
+        threading.Thread(target=read_stderr, name=f"ffmpeg-stderr-{process.pid}", daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    poll_interval = FFMPEG_RUNNER_CONFIG["poll_interval"]
+    reason = None
+    try:
+        while process.poll() is None:
+            now = time.monotonic()
+            if cancel_event is not None and cancel_event.is_set():
+                reason = "cancelled"
+            elif timeout and now - start > timeout:
+                reason = f"timed out after {timeout}s"
+            elif stall_timeout and now - state["last_progress"] > stall_timeout:
+                reason = f"stalled for {stall_timeout}s"
+            if reason:
+                logger.error(f"ffmpeg [{label}] {reason}, stopping pid {process.pid}")
+                _stop(process)
+                break
+            try:
+                process.wait(timeout=poll_interval)
+            except subprocess.TimeoutExpired:
+                pass
+    except BaseException:
+        _stop(process)
+        raise
+    finally:
+        for reader in readers:
+            reader.join(timeout=5)
+        with _active_lock:
+            _active.pop(process.pid, None)
+
+    stderr = ''.join(stderr_tail)
+    if reason == "cancelled":
+        raise FFmpegCancelled(f"ffmpeg [{label}] was cancelled")
+    if reason:
+        raise subprocess.TimeoutExpired(full_cmd, timeout or stall_timeout, stderr=stderr)
+    if process.returncode != 0:
+        logger.error(f"ffmpeg [{label}] exited with code {process.returncode}: {stderr.strip()[-2000:]}")
+        raise subprocess.CalledProcessError(process.returncode, full_cmd, stderr=stderr)
+
+    result = subprocess.CompletedProcess(full_cmd, process.returncode, stdout=None, stderr=stderr)
+    result.progress = state["last_event"]
+    return result
+
+
+class _ProgressLogger:
+    """Default listener logging progress periodically and a summary per render"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._last_logged = {}
+
+    def __call__(self, event):
+        if event.done:
+            self._last_logged.pop(event.pid, None)
+            speed = f"{event.speed:.2f}x" if event.speed is not None else "n/a"
+            logger.info(
+                f"ffmpeg [{event.label}] finished: {event.frame} frames, "
+                f"{event.out_time:.2f}s output in {event.elapsed:.2f}s "
+                f"(avg {event.frame / event.elapsed if event.elapsed else 0:.1f} fps, speed {speed})")
+            return
+        last = self._last_logged.get(event.pid, 0.0)
+        if event.elapsed - last >= self.interval:
+            self._last_logged[event.pid] = event.elapsed
+            speed = f"{event.speed:.2f}x" if event.speed is not None else "n/a"
+            logger.info(
+                f"ffmpeg [{event.label}] frame={event.frame} fps={event.fps:.1f} "
+                f"speed={speed} out_time={event.out_time:.2f}s")
+
+
+if FFMPEG_RUNNER_CONFIG["log_interval"]:
+    add_listener(_ProgressLogger(FFMPEG_RUNNER_CONFIG["log_interval"]))
@@ -0,0 +1,129 @@
+"""
+Process-wide event loop and pooled HTTP client for the TTS calls.
+
+Creating an `httpx.AsyncClient` and a new event loop per call pays DNS, TCP
+and TLS setup on every TTS request. Instead each process runs one event loop
+in a daemon thread and keeps one `httpx.AsyncClient` bound to it, with
+keep-alive limits from HTTP_CLIENT_CONFIG (and HTTP/2 when the optional `h2`
+package is installed, so concurrent chunk requests share one connection).
+
+Synchronous code submits coroutines with `run_coroutine()`; coroutines running
+on the loop get the shared client from `get_client()`.
+"""
+
+import os
+import atexit
+import asyncio
+import logging
+import threading
+import importlib.util
+import httpx
+from constants import HTTP_CLIENT_CONFIG
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_loop = None
+_loop_thread = None
+_client = None
+_owner_pid = None
+
+
+def http2_available():
+    """Return True if HTTP/2 is enabled and the h2 package is installed"""
+    return HTTP_CLIENT_CONFIG["http2"] and importlib.util.find_spec("h2") is not None
+
+
+def get_event_loop():
+    """Return this process's long-lived event loop, starting it if needed"""
+    global _loop, _loop_thread, _client, _owner_pid
+    with _lock:
+        # A forked worker inherits the objects but not the loop thread
+        if _owner_pid != os.getpid():
+            _loop = None
+            _loop_thread = None
+            _client = None
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever, name="http-client-loop", daemon=True)
+            _loop_thread.start()
+            _owner_pid = os.getpid()
+            logger.info(f"Started HTTP client event loop in process {_owner_pid}")
+        return _loop
+
+
+def run_coroutine(coro, timeout=None):
+    """Run a coroutine on the shared event loop and wait for its result.
+
+    Args:
+        coro: Coroutine to run
+        timeout: Optional maximum wait in seconds
+
+    Returns:
+        The coroutine's result (its exception is re-raised)
+    """
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_coroutine() can't be called from the shared event loop")
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def on_shared_loop():
+    """Return True if called from a coroutine running on the shared event loop"""
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return running is _loop and _owner_pid == os.getpid()
+
+
+def get_client():
+    """Return the shared AsyncClient. Must be called from the shared event loop."""
+    global _client
+    if _client is None or _client.is_closed:
+        limits = httpx.Limits(
+            max_connections=HTTP_CLIENT_CONFIG["max_connections"],
+            max_keepalive_connections=HTTP_CLIENT_CONFIG["max_keepalive_connections"],
+            keepalive_expiry=HTTP_CLIENT_CONFIG["keepalive_expiry"],
+        )
+        http2 = http2_available()
+        _client = httpx.AsyncClient(
+            http2=http2, limits=limits, timeout=HTTP_CLIENT_CONFIG["timeout"])
+        logger.info(f"Created pooled HTTP client (http2={http2})")
+    return _client
+
+
+async def _close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def close():
+    """Close the shared client and stop the event loop of this process"""
+    global _loop, _loop_thread
+    with _lock:
+        loop, thread = _loop, _loop_thread
+        if loop is None or _owner_pid != os.getpid() or loop.is_closed():
+            return
+        _loop = None
+        _loop_thread = None
+    try:
+        asyncio.run_coroutine_threadsafe(_close_client(), loop).result(5)
+    except Exception as e:
+        logger.warning(f"Failed to close HTTP client: {str(e)}")
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+atexit.register(close)
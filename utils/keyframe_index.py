@@ -0,0 +1,142 @@
+"""
+Keyframe index for background videos.
+
+Stream-copy cuts (`-ss` before `-i` with `-c copy`) always start on the
+keyframe at or before the requested time. Picking the random start from the
+actual keyframe positions makes such cuts exact, so the segment never has to
+be fixed up by a corrective re-encode.
+
+Indexes are built from ffprobe packet flags (no decoding) and persisted as
+JSON, keyed by the source path, size and modification time.
+"""
+
+import os
+import json
+import random
+import hashlib
+import logging
+import subprocess
+import threading
+from constants import KEYFRAME_INDEX_CONFIG
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+# In-process cache: abspath -> (size, mtime, keyframes)
+_memory_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _index_path(video_path):
+    """Return the on-disk index file for a video"""
+    digest = hashlib.sha1(os.path.abspath(
+        video_path).encode('utf-8')).hexdigest()[:16]
+    name = f"{os.path.splitext(os.path.basename(video_path))[0]}_{digest}.json"
+    return os.path.join(KEYFRAME_INDEX_CONFIG["dir"], name)
+
+
+def parse_keyframe_packets(ffprobe_output):
+    """Parse `ffprobe -show_entries packet=pts_time,flags -of csv` output.
+
+    Args:
+        ffprobe_output: Text with one "pts_time,flags" line per packet
+
+    Returns:
+        Sorted list of keyframe timestamps in seconds
+    """
+    keyframes = []
+    for line in ffprobe_output.splitlines():
+        parts = line.strip().split(',')
+        if len(parts) < 2 or 'K' not in parts[1]:
+            continue
+        try:
+            keyframes.append(float(parts[0]))
+        except ValueError:
+            # pts_time can be "N/A" for some packets
+            continue
+    return sorted(set(keyframes))
+
+
+def _probe_keyframes(video_path):
+    """Read keyframe timestamps of the first video stream with ffprobe"""
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=print_section=0',
+        video_path
+    ]
+    output = subprocess.check_output(cmd).decode('utf-8')
+    return parse_keyframe_packets(output)
+
+
+def get_keyframes(video_path):
+    """Return the keyframe timestamps of a video, building the index if needed.
+
+    Args:
+        video_path: Path to the video file
+
+    Returns:
+        Sorted list of keyframe timestamps in seconds (empty if probing fails)
+    """
+    abs_path = os.path.abspath(video_path)
+    stat = os.stat(video_path)
+    signature = (stat.st_size, stat.st_mtime)
+
+    with _cache_lock:
+        cached = _memory_cache.get(abs_path)
+    if cached and cached[:2] == signature:
+        return cached[2]
+
+    index_path = _index_path(video_path)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get("path") == abs_path and \
+                (index.get("size"), index.get("mtime")) == signature:
+            keyframes = index["keyframes"]
+            with _cache_lock:
+                _memory_cache[abs_path] = (*signature, keyframes)
+            return keyframes
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable keyframe index {index_path}: {str(e)}")
+
+    try:
+        keyframes = _probe_keyframes(video_path)
+    except Exception as e:
+        logger.warning(f"Failed to build keyframe index for {video_path}: {str(e)}")
+        return []
+
+    logger.info(f"Indexed {len(keyframes)} keyframes in {video_path}")
+
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        temp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "path": abs_path,
+                "size": signature[0],
+                "mtime": signature[1],
+                "keyframes": keyframes,
+            }, f)
+        os.replace(temp_path, index_path)
+    except Exception as e:
+        logger.warning(f"Failed to persist keyframe index {index_path}: {str(e)}")
+
+    with _cache_lock:
+        _memory_cache[abs_path] = (*signature, keyframes)
+    return keyframes
+
+
+def choose_keyframe_start(keyframes, total_duration, target_duration):
+    """Pick a random keyframe from which target_duration seconds are available.
+
+    Returns None if no keyframe leaves enough room.
+    """
+    candidates = [k for k in keyframes if k + target_duration <= total_duration]
+    if not candidates:
+        return None
+    return random.choice(candidates)
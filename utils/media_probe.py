@@ -0,0 +1,230 @@
+"""
+Cached media metadata.
+
+`probe()` returns duration, streams, resolution and frame rate of a media
+file from a single `ffprobe -of json` call, or by parsing the header
+in-process for WAV files. Results are cached by (path, size, mtime) so the
+background videos are only probed once per process, and can optionally be
+persisted to a JSON file shared by all workers.
+"""
+
+import os
+import json
+import wave
+import logging
+import subprocess
+import threading
+from collections import OrderedDict
+from constants import PROBE_CACHE_CONFIG
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_persist_loaded = False
+
+
+def _persist_path():
+    """Return the persistence file path, or None if persistence is disabled"""
+    return os.getenv('PROBE_CACHE_PATH') or PROBE_CACHE_CONFIG["persist_path"]
+
+
+def _cache_key(path):
+    """Return the cache key for a file: absolute path, size and mtime"""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime}"
+
+
+def _trim_cache():
+    """Drop the oldest entries beyond the configured maximum (lock held)"""
+    while len(_cache) > PROBE_CACHE_CONFIG["max_entries"]:
+        _cache.popitem(last=False)
+
+
+def _load_persisted():
+    """Load persisted probe results once per process"""
+    global _persist_loaded
+    if _persist_loaded:
+        return
+    _persist_loaded = True
+
+    persist_path = _persist_path()
+    if not persist_path or not os.path.exists(persist_path):
+        return
+    try:
+        with open(persist_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        with _cache_lock:
+            for key, info in entries.items():
+                _cache.setdefault(key, info)
+            _trim_cache()
+        logger.info(f"Loaded {len(entries)} probe results from {persist_path}")
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable probe cache {persist_path}: {str(e)}")
+
+
+def _save_persisted(key, info):
+    """Merge one probe result into the persistence file"""
+    persist_path = _persist_path()
+    if not persist_path:
+        return
+    try:
+        entries = {}
+        if os.path.exists(persist_path):
+            with open(persist_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        entries[key] = info
+        # Keep the file bounded like the in-memory cache
+        overflow = len(entries) - PROBE_CACHE_CONFIG["max_entries"]
+        for stale_key in list(entries)[:max(0, overflow)]:
+            del entries[stale_key]
+
+        directory = os.path.dirname(persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{persist_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        os.replace(temp_path, persist_path)
+    except Exception as e:
+        logger.warning(f"Failed to persist probe cache {persist_path}: {str(e)}")
+
+
+def _parse_frame_rate(rate):
+    """Convert an ffprobe rational such as "60000/1001" to a float"""
+    if not rate:
+        return None
+    try:
+        if '/' in rate:
+            num, den = rate.split('/')
+            return float(num) / float(den) if float(den) else None
+        return float(rate)
+    except ValueError:
+        return None
+
+
+def _probe_wav(path):
+    """Read WAV metadata from the file header without spawning ffprobe"""
+    with wave.open(path, 'rb') as wf:
+        frames = wf.getnframes()
+        rate = wf.getframerate()
+        channels = wf.getnchannels()
+        sample_width = wf.getsampwidth()
+    return {
+        "duration": frames / float(rate),
+        "format": "wav",
+        "streams": [{
+            "codec_type": "audio",
+            "codec_name": f"pcm_s{sample_width * 8}le",
+            "sample_rate": rate,
+            "channels": channels,
+        }],
+        "width": None,
+        "height": None,
+        "fps": None,
+    }
+
+
+def _probe_ffprobe(path):
+    """Read format and stream metadata with a single ffprobe JSON call"""
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-show_format',
+        '-show_streams',
+        '-of', 'json',
+        path
+    ]
+    data = json.loads(subprocess.check_output(cmd).decode('utf-8'))
+    fmt = data.get("format", {})
+
+    streams = []
+    width = height = fps = None
+    for stream in data.get("streams", []):
+        info = {
+            "codec_type": stream.get("codec_type"),
+            "codec_name": stream.get("codec_name"),
+        }
+        if stream.get("codec_type") == "video":
+            info["width"] = stream.get("width")
+            info["height"] = stream.get("height")
+            info["fps"] = _parse_frame_rate(stream.get("avg_frame_rate")) or \
+                _parse_frame_rate(stream.get("r_frame_rate"))
+            if width is None:
+                width, height, fps = info["width"], info["height"], info["fps"]
+        elif stream.get("codec_type") == "audio":
+            info["sample_rate"] = int(stream.get("sample_rate", 0)) or None
+            info["channels"] = stream.get("channels")
+        streams.append(info)
+
+    duration = fmt.get("duration")
+    if duration is None:
+        # Some containers only report duration per stream
+        durations = [float(s["duration"]) for s in data.get("streams", [])
+                     if s.get("duration") not in (None, "N/A")]
+        duration = max(durations) if durations else None
+
+    return {
+        "duration": float(duration) if duration is not None else None,
+        "format": fmt.get("format_name"),
+        "streams": streams,
+        "width": width,
+        "height": height,
+        "fps": fps,
+    }
+
+
+def probe(path):
+    """Return cached metadata for a media file.
+
+    Args:
+        path: Path to the media file
+
+    Returns:
+        dict with "duration", "format", "streams", "width", "height" and "fps"
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        subprocess.CalledProcessError: If ffprobe fails
+    """
+    _load_persisted()
+    key = _cache_key(path)
+
+    with _cache_lock:
+        info = _cache.get(key)
+        if info is not None:
+            _cache.move_to_end(key)
+            return info
+
+    info = None
+    if path.lower().endswith('.wav'):
+        try:
+            info = _probe_wav(path)
+        except (wave.Error, EOFError) as e:
+            # Non-PCM or malformed WAV, let ffprobe handle it
+            logger.debug(f"In-process WAV parse failed for {path}: {str(e)}")
+    if info is None:
+        info = _probe_ffprobe(path)
+
+    with _cache_lock:
+        _cache[key] = info
+        _trim_cache()
+    _save_persisted(key, info)
+    return info
+
+
+def probe_duration(path):
+    """Return the duration of a media file in seconds (cached)"""
+    duration = probe(path)["duration"]
+    if duration is None:
+        raise ValueError(f"Could not determine duration of {path}")
+    return duration
+
+
+def clear_cache():
+    """Forget all in-memory probe results"""
+    global _persist_loaded
+    with _cache_lock:
+        _cache.clear()
+    _persist_loaded = False
@@ -0,0 +1,242 @@
+"""
+Client-side rate limiting and hedged requests for the external APIs.
+
+Every worker process retried Fish Audio and OpenAI with its own backoff, so
+several voices hitting a 429 together retried in lockstep. Calls now take a
+token from a per-provider token bucket whose state lives in a small JSON file
+under an fcntl lock, shared by all processes on the host. A 429 with a
+Retry-After header (or a backoff) blocks the bucket for every process, and
+the refill rate staggers the retries afterwards.
+
+Optional hedging: once a provider has enough latency samples, a call still
+running after the observed p95 latency gets a duplicate request (if the
+bucket has a token to spare); the first result wins.
+"""
+
+import os
+import json
+import time
+import fcntl
+import random
+import asyncio
+import logging
+import tempfile
+import threading
+import concurrent.futures
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from constants import RATE_LIMIT_CONFIG
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+# Threads running hedged synchronous calls
+_hedge_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=8, thread_name_prefix="hedge")
+
+
+class RateLimited(Exception):
+    """Raised on a 429 response, after the provider's bucket has been blocked"""
+
+
+def _state_dir():
+    """Return the directory holding the shared bucket state files"""
+    return RATE_LIMIT_CONFIG["dir"] or os.path.join(tempfile.gettempdir(), "brainrot_rate_limit")
+
+
+def _provider(name):
+    """Return the config of a provider, or None if it isn't rate limited"""
+    return RATE_LIMIT_CONFIG["providers"].get(name)
+
+
+@contextmanager
+def _locked_state(name):
+    """Yield the shared state of a provider under an exclusive file lock, then save it"""
+    os.makedirs(_state_dir(), exist_ok=True)
+    path = os.path.join(_state_dir(), f"{name}.json")
+    with _lock, open(path, 'a+', encoding='utf-8') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or '{}')
+            except ValueError:
+                state = {}
+            yield state
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _refill(state, config, now):
+    """Add the tokens earned since the last update"""
+    tokens = state.get("tokens", config["burst"])
+    updated = state.get("updated", now)
+    state["tokens"] = min(config["burst"], tokens + max(0.0, now - updated) * config["rate"])
+    state["updated"] = now
+
+
+def try_acquire(name):
+    """Take a token without waiting.
+
+    Returns:
+        0 if a token was taken, otherwise the seconds to wait before trying again
+    """
+    config = _provider(name)
+    if config is None:
+        return 0
+    now = time.time()
+    with _locked_state(name) as state:
+        _refill(state, config, now)
+        blocked_until = state.get("blocked_until", 0)
+        if blocked_until > now:
+            return blocked_until - now
+        if state["tokens"] >= 1:
+            state["tokens"] -= 1
+            return 0
+        return (1 - state["tokens"]) / config["rate"]
+
+
+def acquire(name, timeout=None):
+    """Wait for a token of a provider (blocking)"""
+    deadline = time.time() + timeout if timeout else None
+    while True:
+        wait = try_acquire(name)
+        if not wait:
+            return
+        if deadline and time.time() + wait > deadline:
+            raise TimeoutError(f"No {name} rate limit token within {timeout}s")
+        # Jitter so processes waiting on the same bucket don't wake together
+        time.sleep(wait + random.uniform(0, 0.1))
+
+
+async def acquire_async(name, timeout=None):
+    """Wait for a token of a provider without blocking the event loop"""
+    deadline = time.time() + timeout if timeout else None
+    while True:
+        wait = try_acquire(name)
+        if not wait:
+            return
+        if deadline and time.time() + wait > deadline:
+            raise TimeoutError(f"No {name} rate limit token within {timeout}s")
+        await asyncio.sleep(wait + random.uniform(0, 0.1))
+
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or HTTP date) to seconds, or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def block(name, seconds):
+    """Make every process wait `seconds` before the next call to a provider"""
+    if _provider(name) is None or not seconds:
+        return
+    now = time.time()
+    with _locked_state(name) as state:
+        _refill(state, _provider(name), now)
+        state["blocked_until"] = max(state.get("blocked_until", 0), now + seconds)
+        state["tokens"] = 0
+    logger.warning(f"{name} rate limited, pausing all calls for {seconds:.1f}s")
+
+
+def record_latency(name, seconds):
+    """Add a successful call's latency to the provider's shared samples"""
+    if _provider(name) is None:
+        return
+    with _locked_state(name) as state:
+        samples = state.get("latencies", [])
+        samples.append(round(seconds, 3))
+        state["latencies"] = samples[-RATE_LIMIT_CONFIG["latency_window"]:]
+
+
+def hedge_delay(name):
+    """Return the latency after which a call is hedged, or None if hedging is off"""
+    config = _provider(name)
+    if not config or not config.get("hedge"):
+        return None
+    with _locked_state(name) as state:
+        samples = sorted(state.get("latencies", []))
+    if len(samples) < RATE_LIMIT_CONFIG["hedge_min_samples"]:
+        return None
+    index = min(len(samples) - 1, int(len(samples) * RATE_LIMIT_CONFIG["hedge_percentile"] / 100))
+    return max(RATE_LIMIT_CONFIG["hedge_min_delay"], samples[index])
+
+
+async def hedged_async(name, make_call):
+    """Run a coroutine, starting a duplicate if it outlives the p95 latency.
+
+    Args:
+        name: Provider name in RATE_LIMIT_CONFIG["providers"]
+        make_call: Callable taking the attempt number (0 or 1) and returning
+            a coroutine; the attempts must not share output files
+
+    Returns:
+        The result of the first attempt to succeed
+    """
+    delay = hedge_delay(name)
+    if delay is None:
+        return await make_call(0)
+
+    tasks = [asyncio.ensure_future(make_call(0))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or try_acquire(name) > 0:  # No token to spare for a duplicate
+            return await tasks[0]
+
+        logger.info(f"{name} call exceeded p95 latency ({delay:.2f}s), sending a hedged request")
+        tasks.append(asyncio.ensure_future(make_call(1)))
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        unfinished = [task for task in tasks if not task.done()]
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            await asyncio.gather(*unfinished, return_exceptions=True)
+
+
+def hedged_call(name, call):
+    """Synchronous hedged_async(): run call(), duplicating it past the p95 latency.
+
+    A losing call can't be interrupted; its result is discarded.
+    """
+    delay = hedge_delay(name)
+    if delay is None:
+        return call()
+
+    first = _hedge_executor.submit(call)
+    done, _ = concurrent.futures.wait({first}, timeout=delay)
+    if done or try_acquire(name) > 0:  # No token to spare for a duplicate
+        return first.result()
+
+    logger.info(f"{name} call exceeded p95 latency ({delay:.2f}s), sending a hedged request")
+    pending = {first, _hedge_executor.submit(call)}
+    error = None
+    while pending:
+        done, pending = concurrent.futures.wait(
+            pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
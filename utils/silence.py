@@ -0,0 +1,125 @@
+"""
+Pause detection on the 16kHz alignment WAV.
+
+The WAV written by process_audio() is memory-mapped (no decode, no copy) and
+its frame RMS energy is computed with vectorized NumPy from a cumulative sum
+of squares, so a 3-minute track takes a few milliseconds instead of an
+ffmpeg `silencedetect` run. Runs of frames below SILENCE_CONFIG["threshold_db"]
+that last at least SILENCE_CONFIG["min_silence"] seconds are reported as
+(start, end) pause intervals for subtitle adjustment.
+"""
+
+import struct
+import logging
+import numpy as np
+from constants import SILENCE_CONFIG
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+
+def _find_data_chunk(path):
+    """Return (channels, sample_rate, bits_per_sample, data_offset, data_size) of a PCM WAV"""
+    with open(path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError(f"{path} is not a WAV file")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                audio_format, channels, sample_rate, _, _, bits = struct.unpack(
+                    '<HHIIHH', f.read(16))
+                f.seek(chunk_size - 16 + (chunk_size & 1), 1)
+                fmt = (audio_format, channels, sample_rate, bits)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError(f"{path} has no fmt chunk before its data")
+                audio_format, channels, sample_rate, bits = fmt
+                # 0xFFFE is WAVE_FORMAT_EXTENSIBLE, written by ffmpeg for some layouts
+                if audio_format not in (1, 0xFFFE) or bits != 16:
+                    raise ValueError(f"{path} is not 16-bit PCM")
+                return channels, sample_rate, bits, f.tell(), chunk_size
+            else:
+                f.seek(chunk_size + (chunk_size & 1), 1)
+
+
+def load_wav(path):
+    """Memory-map the samples of a 16-bit PCM WAV file.
+
+    Returns:
+        (samples, sample_rate): int16 array of shape (frames,) for mono or
+        (frames, channels) otherwise, backed by the file
+    """
+    channels, sample_rate, _, offset, size = _find_data_chunk(path)
+    frames = size // (2 * channels)
+    if frames == 0:
+        return np.zeros(0, dtype=np.int16), sample_rate
+    samples = np.memmap(path, dtype='<i2', mode='r', offset=offset, shape=(frames * channels,))
+    if channels > 1:
+        samples = samples.reshape(frames, channels)
+    return samples, sample_rate
+
+
+def frame_rms_db(samples, frame_length, hop_length):
+    """Return the RMS level in dBFS of every frame of a mono int16 signal"""
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if len(samples) < frame_length:
+        return np.full(1 if len(samples) else 0, -np.inf)
+
+    # Sum of squares of any window is a difference of two cumulative sums
+    squares = np.square(samples, dtype=np.float64)
+    cumulative = np.concatenate(([0.0], np.cumsum(squares)))
+    starts = np.arange(0, len(samples) - frame_length + 1, hop_length)
+    energy = (cumulative[starts + frame_length] - cumulative[starts]) / frame_length
+
+    with np.errstate(divide='ignore'):
+        return 10 * np.log10(np.maximum(energy, 0.0) / (32768.0 ** 2))
+
+
+def find_silences(levels_db, hop_seconds, frame_seconds, duration,
+                  threshold_db=None, min_silence=None):
+    """Turn frame levels into (start, end) pause intervals in seconds"""
+    if threshold_db is None:
+        threshold_db = SILENCE_CONFIG["threshold_db"]
+    if min_silence is None:
+        min_silence = SILENCE_CONFIG["min_silence"]
+
+    silent = np.concatenate(([0], (levels_db < threshold_db).astype(np.int8), [0]))
+    edges = np.diff(silent)
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)  # Exclusive frame index
+
+    starts = run_starts * hop_seconds
+    ends = np.minimum((run_ends - 1) * hop_seconds + frame_seconds, duration)
+    keep = ends - starts >= min_silence
+    return [(float(start), float(end)) for start, end in zip(starts[keep], ends[keep])]
+
+
+def detect_silences(wav_path, threshold_db=None, min_silence=None):
+    """Detect pauses in a 16-bit PCM WAV file.
+
+    Args:
+        wav_path: WAV file, normally the 16kHz mono alignment track
+        threshold_db: Frames quieter than this (dBFS) are silent
+        min_silence: Shortest reported pause in seconds
+
+    Returns:
+        Sorted list of (start, end) pause intervals in seconds
+    """
+    samples, sample_rate = load_wav(wav_path)
+    frame_length = max(1, int(sample_rate * SILENCE_CONFIG["frame_ms"] / 1000))
+    hop_length = max(1, int(sample_rate * SILENCE_CONFIG["hop_ms"] / 1000))
+    duration = len(samples) / sample_rate if sample_rate else 0.0
+
+    levels = frame_rms_db(samples, frame_length, hop_length)
+    silences = find_silences(
+        levels, hop_length / sample_rate, frame_length / sample_rate, duration,
+        threshold_db, min_silence)
+    logger.info(f"Detected {len(silences)} pauses in {duration:.2f}s of audio ({wav_path})")
+    return silences
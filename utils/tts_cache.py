@@ -0,0 +1,193 @@
+"""
+Content-addressed TTS audio cache.
+
+Retried jobs and re-renders with another background or subtitle style
+synthesize the same text with the same voice again. `generate_voice()` looks
+the request up here first: entries are keyed by a SHA-256 of everything that
+changes the audio (text, voice reference id, model, prosody speed, format and
+sample rate) and stored as plain audio files under TTS_CACHE_CONFIG["dir"].
+
+The cache is bounded by TTS_CACHE_CONFIG["max_bytes"] with LRU eviction (a
+hit refreshes the entry's mtime). Hit/miss counters are kept in a stats file
+next to the entries so all worker processes share them.
+"""
+
+import os
+import json
+import fcntl
+import shutil
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from constants import TTS_CACHE_CONFIG
+
+# Configure module-level logger
+logger = logging.getLogger(__name__)
+
+STATS_FILE = "stats.json"
+
+_lock = threading.Lock()
+
+
+def cache_key(text, reference_id, model, speed, audio_format, sample_rate=None):
+    """Return the cache key of a TTS request"""
+    payload = json.dumps({
+        "text": text,
+        "reference_id": reference_id,
+        "model": model,
+        "speed": float(speed),
+        "format": audio_format,
+        "sample_rate": sample_rate,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _entry_path(key, audio_format):
+    """Return the file of a cache entry"""
+    extension = 'wav' if audio_format in ("pcm", "wav") else audio_format
+    return os.path.join(TTS_CACHE_CONFIG["dir"], key[:2], f"{key}.{extension}")
+
+
+@contextmanager
+def _locked_stats():
+    """Yield the shared stats dict under an exclusive file lock, then save it"""
+    os.makedirs(TTS_CACHE_CONFIG["dir"], exist_ok=True)
+    path = os.path.join(TTS_CACHE_CONFIG["dir"], STATS_FILE)
+    with _lock, open(path, 'a+', encoding='utf-8') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            try:
+                stats = json.loads(f.read() or '{}')
+            except ValueError:
+                stats = {}
+            yield stats
+            f.seek(0)
+            f.truncate()
+            json.dump(stats, f)
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _count(counter):
+    """Increment a shared hit/miss counter"""
+    try:
+        with _locked_stats() as stats:
+            stats[counter] = stats.get(counter, 0) + 1
+    except OSError as e:
+        logger.warning(f"Could not update TTS cache stats: {str(e)}")
+
+
+def _copy_atomic(source_path, destination_path):
+    """Copy a file so readers never see a partial destination"""
+    directory = os.path.dirname(destination_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{destination_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, destination_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def get(key, audio_format, output_path):
+    """Copy a cached TTS result to output_path.
+
+    Returns:
+        True on a cache hit, False on a miss (or if the cache is disabled)
+    """
+    if not TTS_CACHE_CONFIG["enabled"]:
+        return False
+
+    entry = _entry_path(key, audio_format)
+    try:
+        _copy_atomic(entry, output_path)
+        os.utime(entry)  # Most recently used
+    except FileNotFoundError:
+        _count("misses")
+        return False
+    except OSError as e:
+        logger.warning(f"Could not read TTS cache entry {entry}: {str(e)}")
+        _count("misses")
+        return False
+
+    _count("hits")
+    logger.info(f"TTS cache hit {key[:12]} -> {output_path}")
+    return True
+
+
+def put(key, audio_format, source_path):
+    """Store a TTS result in the cache and evict the least recently used entries"""
+    if not TTS_CACHE_CONFIG["enabled"]:
+        return
+    try:
+        _copy_atomic(source_path, _entry_path(key, audio_format))
+        evict_to_cap()
+    except OSError as e:
+        logger.warning(f"Could not store TTS cache entry {key[:12]}: {str(e)}")
+
+
+def _entries():
+    """Return (mtime, size, path) of all cache entries, oldest first"""
+    entries = []
+    for root, _, files in os.walk(TTS_CACHE_CONFIG["dir"]):
+        for name in files:
+            if name == STATS_FILE or name.endswith('.tmp'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Evicted meanwhile
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return sorted(entries)
+
+
+def evict_to_cap():
+    """Remove the least recently used entries while the cache exceeds its size cap"""
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    while entries and total > TTS_CACHE_CONFIG["max_bytes"]:
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+            evicted += 1
+        except OSError:
+            pass
+        total -= size
+    if evicted:
+        logger.info(f"Evicted {evicted} TTS cache entries (cache over size cap)")
+        try:
+            with _locked_stats() as stats:
+                stats["evictions"] = stats.get("evictions", 0) + evicted
+        except OSError:
+            pass
+    return evicted
+
+
+def stats():
+    """Return hit/miss counters and the current size of the cache"""
+    entries = _entries() if os.path.isdir(TTS_CACHE_CONFIG["dir"]) else []
+    counters = {}
+    path = os.path.join(TTS_CACHE_CONFIG["dir"], STATS_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            counters = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    hits = counters.get("hits", 0)
+    misses = counters.get("misses", 0)
+    return {
+        "enabled": TTS_CACHE_CONFIG["enabled"],
+        "hits": hits,
+        "misses": misses,
+        "evictions": counters.get("evictions", 0),
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+        "entries": len(entries),
+        "bytes": sum(size for _, size, _ in entries),
+    }